@@ -0,0 +1,122 @@
+import json
+import os
+import tempfile
+
+from PyQt5.QtCore import QObject, QFileSystemWatcher, pyqtSignal
+
+
+def write_json_atomic(path, data):
+    """
+    Writes JSON to a temporary file next to the target and renames it over the target, so readers never see a
+    partial file.
+
+    :param path: Path of the file to write.
+    :param data: JSON serializable data.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, partial = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(handle, "w") as file:
+            json.dump(data, file, indent=4)
+        os.replace(partial, path)
+    except BaseException:
+        os.unlink(partial)
+        raise
+
+
+class AppConfig(QObject):
+    """
+    The application configuration, app_config.json, read once and kept in memory. A file watcher drops the cached
+    copy when the file changes on disk, and every write replaces the file atomically.
+
+    Signals
+    -------
+    changed()
+        Emitted when the file changed on disk.
+    """
+    changed = pyqtSignal()
+    """
+    :signal changed: Emitted when the configuration file changed on disk.
+    """
+
+    def __init__(self, path):
+        """
+        Initializes the AppConfig.
+
+        :param path: Path to the configuration file.
+        """
+        super().__init__()
+        self.path = path
+        self.cache = None
+        # the directory is watched too: an atomic replace gives the file a new inode, which drops the file watch
+        self.watcher = QFileSystemWatcher()
+        self.watcher.addPath(os.path.dirname(os.path.abspath(path)))
+        self.watcher.fileChanged.connect(self.invalidate)
+        self.watcher.directoryChanged.connect(self.invalidate)
+
+    def invalidate(self, _path=""):
+        """
+        Drops the cached configuration so the next read loads the file again.
+        """
+        self.cache = None
+        if os.path.exists(self.path) and str(self.path) not in self.watcher.files():
+            self.watcher.addPath(str(self.path))
+        self.changed.emit()
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def read(self):
+        """
+        Returns the configuration, loading the file only if it changed since the last read.
+
+        :return: The configuration. Callers must not modify it, see update.
+        :raises FileNotFoundError: If the file does not exist.
+        :raises json.JSONDecodeError: If the file is not valid JSON.
+        """
+        if self.cache is None:
+            with open(self.path, "r") as config_file:
+                self.cache = json.load(config_file)
+            if str(self.path) not in self.watcher.files():
+                self.watcher.addPath(str(self.path))
+        return self.cache
+
+    def get(self, key, default=None):
+        """
+        Returns one setting, or the default if it is not set or the file cannot be read.
+        """
+        try:
+            return self.read().get(key, default)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return default
+
+    def load(self):
+        """
+        Returns a copy of the configuration, empty if the file cannot be read.
+        """
+        try:
+            return dict(self.read())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save(self, config):
+        """
+        Replaces the configuration atomically.
+
+        :param config: The whole configuration.
+        """
+        write_json_atomic(self.path, config)
+        self.cache = dict(config)
+
+    def update(self, values=None, remove=()):
+        """
+        Sets and removes settings in one atomic write.
+
+        :param values: Settings to set.
+        :param remove: Names of settings to remove.
+        """
+        config = self.load()
+        config.update(values or {})
+        for key in remove:
+            config.pop(key, None)
+        self.save(config)
@@ -0,0 +1,69 @@
+from collections import deque
+
+HISTORY_LENGTH = 120  # status events kept for the sparklines, two minutes at the driver's rate
+LOW_CPU_PERCENT = 50  # machine CPU use below which a running batch is reported as under-utilising the machine
+
+
+class DashboardModel:
+    """
+    Keeps the latest status event of the driver and a short history of its totals for the dashboard. Events
+    arrive about once a second, see DriverExporter.status; the dashboard reads the model at its own rate.
+
+    Attributes
+    ----------
+    status: dict
+        The latest status event, empty before the first.
+    history: dict
+        A bounded series per total: "fps", "mbps" (disk read and write) and "cpu".
+    dirty: bool
+        Whether a status event arrived since the dashboard last drew.
+    """
+
+    def __init__(self):
+        """
+        Initializes the DashboardModel.
+        """
+        self.status = {}
+        self.history = {name: deque(maxlen=HISTORY_LENGTH) for name in ("fps", "mbps", "cpu")}
+        self.dirty = False
+
+    def reset(self):
+        """
+        Clears the status and history, for a new run.
+        """
+        self.status = {}
+        for series in self.history.values():
+            series.clear()
+        self.dirty = True
+
+    def update(self, status):
+        """
+        Records a status event.
+
+        :param status: The driver's status event.
+        """
+        self.status = status
+        self.history["fps"].append(status.get("fps", 0.0))
+        self.history["mbps"].append(
+            (status.get("read_bytes_per_second", 0.0) + status.get("write_bytes_per_second", 0.0)) / 1e6
+        )
+        self.history["cpu"].append(status.get("cpu_percent", 0.0))
+        self.dirty = True
+
+    def jobs(self):
+        """
+        :return: The number of jobs by state: queued, running, done and failed.
+        """
+        return {state: self.status.get("jobs", {}).get(state, 0) for state in ("queued", "running", "done", "failed")}
+
+    def running(self):
+        """
+        :return: The running jobs by sequence name, each with its sequence, stage, fps and percent.
+        """
+        return sorted(self.status.get("running", []), key=lambda job: job.get("sequence", ""))
+
+    def under_utilised(self):
+        """
+        :return: Whether jobs are running while the machine's CPU use is low.
+        """
+        return self.jobs()["running"] > 0 and self.status.get("cpu_percent", 100) < LOW_CPU_PERCENT
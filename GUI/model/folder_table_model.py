@@ -0,0 +1,199 @@
+import os.path
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant
+
+# (header, job key) per column, the last column holds the delete button and no job data
+COLUMNS = [
+    ("Folder Path", "sequence_folder_path"),
+    ("Frames", "frames"),
+    ("Size", "bytes"),
+    ("Check Gaps", "gap_check"),
+    ("Check DPX Policy", "dpx_policy_check"),
+    ("DPX Policy Path", "dpx_policy_path"),
+    ("Check MKV Policy", "mkv_policy_check"),
+    ("MKV Policy Path", "mkv_policy_path"),
+    ("Verify MD5 Checksum", "frame_md5"),
+    ("Process In-Place", "in_place"),
+    ("", None),
+]
+CHECK_COLUMNS = (3, 4, 6, 8, 9)
+POLICY_COLUMNS = (5, 7)  # each enabled by the check column to its left
+DELETE_COLUMN = 10
+DETAIL_KEYS = ("frames", "bytes")  # shown when known, e.g. from a scan, but not part of the sequence config
+
+
+def format_size(size):
+    """
+    Formats a byte count for display, e.g. 1.2 TB.
+
+    :param size: Number of bytes.
+    :return: The formatted size.
+    """
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1000:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1000
+    return f"{size:.1f} TB"
+
+
+class FolderTableModel(QAbstractTableModel):
+    """
+    Table model over a plain list of jobs, one dict per sequence with the keys of COLUMNS. The list is the source of
+    truth: views only paint it, and exporting it is a copy of the list.
+
+    Attributes
+    ----------
+    jobs: list
+        One dict per sequence, in table order.
+    """
+
+    def __init__(self, parent=None):
+        """
+        Initializes the FolderTableModel.
+
+        :param parent: The parent object.
+        """
+        super().__init__(parent)
+        self.jobs = []
+        self.policy_labels = {}  # policy path -> label, so painting does not stat the file
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.jobs)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLUMNS[section][0]
+        return super().headerData(section, orientation, role)
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        if index.column() in POLICY_COLUMNS and not self.jobs[index.row()][COLUMNS[index.column() - 1][1]]:
+            return Qt.NoItemFlags  # policy path of an unchecked policy check
+        if index.column() in CHECK_COLUMNS:
+            return Qt.ItemIsEnabled | Qt.ItemIsUserCheckable
+        return Qt.ItemIsEnabled
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return QVariant()
+        column = index.column()
+        key = COLUMNS[column][1]
+        job = self.jobs[index.row()]
+        if column in CHECK_COLUMNS:
+            if role == Qt.CheckStateRole:
+                return Qt.Checked if job[key] else Qt.Unchecked
+        elif column in POLICY_COLUMNS:
+            if role == Qt.DisplayRole:
+                return self.policy_label(job[key])
+            if role in (Qt.ToolTipRole, Qt.StatusTipRole, Qt.EditRole):
+                return job[key]
+        elif key in DETAIL_KEYS:
+            if role == Qt.DisplayRole and job.get(key) is not None:
+                return format_size(job[key]) if key == "bytes" else job[key]
+            if role == Qt.TextAlignmentRole:
+                return Qt.AlignRight | Qt.AlignVCenter
+        elif key is not None:
+            if role in (Qt.DisplayRole, Qt.ToolTipRole, Qt.StatusTipRole, Qt.EditRole):
+                return job[key]
+        return QVariant()
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid():
+            return False
+        column = index.column()
+        key = COLUMNS[column][1]
+        if column in CHECK_COLUMNS and role == Qt.CheckStateRole:
+            self.jobs[index.row()][key] = value == Qt.Checked
+            # the policy path next to a policy check follows its state
+            last = index.sibling(index.row(), column + 1) if column + 1 in POLICY_COLUMNS else index
+            self.dataChanged.emit(index, last)
+            return True
+        if column in POLICY_COLUMNS and role == Qt.EditRole:
+            self.jobs[index.row()][key] = value
+            self.dataChanged.emit(index, index)
+            return True
+        return False
+
+    def policy_label(self, path):
+        """
+        Returns the file name shown for a policy path.
+
+        :param path: Path to the policy file.
+        :return: The file name, or "No policy selected" if there is no such file.
+        """
+        if path not in self.policy_labels:
+            self.policy_labels[path] = os.path.basename(path) if path and os.path.isfile(path) else "No policy selected"
+        return self.policy_labels[path]
+
+    def new_job(self, folder, dpx_policy, mkv_policy, frames=None, size=None):
+        """
+        Creates the job of a sequence folder with the default settings.
+
+        :param folder: Path to the sequence folder.
+        :param dpx_policy: Default DPX policy path.
+        :param mkv_policy: Default MKV policy path.
+        :param frames: Number of frames, if known.
+        :param size: Size of the sequence in bytes, if known.
+        :return: The job dict.
+        """
+        return {
+            "sequence_folder_path": folder,
+            "frames": frames,
+            "bytes": size,
+            "gap_check": True,
+            "dpx_policy_check": True,
+            "dpx_policy_path": dpx_policy,
+            "mkv_policy_check": True,
+            "mkv_policy_path": mkv_policy,
+            "frame_md5": True,
+            "in_place": True,
+        }
+
+    def add_jobs(self, jobs):
+        """
+        Appends jobs to the table in one insertion.
+
+        :param jobs: A list of job dicts.
+        """
+        if not jobs:
+            return
+        self.beginInsertRows(QModelIndex(), len(self.jobs), len(self.jobs) + len(jobs) - 1)
+        self.jobs.extend(jobs)
+        self.endInsertRows()
+
+    def remove_row(self, row):
+        """
+        Removes the job at a row.
+
+        :param row: The row number.
+        """
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.jobs[row]
+        self.endRemoveRows()
+
+    def remove_folder(self, folder):
+        """
+        Removes every job of a sequence folder.
+
+        :param folder: Path to the sequence folder.
+        """
+        for row in reversed([r for r, job in enumerate(self.jobs) if job["sequence_folder_path"] == folder]):
+            self.remove_row(row)
+
+    def folders(self):
+        """
+        :return: The set of sequence folders in the table.
+        """
+        return {job["sequence_folder_path"] for job in self.jobs}
+
+    def get_jobs(self):
+        """
+        Exports the jobs in table order.
+
+        :return: A list of job dicts with the sequence config keys, copies of the table's.
+        """
+        return [{k: v for k, v in job.items() if k not in DETAIL_KEYS} for job in self.jobs]
@@ -1,14 +1,16 @@
 import os
 from PyQt5.QtCore import QObject, pyqtSignal
 
+READ_CHUNK = 256 * 1024  # characters read per call, the rest of a burst is read on the next call
 
-def tail_new_content(file, file_position):
-    """Reads new lines from the file since the last read position."""
+
+def tail_new_content(file, file_position, max_chars=READ_CHUNK):
+    """Reads new content from the file since the last read position, at most max_chars at a time."""
     if not file:
         return "", file_position
 
     file.seek(file_position)  # Start from the last position
-    new_content = file.read()  # Read any new content
+    new_content = file.read(max_chars)  # Read new content, bounded so a burst of logging cannot exhaust memory
     file_position = file.tell()  # Update position for the next read
     return new_content, file_position
 
@@ -0,0 +1,163 @@
+import time
+import threading
+
+from PyQt5.QtCore import QFileSystemWatcher, QThread, QTimer, Qt, pyqtSignal
+
+from GUI.model.progress_bar_model import select_lines
+from scripts import eta
+
+FRAME_INTERVAL = 100  # milliseconds between coalesced updates sent to the views
+POLL_INTERVAL = 1.0  # seconds between reads of every file, for file systems where change events are not delivered
+ETA_INTERVAL = 1.0  # seconds between remaining time updates
+
+
+class LogMonitor(QThread):
+    """
+    Tails every info and debug log of a run on one background thread. Change events from QFileSystemWatcher
+    (inotify on Linux) mark files to read; each frame the monitor reads them, parses the debug logs through their
+    ProgressBarModel, and emits everything that changed as one update, so the GUI thread never touches the files.
+
+    Signals
+    -------
+    updated(dict)
+        Emitted at most once per frame with the keys that changed: "logs" maps an info log path to its new text,
+        "progress" maps a debug log path to its latest report, "eta" maps a debug log path to its remaining
+        seconds, and "batch_eta" holds the remaining seconds of the whole batch.
+    """
+    updated = pyqtSignal(dict)
+    """
+    :signal updated: Emitted with the coalesced changes of one frame.
+    """
+
+    def __init__(self, frame_interval=FRAME_INTERVAL):
+        """
+        Initializes the LogMonitor.
+
+        :param frame_interval: Milliseconds between updates.
+        """
+        super().__init__()
+        self.frame_interval = frame_interval
+        self.lock = threading.Lock()  # guards the watched models, held while they are read
+        self.log_models = {}
+        self.progress_models = {}
+        self.dirty = set()
+        self.last_poll = 0.0
+        self.last_eta = 0.0
+        self.watcher = None
+
+    def watch_log(self, model):
+        """
+        Starts tailing an info log.
+
+        :param model: The LogModel of the file.
+        """
+        with self.lock:
+            self.log_models[model.filepath] = model
+            self.dirty.add(model.filepath)
+
+    def watch_progress(self, model):
+        """
+        Starts tailing a debug log and tracking its progress.
+
+        :param model: The ProgressBarModel of the file.
+        """
+        with self.lock:
+            self.progress_models[model.filepath] = model
+            self.dirty.add(model.filepath)
+
+    def unwatch(self, filepath):
+        """
+        Stops tailing a file. Once this returns the monitor no longer reads the file, so its model can be closed.
+
+        :param filepath: Path of the log file.
+        """
+        with self.lock:
+            self.log_models.pop(filepath, None)
+            self.progress_models.pop(filepath, None)
+            self.dirty.discard(filepath)
+
+    def mark_dirty(self, filepath):
+        with self.lock:
+            self.dirty.add(filepath)
+
+    def run(self):
+        """
+        Runs the monitor's event loop. The watcher and timer are created here so their events are handled on this
+        thread, and connected directly as the monitor object itself belongs to the GUI thread.
+        """
+        self.watcher = QFileSystemWatcher()
+        self.watcher.fileChanged.connect(self.mark_dirty, Qt.DirectConnection)
+        timer = QTimer()
+        timer.timeout.connect(self.tick, Qt.DirectConnection)
+        timer.start(self.frame_interval)
+        self.exec_()
+        timer.stop()
+        self.watcher = None
+
+    def stop(self):
+        """
+        Stops the monitor thread and waits for it to finish.
+        """
+        self.quit()
+        self.wait()
+
+    def sync_watcher(self, paths):
+        """
+        Watches the given paths and nothing else. Paths that were dropped by the watcher, e.g. when a log was
+        rotated, or that did not exist yet are added again.
+        """
+        watched = set(self.watcher.files())
+        missing = [p for p in paths if p not in watched]
+        stale = [p for p in watched if p not in paths]
+        if missing:
+            self.watcher.addPaths(missing)
+        if stale:
+            self.watcher.removePaths(stale)
+
+    def read_progress(self, model):
+        """
+        Parses the new lines of a debug log, stopping at the first line that ends the job.
+
+        :param model: The ProgressBarModel of the file.
+        :return: The latest report, or None if nothing relevant was logged.
+        """
+        new_data = None
+        for line in select_lines(model.read_new_lines()):
+            new_data = model.fetch_data(line)
+            if new_data.get("section", "ERROR") in ("ERROR", "COMPLETED"):
+                self.progress_models.pop(model.filepath, None)
+                break
+        return new_data
+
+    def tick(self):
+        """
+        Reads the changed files and emits their updates as one signal.
+        """
+        now = time.monotonic()
+        update = {}
+        with self.lock:
+            if now - self.last_poll >= POLL_INTERVAL:
+                self.last_poll = now
+                self.dirty.update(self.log_models, self.progress_models)
+            self.sync_watcher(set(self.log_models) | set(self.progress_models))
+            dirty, self.dirty = self.dirty, set()
+
+            for path in dirty:
+                if path in self.log_models:
+                    content = self.log_models[path].read_new_content()
+                    if content:
+                        update.setdefault("logs", {})[path] = content
+                        self.dirty.add(path)  # reads are bounded, read again next frame until caught up
+                if path in self.progress_models:
+                    report = self.read_progress(self.progress_models[path])
+                    if report is not None:
+                        update.setdefault("progress", {})[path] = report
+                        self.dirty.add(path)
+
+            if now - self.last_eta >= ETA_INTERVAL and self.progress_models:
+                self.last_eta = now
+                estimators = [m.estimator for m in self.progress_models.values()]
+                update["eta"] = {path: m.estimator.remaining(now) for path, m in self.progress_models.items()}
+                update["batch_eta"] = eta.batch_remaining(estimators, now)
+        if update:
+            self.updated.emit(update)
@@ -0,0 +1,88 @@
+PAGE_LINES = 1000  # lines per page of the full log viewer
+
+
+class LogPagerModel:
+    """
+    Reads a log file one page at a time, so a log of any size can be browsed without loading it.
+
+    Attributes
+    ----------
+    filepath : str
+        Path to the log file.
+    page_lines : int
+        Number of lines per page.
+    offsets : list
+        Byte offset of the start of each page found so far, extended as later pages are requested.
+    """
+
+    def __init__(self, filepath, page_lines=PAGE_LINES):
+        """
+        Initialize the LogPagerModel instance.
+
+        Parameters
+        ----------
+        filepath : str
+            Path to the log file.
+        page_lines : int, optional
+            Number of lines per page. Defaults to PAGE_LINES.
+        """
+        self.filepath = filepath
+        self.page_lines = page_lines
+        self.offsets = [0]
+
+    def index_to(self, page):
+        """
+        Finds the start of pages up to the given one, or up to the end of the file, continuing from the last page
+        found. The file may still be growing, so the end is never cached.
+
+        Parameters
+        ----------
+        page : int
+            Page number, or -1 to index the whole file.
+
+        Returns
+        -------
+        bool
+            True if the end of the file was reached.
+        """
+        with open(self.filepath, "rb") as file:
+            file.seek(self.offsets[-1])
+            while page < 0 or len(self.offsets) <= page:
+                for _ in range(self.page_lines):
+                    if not file.readline():
+                        return True
+                if not file.peek(1):
+                    return True  # a page ending exactly at the end of the file does not start another
+                self.offsets.append(file.tell())
+            return False
+
+    def page(self, number):
+        """
+        Reads one page of the log.
+
+        Parameters
+        ----------
+        number : int
+            Page number starting at 0, or -1 for the last page. Numbers past the end give the last page.
+
+        Returns
+        -------
+        tuple
+            The text of the page, its number, the number of pages found so far, and whether that is all of them.
+
+        Raises
+        ------
+        OSError
+            If the file cannot be read.
+        """
+        complete = self.index_to(number)
+        number = len(self.offsets) - 1 if number < 0 else min(number, len(self.offsets) - 1)
+        lines = []
+        with open(self.filepath, "rb") as file:
+            file.seek(self.offsets[number])
+            for _ in range(self.page_lines):
+                line = file.readline()
+                if not line:
+                    break
+                lines.append(line)
+        return b"".join(lines).decode("utf-8", errors="replace"), number, len(self.offsets), complete
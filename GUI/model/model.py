@@ -1,20 +1,52 @@
+import glob
 import json
 import os
-import re
+import signal
 import subprocess
+import threading
 import time
-import psutil
+from collections import deque
 
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
 
-class Model:
+from GUI.model.app_config import AppConfig
+from scripts import manifest
+
+STARTUP_TIMEOUT = 120  # seconds the driver has to report ready before the run is reported as failed
+STDERR_LINES = 20  # last lines of the driver's stderr kept for failure reports
+TERM_GRACE = 0.5  # seconds the processes of a cancelled run have to exit before they are killed
+KILL_GRACE = 0.5  # seconds to wait for killed processes to exit
+CANCEL_POLL = 0.02  # seconds between checks for remaining processes
+
+
+class Model(QObject):
     """
     The `Model` class provides functionality for managing configurations, handling CPU cores,
     managing license configurations, and executing the backend script. It is designed to facilitate
     the setup, monitoring, and termination of processes within a project.
 
+    The driver reports on its stdout, one JSON event per line, read on a background thread: "ready" once its
+    workers run, with the log locations, and "failed" if it cannot start.
+
     :param project_root: The root directory of the project.
     :type project_root: Path
     """
+    driver_ready = pyqtSignal(dict)
+    """
+    :signal driver_ready: Emitted with the driver's ready event: pid, execution folder and log config.
+    """
+    driver_failed = pyqtSignal(str)
+    """
+    :signal driver_failed: Emitted with the reason when the driver fails, exits or times out before it is ready.
+    """
+    driver_event = pyqtSignal(dict)
+    """
+    :signal driver_event: Emitted with every other event the driver publishes.
+    """
+    driver_exited = pyqtSignal(int)
+    """
+    :signal driver_exited: Emitted with the driver's exit code once it has been ready.
+    """
 
     def __init__(self, project_root):
         """
@@ -23,15 +55,25 @@ class Model:
         :param project_root: Root directory of the project.
         :type project_root: Path
         """
+        super().__init__()
         self.project_root = project_root
         self.backend_config_folder = project_root / "config"
         self.create_config_folder()
         self.app_config_path = project_root / "app_config.json"
+        self.app_config = AppConfig(self.app_config_path)
         self.log_config_file = os.path.join(self.backend_config_folder, "log_config.json")
+        self.manifest_file = os.path.join(self.backend_config_folder, manifest.MANIFEST_NAME)
+        self.sequences = []  # the sequence configs of the last manifest written
         self.num_sequences = 0
         self.license = ""
         self.cpu_cores = os.cpu_count()
         self.process = None
+        self.output_folder_path = ""
+        self.ready = None  # the driver's ready event
+        self.stderr_tail = deque(maxlen=STDERR_LINES)
+        self.startup_timer = QTimer()
+        self.startup_timer.setSingleShot(True)
+        self.startup_timer.timeout.connect(self.startup_timed_out)
 
     def config_exists(self) -> bool:
         """
@@ -40,29 +82,25 @@ class Model:
         :return: True if the configuration file exists, otherwise False.
         :rtype: bool
         """
-        return self.app_config_path.exists()
+        return self.app_config.exists()
 
     def load_config(self) -> dict:
         """
         Loads the application configuration as a dictionary.
 
-        :return: The loaded configuration or an empty dictionary if the file does not exist.
+        :return: A copy of the cached configuration or an empty dictionary if the file does not exist.
         :rtype: dict
         """
-        if not self.config_exists():
-            return {}
-        with open(self.app_config_path, "r") as file:
-            return json.load(file)
+        return self.app_config.load()
 
     def save_config(self, config: dict):
         """
-        Saves the given configuration to the application configuration file.
+        Saves the given configuration to the application configuration file, atomically.
 
         :param config: Configuration data to save.
         :type config: dict
         """
-        with open(self.app_config_path, "w") as file:
-            json.dump(config, file, indent=4)
+        self.app_config.save(config)
 
     def clean_config_folder(self):
         """
@@ -73,13 +111,12 @@ class Model:
 
     def read_app_config(self):
         """
-        Reads and loads the application configuration into the instance attributes.
+        Reads the application configuration, from memory unless the file changed, into the instance attributes.
         """
         try:
-            with open(self.app_config_path, "r") as config_file:
-                config = json.load(config_file)
-                self.license = config.get("RAWCOOKED_LICENSE_VERSION", "No license information")
-                self.cpu_cores = config.get("CPU_CORES", os.cpu_count())
+            config = self.app_config.read()
+            self.license = config.get("RAWCOOKED_LICENSE_VERSION", "No license information")
+            self.cpu_cores = config.get("CPU_CORES", os.cpu_count())
         except (FileNotFoundError, json.JSONDecodeError):
             self.cpu_cores = os.cpu_count()  # Default to all available cores
             return "Config file read error"
@@ -111,19 +148,7 @@ class Model:
         :param license_version: License version to write. Use an empty string to remove the license.
         :type license_version: str
         """
-        try:
-            with open(self.app_config_path, "r") as config_file:
-                config = json.load(config_file)
-        except (FileNotFoundError, json.JSONDecodeError):
-            config = {}
-
-        if license_version:  # Set or update the license
-            config["RAWCOOKED_LICENSE_VERSION"] = license_version
-        else:  # Remove the license
-            config["RAWCOOKED_LICENSE_VERSION"] = ""
-
-        with open(self.app_config_path, "w") as config_file:
-            json.dump(config, config_file, indent=4)
+        self.app_config.update({"RAWCOOKED_LICENSE_VERSION": license_version or ""})
 
     def set_cpu_cores(self, cores):
         """
@@ -132,18 +157,9 @@ class Model:
         :param cores: The number of CPU cores to set.
         :type cores: int
         """
-        try:
-            with open(self.app_config_path, "r") as config_file:
-                config = json.load(config_file)
-        except (FileNotFoundError, json.JSONDecodeError):
-            config = {}
-
-        config["CPU_CORES"] = cores
+        self.app_config.update({"CPU_CORES": cores})
         self.cpu_cores = cores
 
-        with open(self.app_config_path, "w") as config_file:
-            json.dump(config, config_file, indent=4)
-
     def set_policy(self, policy_name, policy_path):
         """
         Sets or updates the specified policy file path in the configuration.
@@ -153,12 +169,10 @@ class Model:
         :param policy_path: File path to the policy.
         :type policy_path: str
         """
-        config = self.load_config()
         if policy_path:
-            config[policy_name] = policy_path
+            self.app_config.update({policy_name: policy_path})
         else:
-            config.pop(policy_name, None)
-        self.save_config(config)
+            self.app_config.update(remove=(policy_name,))
 
     def read_policy(self, policy_name) -> str:
         """
@@ -170,9 +184,7 @@ class Model:
         :rtype: str
         """
         try:
-            with open(self.app_config_path, "r") as config_file:
-                config = json.load(config_file)
-                return config.get(policy_name, f"No policy specified for: {policy_name}")
+            return self.app_config.read().get(policy_name, f"No policy specified for: {policy_name}")
         except FileNotFoundError:
             return "Config file not found"
         except json.JSONDecodeError:
@@ -190,6 +202,7 @@ class Model:
         :rtype: str
         """
         self.num_sequences = num_sequences
+        self.output_folder_path = output_folder_path
         driver_data = {
             "output_folder_path": output_folder_path,
             "sequence_count": self.num_sequences,
@@ -202,23 +215,22 @@ class Model:
         print("Data saved to: driver_config.json")
         return driver_config_file
 
-    def create_worker_config(self, row_index, row_data):
+    def create_sequence_manifest(self, table_data):
         """
-        Creates a worker configuration file for a specific row of data.
+        Writes the configuration of every sequence to the manifest in the backend configuration folder, in one
+        atomic write, see manifest.write_manifest. Worker i of the driver runs record i.
 
-        :param row_index: Index of the row.
-        :type row_index: int
-        :param row_data: Data associated with the row.
-        :type row_data: dict
+        :param table_data: One dict per sequence, in table order.
+        :type table_data: list
+        :return: Path to the manifest.
+        :rtype: str
+        :raises RuntimeError: If the manifest cannot be written.
         """
-        if self.license == "":
-            self.read_app_config()
-        row_data.update({"license": self.license})
-
-        sequence_config_file = os.path.join(self.backend_config_folder, f"sequence_{row_index}.json")
-        with open(sequence_config_file, "w") as json_file:
-            json.dump(row_data, json_file, indent=4)
-            print(f"Data saved to: {sequence_config_file}")
+        license_version = self.get_license_config()
+        self.sequences = [dict(row_data, license=license_version) for row_data in table_data]
+        manifest.write_manifest(self.manifest_file, self.sequences)
+        print(f"Data saved to: {self.manifest_file}")
+        return self.manifest_file
 
     def get_sequence_name(self, seq_num) -> str:
         """
@@ -229,20 +241,20 @@ class Model:
         :return: Path to the sequence folder.
         :rtype: str
         """
-        sequence_config_file = os.path.join(self.backend_config_folder, f"sequence_{seq_num}.json")
-        with open(sequence_config_file, "r") as json_file:
-            seq_configs = json.load(json_file)
-        return seq_configs["sequence_folder_path"]
+        return self.sequences[int(seq_num)]["sequence_folder_path"]
 
-    def get_log_files(self) -> dict:
+    def get_log_files(self, log_configs=None) -> dict:
         """
         Retrieves log file paths for each sequence.
 
+        :param log_configs: The log config published by the driver, read from the log config file if not given.
+        :type log_configs: dict
         :return: A mapping of sequence names to their debug and info log file paths.
         :rtype: dict
         """
-        with open(self.log_config_file, "r") as json_file:
-            log_configs = json.load(json_file)
+        if log_configs is None:
+            with open(self.log_config_file, "r") as json_file:
+                log_configs = json.load(json_file)
         seq_log_map = {}
         for worker_num, worker_log_files in log_configs["workers"].items():
             seq_name = self.get_sequence_name(worker_num)
@@ -251,22 +263,77 @@ class Model:
             seq_log_map[seq_name] = (debug_log_file, info_log_file)
         return seq_log_map
 
-    def run(self) -> dict:
+    def run(self):
         """
-        Starts the backend process and waits for log configuration files to be created.
-
-        :return: Log file mapping for sequences.
-        :rtype: dict
+        Starts the backend process and returns immediately. Its events are read on background threads and
+        reported through driver_ready, driver_failed, driver_event and driver_exited.
         """
         driver_script = self.project_root / "scripts" / "driver.py"
+        self.ready = None
+        self.stderr_tail.clear()
         self.process = subprocess.Popen(
             ['/bin/python3', driver_script, '--config', f'{self.backend_config_folder}'],
-            stdout=subprocess.PIPE, text=True
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1,
+            start_new_session=True,  # its own process group, so a cancel reaches every process of the run
         )
-        while not os.path.exists(self.log_config_file):
-            print("Waiting for logs")
-            time.sleep(1)
-        return self.get_log_files()
+        stderr_reader = threading.Thread(target=self.read_stderr, args=(self.process,), name="driver_stderr", daemon=True)
+        stderr_reader.start()
+        threading.Thread(
+            target=self.read_events, args=(self.process, stderr_reader), name="driver_events", daemon=True
+        ).start()
+        self.startup_timer.start(STARTUP_TIMEOUT * 1000)
+
+    def read_events(self, process, stderr_reader):
+        """
+        Reads the driver's stdout until it exits, emitting its events. Runs on a background thread.
+
+        :param process: The driver process.
+        :type process: subprocess.Popen
+        :param stderr_reader: The thread draining the driver's stderr, joined before a failure is reported.
+        :type stderr_reader: threading.Thread
+        """
+        for line in process.stdout:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue  # not an event, e.g. output of a tool
+            if not isinstance(event, dict):
+                continue
+            if event.get("event") == "ready" and self.ready is None:
+                self.ready = event
+                self.driver_ready.emit(event)
+            elif event.get("event") == "failed" and self.ready is None:
+                self.driver_failed.emit(event.get("error", "driver failed"))
+                self.ready = {}  # reported, the exit is not a second failure
+            else:
+                self.driver_event.emit(event)
+        return_code = process.wait()
+        if process is not self.process:
+            return  # a previous run
+        if self.ready is None:
+            stderr_reader.join(timeout=1)
+            stderr = "\n".join(self.stderr_tail)
+            self.driver_failed.emit(f"driver exited with code {return_code} before starting workers\n{stderr}".strip())
+        else:
+            self.driver_exited.emit(return_code)
+
+    def read_stderr(self, process):
+        """
+        Drains the driver's stderr so it never blocks, keeping the last lines for failure reports.
+
+        :param process: The driver process.
+        :type process: subprocess.Popen
+        """
+        for line in process.stderr:
+            self.stderr_tail.append(line.rstrip())
+
+    def startup_timed_out(self):
+        """
+        Reports a driver that is still running but has not reported ready within STARTUP_TIMEOUT.
+        """
+        if self.ready is None and self.process is not None and self.process.poll() is None:
+            self.ready = {}
+            self.driver_failed.emit(f"driver did not start its workers within {STARTUP_TIMEOUT} seconds")
 
     def create_config_folder(self):
         """
@@ -275,43 +342,76 @@ class Model:
         if not os.path.exists(self.backend_config_folder):
             os.mkdir(self.backend_config_folder)
 
-    def get_execution_dir(self):
-        """
-        Returns the execution directory of where the output is being written
+    def signal_group(self, signal_number):
         """
-        with open(self.log_config_file, "r") as json_file:
-            log_configs = json.load(json_file)
-        log_path = log_configs["output"]["workers"]
-        print(log_path)
-        match = re.search(r'/execution[^/]+', log_path)
+        Sends a signal to the driver's process group: the driver, its workers and the tools they run.
 
-        if match:
-            folder_name = match.group(0)
-            return folder_name.strip('/')
+        :param signal_number: The signal to send.
+        :type signal_number: int
+        """
+        try:
+            os.killpg(self.process.pid, signal_number)
+        except ProcessLookupError:
+            pass  # every process of the group has exited
 
-    def cancel(self):
+    def wait_group(self, timeout) -> bool:
         """
-        Cancels the backend process by terminating it and ensuring all processes with
-        'driver.py' in their command line are killed.
+        Waits for every process of the driver's process group to exit.
+
+        :param timeout: Seconds to wait.
+        :type timeout: float
+        :return: True if the group is gone, False if processes remain after the timeout.
+        :rtype: bool
         """
-        if self.process:
-            self.process.terminate()
+        deadline = time.monotonic() + timeout
+        while True:
+            self.process.poll()  # reap the driver, a zombie still counts as a member of the group
             try:
-                self.process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                print("Force killing backend process...")
-                self.process.kill()
-        exec_dir = self.get_execution_dir()
-        for proc in psutil.process_iter():
+                os.killpg(self.process.pid, 0)
+            except ProcessLookupError:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(CANCEL_POLL)
+
+    def pending_restores(self) -> list:
+        """
+        Lists the sequences a cancelled run moved for processing and did not move back, from the staging records
+        workers keep in their working directories.
+
+        :return: The staging records of the sequences to restore: source, destination and method.
+        :rtype: list
+        """
+        records = []
+        working_directory = os.path.join(self.output_folder_path, "working_directory")
+        for record_path in glob.glob(os.path.join(working_directory, "*", "staging.json")):
             try:
-                cmdline = proc.cmdline()
-                if cmdline and any("driver.py" in arg for arg in cmdline):
-                    print(f"Killing process {proc.pid} with command line: {cmdline}")
-                    proc.kill()
-                elif cmdline and any(exec_dir in arg for arg in cmdline):
-                    print(f"Killing process {proc.pid} with command line: {cmdline}")
-                    proc.kill()
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                pass
-        else:
+                with open(record_path, "r") as json_file:
+                    record = json.load(json_file)
+            except (OSError, ValueError):
+                continue
+            if record.get("method") == "rename" and os.path.exists(record["destination"]):
+                records.append(record)
+        return records
+
+    def cancel(self) -> list:
+        """
+        Cancels the backend process and everything it started. The driver runs in its own session, so its
+        workers and their tools share its process group: the group is sent SIGTERM and, if processes remain after
+        TERM_GRACE seconds, SIGKILL. No other process on the host is touched.
+
+        :return: The staging records of the sequences that need restoring, see pending_restores.
+        :rtype: list
+        """
+        if not self.process:
             print("No backend process is running.")
+            return []
+        self.startup_timer.stop()
+        if self.ready is None:
+            self.ready = {}  # cancelled, exiting before ready is not a failure to start
+        self.signal_group(signal.SIGTERM)
+        if not self.wait_group(TERM_GRACE):
+            print("Force killing backend process group...")
+            self.signal_group(signal.SIGKILL)
+            self.wait_group(KILL_GRACE)
+        return self.pending_restores() if self.output_folder_path else []
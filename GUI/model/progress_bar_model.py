@@ -1,38 +1,98 @@
 import re
 import os
+import json
 
 from PyQt5.QtCore import QObject, pyqtSignal
 
+from scripts import eta, history
 
-def tail_new_content(file, file_position):
+# section markers whose stage differs from the estimator's stage names
+ETA_STAGES = {"setup": "staging", "clean up": "restore"}
+
+READ_CHUNK = 256 * 1024  # characters read from the log at a time
+MAX_CHUNKS = 16  # chunks read per poll, a worker that logs faster is caught up on the next polls
+
+# cheap substring checks run on every line before any regex, see select_lines
+KEY_MARKERS = ("---", "sequence length", "sequence format", "ERROR", "clean up complete")
+PROGRESS_MARKERS = ("run_rawcooked", "check_v2")
+
+TEXT_PATTERN = re.compile(
+    r"(?P<timestamp>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) \[(?P<function>[^\]]+)\]:(?P<process_id>\d+) ("
+    r"?P<level>\w+) - (?P<message>.*)"
+)
+ANALYSIS_PATTERN = re.compile(r"Analyzing files \((\d+(\.\d+)?)%\)")
+RAWCOOKED_PATTERN = re.compile(r"frame=\s*(\d+).*bitrate=([\d.]+)kbits/s")
+FPS_PATTERN = re.compile(r"fps=\s*([\d.]+)")
+REVERSIBILITY_PATTERN = re.compile(r"\bTime=\d{2}:\d{2}:\d{2} \((\d+(\.\d+)?)%\)")
+SEQUENCE_LENGTH_PATTERN = re.compile(r"sequence length:\s*(\d+)")
+SEQUENCE_FORMAT_PATTERN = re.compile(r"sequence format:\s*(\d+)x(\d+) (\d+) bit")
+STAGE_PATTERN = re.compile(r"---starting (.+?)---")
+
+
+def tail_new_content(file, file_position, max_chars=READ_CHUNK):
     """
-    Reads new lines from the file since the last read position.
+    Reads new content from the file since the last read position, at most max_chars at a time.
 
     :param file: The file object to read from.
     :param file_position: The position in the file to start reading from.
+    :param max_chars: The maximum number of characters to read.
     :return: A tuple containing the new content and the updated file position.
     """
     if not file:
         return "", file_position
 
     file.seek(file_position)  # Start from the last position
-    new_content = file.read()  # Read any new content
+    new_content = file.read(max_chars)  # Read new content, bounded so a burst of logging cannot exhaust memory
     file_position = file.tell()  # Update position for the next read
     return new_content, file_position
 
 
+def select_lines(lines):
+    """
+    Picks the lines the progress report depends on with substring checks, so most lines are never parsed.
+    Consecutive progress lines are collapsed to the last one, as only the latest frame count is displayed.
+
+    :param lines: Complete log lines in file order.
+    :return: The lines to parse, in file order.
+    """
+    selected = []
+    pending = None  # last progress line not yet followed by a key line
+    for line in lines:
+        if any(marker in line for marker in KEY_MARKERS):
+            if pending is not None:
+                selected.append(pending)
+                pending = None
+            selected.append(line)
+        elif any(marker in line for marker in PROGRESS_MARKERS):
+            pending = line
+    if pending is not None:
+        selected.append(pending)
+    return selected
+
+
 def split_message(message: str) -> dict:
     """
     Splits a log message into its components.
 
-    :param message: The log message as a string.
+    :param message: The log message as a string, either a detailed text line or a JSON line.
     :return: A dictionary containing components of the log message.
     """
-    pattern: str = (
-        r"(?P<timestamp>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) \[(?P<function>[^\]]+)\]:(?P<process_id>\d+) ("
-        r"?P<level>\w+) - (?P<message>.*)"
-    )
-    match = re.match(pattern, message)
+    if message.startswith("{"):
+        try:
+            entry: dict = json.loads(message)
+        except ValueError:
+            return {}
+        result = {
+            "timestamp": entry.get("timestamp", ""),
+            "function": entry.get("function", ""),
+            "process_id": str(entry.get("pid", "")),
+            "level": entry.get("level", ""),
+            "stage": entry.get("stage"),
+            "message": {"INFO": "", "DEBUG": "", "ERROR": "", entry.get("level", ""): entry.get("message", "")},
+        }
+        return result
+
+    match = TEXT_PATTERN.match(message)
     result = {}
     if match:
         result = match.groupdict()
@@ -54,8 +114,7 @@ def search_analysis(message: str) -> (str, float):
     :param message: The log message as a string.
     :return: A tuple with the description and progress percentage, or an empty tuple.
     """
-    pattern = r"Analyzing files \((\d+(\.\d+)?)%\)"
-    match = re.search(pattern, message)
+    match = ANALYSIS_PATTERN.search(message)
 
     if match:
         number = match.group(1)  # Extract the number from the capturing group
@@ -71,8 +130,7 @@ def search_rawcooked(message: str) -> (str, float):
     :param message: The log message as a string.
     :return: A tuple with the description and frame number, or an empty tuple.
     """
-    pattern = r"frame=\s*(\d+).*bitrate=([\d.]+)kbits/s"
-    match = re.search(pattern, message)
+    match = RAWCOOKED_PATTERN.search(message)
 
     if match:
         frame_number = match.group(1)  # Extract the frame number
@@ -82,6 +140,19 @@ def search_rawcooked(message: str) -> (str, float):
         return ()
 
 
+def search_fps(message: str) -> float:
+    """
+    Searches for the encoding speed in a RAWCooked progress line.
+
+    :param message: The log message as a string.
+    :return: The frames per second, or None if the line has no speed.
+    """
+    match = FPS_PATTERN.search(message)
+    if match:
+        return float(match.group(1))
+    return None
+
+
 def search_reversibility(message: str) -> (str, float):
     """
     Searches for reversibility check progress in a log message.
@@ -89,8 +160,7 @@ def search_reversibility(message: str) -> (str, float):
     :param message: The log message as a string.
     :return: A tuple with the description and progress percentage, or an empty tuple.
     """
-    pattern = r"\bTime=\d{2}:\d{2}:\d{2} \((\d+(\.\d+)?)%\)"
-    match = re.search(pattern, message)
+    match = REVERSIBILITY_PATTERN.search(message)
 
     if match:
         percentage = match.group(1)  # Extract the percentage number
@@ -106,7 +176,7 @@ def get_sequence_length(message: str) -> (str, float):
     :param message: The log message as a string.
     :return: A tuple with the description and sequence length, or an empty tuple.
     """
-    match = re.search(r'sequence length:\s*(\d+)', message)
+    match = SEQUENCE_LENGTH_PATTERN.search(message)
     if match:
         sequence_length = int(match.group(1))
         print("Sequence Length", sequence_length)
@@ -151,6 +221,8 @@ def get_section_status(section):
         "---dpx rawcook complete---": "Finished Transcoding with RAWCooked",
         "---starting dpx post rawcook---": "Running Post Processing Checks",
         "---dpx post rawcook complete----": "Completed Post Processing Checks",
+        "---starting dpx verify---": "Verifying Reversibility",
+        "---dpx verify complete---": "Verified Reversibility",
         "---starting clean up---": "Running Clean Up",
         "---clean up complete---": "Completed Clean Up",
         "---success---": "Successfully Completed",
@@ -176,6 +248,8 @@ class ProgressBarModel(QObject):
         The open file object for the log file, or None if no file is open.
     file_position: int
         Tracks the position in the file for reading new content.
+    partial: str
+        Trailing line not yet terminated by a newline, completed by the next read.
     total_frames:int
         Total number of frames being processed for this sequence
 
@@ -201,6 +275,7 @@ class ProgressBarModel(QObject):
         self.progress_value = 0.0  # Initialize dummy progress value at 0.0
         self.file = None
         self.file_position = 0  # Keep track of the current read position in the file
+        self.partial = ""
         try:
             self.open_file()
         except FileNotFoundError:
@@ -210,6 +285,7 @@ class ProgressBarModel(QObject):
             error_message = f"Unexpected error: {str(e)}"
             self.progress_error.emit(error_message, 100)
         self.total_frames = 0
+        self.estimator = eta.JobEstimator()
 
     def open_file(self, start_from_end=False):
         """
@@ -226,18 +302,57 @@ class ProgressBarModel(QObject):
                 self.file.seek(0)  # Start reading from the beginning
                 self.file_position = 0
 
-    def read_new_content(self):
+    def read_chunks(self):
         """
-        Reads new lines from the log file.
+        Reads up to MAX_CHUNKS chunks of new content from the log file.
 
         :return: The new content read from the file.
         """
+        chunks = []
+        for _ in range(MAX_CHUNKS):
+            chunk, self.file_position = tail_new_content(self.file, self.file_position)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            if len(chunk) < READ_CHUNK:
+                break
+        return "".join(chunks)
+
+    def read_new_lines(self):
+        """
+        Reads the complete lines added to the log file since the last read. A trailing partial line is kept and
+        completed by the next read.
+
+        :return: A list of new lines without line endings.
+        """
         if not self.file:
             self.progress_error.emit("Error: Debug Log File Not Found", 100)
-            return ""
+            return []
+
+        new_content = self.read_chunks()
+        if not new_content and self.log_rotated():
+            # the worker rotated its debug log, continue from the start of the new file
+            self.close_file()
+            self.file_position = 0
+            self.partial = ""
+            self.open_file()
+            new_content = self.read_chunks()
+        if not new_content:
+            return []
+        lines = (self.partial + new_content).split("\n")
+        self.partial = lines.pop()
+        return lines
+
+    def log_rotated(self) -> bool:
+        """
+        Checks whether the log file path now refers to a different file than the one being read.
 
-        new_content, self.file_position = tail_new_content(self.file, self.file_position)
-        return new_content
+        :return: True if the log was rotated, False otherwise.
+        """
+        try:
+            return os.stat(self.filepath).st_ino != os.fstat(self.file.fileno()).st_ino
+        except OSError:
+            return False  # moved to the output folder at the end of the run
 
     def close_file(self):
         """
@@ -258,11 +373,18 @@ class ProgressBarModel(QObject):
         try:
             section: str = component["message"]["INFO"]
             if "sequence length" in section:
-                self.total_frames = int(re.search(r'sequence length:\s*(\d+)', section).group(1))
+                self.total_frames = int(SEQUENCE_LENGTH_PATTERN.search(section).group(1))
+                self.estimator.set_frames(self.total_frames)
+            if "sequence format" in section:
+                self.set_priors(section)
+            stage = STAGE_PATTERN.match(section)
+            if stage:
+                self.estimator.start_stage(ETA_STAGES.get(stage.group(1), stage.group(1)))
             report["section"] = get_section_status(section) if section.startswith("---") else report["section"]
             if component["level"] == "DEBUG" and component["function"] in ("run_rawcooked", "check_v2"):
                 name, value = parse_debug(component["message"]["DEBUG"])
                 if name == "Processing Frames":
+                    self.estimator.update_progress(int(value), search_fps(component["message"]["DEBUG"]))
                     value = int(value) / self.total_frames * 100
                 report["progress"]["name"] = name
                 report["progress"]["value"] = value
@@ -270,6 +392,17 @@ class ProgressBarModel(QObject):
             raise RuntimeError from e
         return report
 
+    def set_priors(self, section: str):
+        """
+        Seeds the remaining time estimate with the run history of sequences of the same format.
+
+        :param section: The "sequence format: <width>x<height> <bit depth> bit" log message.
+        """
+        match = SEQUENCE_FORMAT_PATTERN.search(section)
+        if match:
+            width, height, bit_depth = (int(x) for x in match.groups())
+            self.estimator.set_priors(history.stage_priors(eta.STAGES, width, height, bit_depth))
+
     def get_component(self, message: str, report: dict) -> (dict, dict):
         """
         Parses a log message and updates the progress report.
@@ -281,7 +414,7 @@ class ProgressBarModel(QObject):
         component = split_message(message + " ")  # space to account for empty logs
         if not component:
             print(f"parse fail: {message}")
-            return component
+            return component, report
 
         try:
             if component != " ":
@@ -308,6 +441,7 @@ class ProgressBarModel(QObject):
             return {"level": "NO_UPDATE"}
 
         if "clean up complete" in line:
+            self.estimator.finish()
             return {"level": "FINISHED_PROCESSING"}
 
         # Parse each line
@@ -0,0 +1,61 @@
+import time
+import threading
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from scripts import discovery
+
+BATCH_INTERVAL = 0.2  # seconds between batches of found sequences sent to the table
+
+
+class SequenceScanner(QThread):
+    """
+    Searches a directory tree for DPX sequences on a background thread, see discovery.find_sequences, and streams
+    them to the GUI in batches as they are found.
+
+    Signals
+    -------
+    found(list)
+        Emitted with a batch of (sequence folder, number of frames, bytes) tuples.
+    scan_finished(int, bool)
+        Emitted with the number of sequences found and whether the scan was cancelled.
+    """
+    found = pyqtSignal(list)
+    """
+    :signal found: Emitted with a batch of sequences.
+    """
+    scan_finished = pyqtSignal(int, bool)
+    """
+    :signal scan_finished: Emitted when the scan ends.
+    """
+
+    def __init__(self, root):
+        """
+        Initializes the SequenceScanner.
+
+        :param root: Path to the directory to search.
+        """
+        super().__init__()
+        self.root = root
+        self.cancel_event = threading.Event()
+
+    def run(self):
+        count = 0
+        batch = []
+        sent = time.monotonic()
+        for path, frames, size in discovery.find_sequences(self.root, self.cancel_event):
+            batch.append((str(path), frames, size))
+            count += 1
+            if time.monotonic() - sent >= BATCH_INTERVAL:
+                self.found.emit(batch)
+                batch = []
+                sent = time.monotonic()
+        if batch:
+            self.found.emit(batch)
+        self.scan_finished.emit(count, self.cancel_event.is_set())
+
+    def cancel(self):
+        """
+        Asks the scan to stop, it ends after the directory entry being read.
+        """
+        self.cancel_event.set()
@@ -0,0 +1,64 @@
+from PyQt5.QtCore import QObject, QTimer
+
+from scripts import eta
+
+REDRAW_INTERVAL = 1000  # ms between dashboard redraws, however often status events arrive
+
+
+class DashboardPresenter(QObject):
+    """
+    Feeds the dashboard from the driver's status events. Events only update the model, the view is redrawn on a
+    fixed timer and only if an event arrived since the last redraw.
+    """
+
+    def __init__(self, model, view):
+        super().__init__()
+        self.model = model
+        self.view = view
+        self.timer = QTimer()
+        self.timer.setInterval(REDRAW_INTERVAL)
+        self.timer.timeout.connect(self.redraw)
+
+    def start(self):
+        """Clears the dashboard for a new run and starts redrawing it."""
+        self.model.reset()
+        self.redraw()
+        self.timer.start()
+
+    def stop(self):
+        """Stops redrawing, the last figures stay on screen."""
+        self.timer.stop()
+        self.redraw()
+
+    def on_driver_event(self, event):
+        if event.get("event") == "status":
+            self.model.update(event)
+
+    def redraw(self):
+        if not self.model.dirty:
+            return
+        self.model.dirty = False
+        status = self.model.status
+        jobs = self.model.jobs()
+        self.view.set_value("fps", f"{status.get('fps', 0.0):.1f}")
+        self.view.set_value("mbps", f"{self.model.history['mbps'][-1]:.1f}" if self.model.history["mbps"] else "--")
+        self.view.set_value(
+            "cpu", f"{status.get('cpu_percent', 0.0):.0f}% (workers {status.get('worker_cpu_percent', 0.0):.0f}%)"
+            if status else "--",
+            warning=self.model.under_utilised(),
+        )
+        self.view.set_value(
+            "memory", f"{status.get('memory_percent', 0.0):.0f}% (workers {status.get('worker_rss_bytes', 0) / 1e9:.1f} GB)"
+            if status else "--"
+        )
+        self.view.set_value("jobs", f"{jobs['queued']} / {jobs['running']}")
+        self.view.set_value("results", f"{jobs['done']} / {jobs['failed']}", warning=jobs["failed"] > 0)
+        self.view.set_value("eta", eta.format_duration(status.get("batch_eta")))
+        for key in ("fps", "mbps", "cpu"):
+            self.view.set_history(key, self.model.history[key])
+        self.view.set_jobs([
+            f"{job.get('sequence') or job.get('pid')}: {job.get('stage', '')}"
+            + (f" {job['fps']:.1f} fps" if job.get("fps") else "")
+            + (f" {job['percent']:.0f}%" if job.get("percent") is not None else "")
+            for job in self.model.running()
+        ])
@@ -1,45 +1,51 @@
-from PyQt5.QtCore import QTimer, QFileSystemWatcher
+from GUI.model.log_pager_model import LogPagerModel
+from GUI.view.log_pager_view import LogPagerView
 
 
 class LogPresenter:
-    def __init__(self, model, view):
+    def __init__(self, model, view, monitor):
         self.model = model
         self.view = view
+        self.monitor = monitor  # LogMonitor that reads the log on its own thread
+        self.pager_model = None
+        self.pager_view = None
         model.log_error.connect(self.handle_file_not_found)
-        self.file_watcher = QFileSystemWatcher()  # Watches for file changes
-        self.timer = QTimer()  # Fallback timer for polling
-        self.timer.timeout.connect(self.update_log)
-        self.file_watcher.fileChanged.connect(self.file_changed)  # Detect file changes
+        view.full_log_requested.connect(self.open_full_log)
 
     def handle_file_not_found(self, error_string):
         self.view.append_log_content(error_string)
         self.stop_tailing()
 
     def start_tailing_log(self):
-        """Starts reading the log and watching for changes."""
-        file_path = self.model.filepath
-        initial_content = self.model.read_new_content()
-        self.view.append_log_content(initial_content)
-        self.file_watcher.addPath(file_path)
-        self.timer.start(100)  # Fallback timer every 1 second
+        """Registers the log with the monitor, which sends new content to show_content."""
+        self.monitor.watch_log(self.model)
 
     def update_log(self, cancel_str=""):
-        """Fallback to poll the log for changes every second."""
+        """Appends a status message to the log view."""
         if cancel_str != "":
             self.view.append_log_content(cancel_str)
-        new_content = self.model.read_new_content()
-        if new_content:
-            self.view.append_log_content(new_content)
 
-    def file_changed(self, path):
-        """Handles the event when the log file is modified externally."""
-        # print(f"File changed: {path}")
-        new_content = self.model.read_new_content()
+    def show_content(self, new_content):
+        """Appends content read by the monitor."""
         if new_content:
             self.view.append_log_content(new_content)
 
+    def open_full_log(self):
+        """Opens a window that pages through the whole log file, reading one page at a time."""
+        self.pager_model = LogPagerModel(self.model.filepath)
+        self.pager_view = LogPagerView(self.model.filepath, self.view)
+        self.pager_view.page_requested.connect(self.show_page)
+        self.show_page(0)
+        self.pager_view.show()
+
+    def show_page(self, number):
+        """Reads a page of the full log and shows it in the pager."""
+        try:
+            self.pager_view.show_page(*self.pager_model.page(number))
+        except OSError as e:
+            self.pager_view.show_error(f"Error: could not read {self.model.filepath}: {e}")
+
     def stop_tailing(self):
         """Stops the log tailing process."""
-        self.timer.stop()
-        self.file_watcher.removePaths(self.file_watcher.files())
+        self.monitor.unwatch(self.model.filepath)
         self.model.close()
@@ -1,14 +1,9 @@
 import os.path
 
-from GUI.view.about_view import AboutView
-from GUI.model.log_model import LogModel
-from GUI.view.log_view import LogView
-from GUI.presenter.log_presenter import LogPresenter
-from GUI.presenter.preferences_presenter import PreferencesPresenter
-from GUI.model.progress_bar_model import ProgressBarModel
-from GUI.view.progress_bar_view import ProgressBarView
-from GUI.presenter.progress_bar_presenter import ProgressPresenter
-from GUI.view.preferences_view import PreferencesView
+from PyQt5.QtWidgets import QApplication
+
+# The dialogs, the scanner and the log and progress machinery are imported where they are first used, so they do not
+# delay the first paint of the main window.
 
 
 class Presenter:
@@ -30,6 +25,18 @@ class Presenter:
         self.log_presenters = []
         self.progress_presenters = []
         self.preferences_presenter = None
+        self.log_monitor = None  # Tails every log on one background thread, created on the first run
+        self.dashboard_presenter = None  # Created with the dashboard on the first run
+        QApplication.instance().aboutToQuit.connect(self.stop_log_monitor)
+        QApplication.instance().aboutToQuit.connect(self.stop_scan)
+        self.scanner = None
+        self.scanned_folders = set()
+        self.scanned_names = set()
+        self.scan_duplicates = 0
+        self.view.scan_button.clicked.connect(self.toggle_scan)
+        self.model.driver_ready.connect(self.on_driver_ready)
+        self.model.driver_failed.connect(self.on_driver_failed)
+        self.model.driver_exited.connect(self.on_driver_exited)
         self.view.run_button.clicked.connect(lambda: self.run_backend())
         self.view.cancel_button.clicked.connect(lambda: self.cancel_backend())
 
@@ -37,10 +44,13 @@ class Presenter:
         self.license_version = self.model.get_license_config()
         self.current_cpu_cores = self.model.get_cpu_cores()
         if action == "About Clicked":
+            from GUI.view.about_view import AboutView
             self.about_window = AboutView("Sous Chef\n "
                                           "For troubleshooting please reach out to uscdr.mediapres@gmail.com")
             self.about_window.exec_()
         elif action == "Preferences Clicked":
+            from GUI.view.preferences_view import PreferencesView
+            from GUI.presenter.preferences_presenter import PreferencesPresenter
             self.preferences_window = PreferencesView(self.folder_table.default_dpx_policy,
                                                       self.folder_table.default_mkv_policy,
                                                       os.cpu_count(),
@@ -53,27 +63,100 @@ class Presenter:
         self.folder_table.default_dpx_policy = self.model.read_policy("DPX_POLICY")
         self.folder_table.default_mkv_policy = self.model.read_policy("MKV_POLICY")
 
+    def toggle_scan(self):
+        """Starts scanning a root folder for sequences, or cancels the running scan."""
+        if self.scanner is not None:
+            self.scanner.cancel()
+            return
+        root = self.view.select_scan_root()
+        if not root:
+            return
+        from GUI.model.sequence_scanner import SequenceScanner
+        self.scanned_folders = self.folder_table.table_model.folders()
+        self.scanned_names = {os.path.basename(folder) for folder in self.scanned_folders}
+        self.scan_duplicates = 0
+        self.scanner = SequenceScanner(root)
+        self.scanner.found.connect(self.on_sequences_found)
+        self.scanner.scan_finished.connect(self.on_scan_finished)
+        self.view.set_scanning(True)
+        self.view.statusBar().showMessage(f"Scanning {root} for sequences...")
+        self.scanner.start()
+
+    def stop_scan(self):
+        """Cancels a running scan and waits for its thread to end."""
+        if self.scanner is not None:
+            self.scanner.cancel()
+            self.scanner.wait()
+
+    def on_sequences_found(self, sequences):
+        """
+        Adds a batch of scanned sequences to the table, skipping folders already in it and folders named like one in
+        it: outputs, logs and reports are named after the folder, so two jobs of the same name would overwrite each
+        other.
+        """
+        table_model = self.folder_table.table_model
+        jobs = []
+        for folder, frames, size in sequences:
+            if folder in self.scanned_folders:
+                continue
+            self.scanned_folders.add(folder)
+            if os.path.basename(folder) in self.scanned_names:
+                self.scan_duplicates += 1
+                continue
+            self.scanned_names.add(os.path.basename(folder))
+            jobs.append(table_model.new_job(folder, self.folder_table.default_dpx_policy,
+                                            self.folder_table.default_mkv_policy, frames, size))
+        table_model.add_jobs(jobs)
+        self.view.statusBar().showMessage(f"Scanning... {self.folder_table.rowCount()} sequences in the table")
+
+    def on_scan_finished(self, count, cancelled):
+        self.scanner.wait()
+        self.scanner = None
+        self.view.set_scanning(False)
+        status = "Scan cancelled" if cancelled else "Scan complete"
+        skipped = f", {self.scan_duplicates} skipped with a name already in the table" if self.scan_duplicates else ""
+        self.view.statusBar().showMessage(f"{status}: {count} sequences found{skipped}", 10000)
+
     def create_config_files(self):
         self.num_sequences = self.view.get_row_count()
         output_folder = self.view.get_output_folder()
         if self.num_sequences and output_folder != "":
             self.driver_config_file = self.model.create_driver_config(output_folder, self.num_sequences)
-            table_data = self.folder_table.get_table_data()
-            for row_index, row_data in enumerate(table_data):
-                self.model.create_worker_config(row_index, row_data)
+            try:
+                self.model.create_sequence_manifest(self.folder_table.get_table_data())
+            except RuntimeError as e:
+                self.driver_config_file = None
+                self.view.show_error("Could not start", str(e))
+
+    def init_log_monitor(self):
+        """Creates the log monitor on the first run."""
+        if self.log_monitor is None:
+            from GUI.model.log_monitor import LogMonitor
+            self.log_monitor = LogMonitor()
+            self.log_monitor.updated.connect(self.on_monitor_update)
+
+    def stop_log_monitor(self):
+        if self.log_monitor is not None:
+            self.log_monitor.stop()
 
     def start_log_widget(self, seq_file_name, log_file_name):
+        from GUI.model.log_model import LogModel
+        from GUI.view.log_view import LogView
+        from GUI.presenter.log_presenter import LogPresenter
         log_view = LogView(seq_file_name)
         log_model = LogModel(log_file_name)
-        log_presenter = LogPresenter(log_model, log_view)
+        log_presenter = LogPresenter(log_model, log_view, self.log_monitor)
         self.log_presenters.append(log_presenter)
         self.view.log_layout.addWidget(log_view)
         log_presenter.start_tailing_log()
 
     def start_progress_bar_widget(self, seq_file_name, log_file_name):
+        from GUI.model.progress_bar_model import ProgressBarModel
+        from GUI.view.progress_bar_view import ProgressBarView
+        from GUI.presenter.progress_bar_presenter import ProgressPresenter
         progress_view = ProgressBarView(seq_file_name)
         progress_model = ProgressBarModel(log_file_name)
-        progress_presenter = ProgressPresenter(progress_model, progress_view)
+        progress_presenter = ProgressPresenter(progress_model, progress_view, self.log_monitor)
         self.progress_presenters.append(progress_presenter)
         self.view.progress_layout.addWidget(progress_view)
         progress_presenter.progress_ended.connect(self.on_progress_bar_ended)
@@ -84,6 +167,23 @@ class Presenter:
         if self.folder_table.rowCount() == 0:
             self.view.run_button.setEnabled(True)
             self.view.cancel_button.setEnabled(False)
+            self.view.statusBar().clearMessage()
+
+    def on_monitor_update(self, update):
+        """Dispatches one frame of log updates from the monitor to the log and progress widgets."""
+        for log_presenter in self.log_presenters:
+            if log_presenter.model.filepath in update.get("logs", {}):
+                log_presenter.show_content(update["logs"][log_presenter.model.filepath])
+        for progress_presenter in self.progress_presenters:
+            filepath = progress_presenter.model.filepath
+            if filepath in update.get("progress", {}):
+                progress_presenter.show_progress(update["progress"][filepath])
+            if filepath in update.get("eta", {}):
+                progress_presenter.show_eta(update["eta"][filepath])
+        if "batch_eta" in update and self.view.cancel_button.isEnabled():
+            from scripts import eta
+            # The longest remaining job
+            self.view.statusBar().showMessage(f"Batch remaining: {eta.format_duration(update['batch_eta'])}")
 
     def run_backend(self):
         if self.view.check_valid_output_folder(self.view.get_output_folder()):
@@ -96,28 +196,70 @@ class Presenter:
                 self.model.clean_config_folder()
             self.create_config_files()
             if self.driver_config_file is not None:
-                self.log_files = self.model.run()
-                for seq_name, log_files in self.log_files.items():
-                    debug_log_file = log_files[0]
-                    info_log_file = log_files[1]
-                    self.start_log_widget(seq_name, info_log_file)
-                    self.start_progress_bar_widget(seq_name, debug_log_file)
+                self.log_files = {}
+                self.model.run()
+                self.view.statusBar().showMessage("Starting...")
+            else:
+                self.view.run_button.setEnabled(True)
+                self.view.cancel_button.setEnabled(False)
+
+    def on_driver_ready(self, ready):
+        """Starts the log and progress widgets once the driver reports its workers are running."""
+        self.log_files = self.model.get_log_files(ready["log_config"])
+        self.init_log_monitor()
+        self.view.init_run_panels()
+        self.start_dashboard()
+        for seq_name, log_files in self.log_files.items():
+            debug_log_file = log_files[0]
+            info_log_file = log_files[1]
+            self.start_log_widget(seq_name, info_log_file)
+            self.start_progress_bar_widget(seq_name, debug_log_file)
+        if not self.log_monitor.isRunning():
+            self.log_monitor.start()
+        self.view.statusBar().showMessage(f"Running in {ready['execution']}")
+
+    def start_dashboard(self):
+        """Creates the dashboard presenter on the first run and starts feeding it the driver's status events."""
+        if self.dashboard_presenter is None:
+            from GUI.model.dashboard_model import DashboardModel
+            from GUI.presenter.dashboard_presenter import DashboardPresenter
+            self.dashboard_presenter = DashboardPresenter(DashboardModel(), self.view.dashboard_view)
+            self.model.driver_event.connect(self.dashboard_presenter.on_driver_event)
+        self.dashboard_presenter.start()
+
+    def on_driver_exited(self, return_code):
+        """Stops redrawing the dashboard once the run is over."""
+        if self.dashboard_presenter is not None:
+            self.dashboard_presenter.stop()
+
+    def on_driver_failed(self, error):
+        """Reports a driver that failed before starting its workers and lets the user run again."""
+        self.view.statusBar().clearMessage()
+        self.view.show_error("The run could not start", error)
+        self.view.run_button.setEnabled(True)
+        self.view.cancel_button.setEnabled(False)
 
     def cancel_backend(self):
         log_file_info = ""
-        for seq_name, log_files in self.log_files.items():
+        for seq_name, log_files in (self.log_files or {}).items():
             log_file_info += seq_name + ": " + log_files[0] + "\n"
 
         if self.view.show_cancel_dialog(log_file_info):
             for log_presenter in self.log_presenters:
-                log_presenter.update_log("Process Cancelled by User")
                 log_presenter.stop_tailing()
+                log_presenter.update_log("Process Cancelled by User")
 
             for progress_bar_presenter in self.progress_presenters:
-                progress_bar_presenter.update_ui_with_data("Process Cancelled by User")
                 progress_bar_presenter.stop_tailing()
+                progress_bar_presenter.cancel_progress()
 
-            self.model.cancel()
+            restores = self.model.cancel()
+            if restores:
+                self.view.show_error(
+                    "These sequences were moved for processing and must be moved back to their folders",
+                    "\n".join(f"{r['destination']} -> {r['source']}" for r in restores),
+                )
+            self.view.statusBar().clearMessage()
 
             self.view.cancel_button.setEnabled(False)
             self.view.run_button.setEnabled(True)
@@ -0,0 +1,126 @@
+from PyQt5.QtCore import Qt, QPointF
+from PyQt5.QtGui import QPainter, QPen, QColor, QPolygonF, QFontDatabase
+from PyQt5.QtWidgets import QWidget, QGridLayout, QLabel, QPlainTextEdit, QVBoxLayout, QFrame
+
+
+class SparklineView(QWidget):
+    """
+    Draws a series as a small line chart, scaled from 0 to a fixed maximum or to the largest value.
+    """
+
+    def __init__(self, maximum=None, parent=None):
+        """
+        Initializes the SparklineView.
+
+        :param maximum: Top of the scale, e.g. 100 for a percentage, None to scale to the largest value.
+        :param parent: The parent widget.
+        """
+        super().__init__(parent)
+        self.maximum = maximum
+        self.values = []
+        self.setMinimumSize(120, 28)
+
+    def set_values(self, values):
+        """
+        Replaces the series and repaints.
+
+        :param values: The values, oldest first.
+        """
+        self.values = list(values)
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        rect = self.rect().adjusted(1, 1, -1, -1)
+        painter.setPen(QPen(QColor("#c0c0c0"), 1))
+        painter.drawLine(rect.bottomLeft(), rect.bottomRight())
+        if len(self.values) < 2:
+            return
+        top = self.maximum or max(self.values) or 1
+        step = rect.width() / (len(self.values) - 1)
+        line = QPolygonF([
+            QPointF(rect.left() + i * step, rect.bottom() - min(value, top) / top * rect.height())
+            for i, value in enumerate(self.values)
+        ])
+        area = QPolygonF(line)
+        area.append(QPointF(rect.right(), rect.bottom()))
+        area.append(QPointF(rect.left(), rect.bottom()))
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor(76, 175, 80, 60))
+        painter.drawPolygon(area)
+        painter.setPen(QPen(QColor("#4CAF50"), 1.5))
+        painter.drawPolyline(line)
+
+
+class DashboardView(QWidget):
+    """
+    Overview of a run: total fps, disk throughput and CPU with their recent history, memory, jobs by state, the
+    remaining time of the batch, and the stage and speed of every running job.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.values = {}
+        grid = QGridLayout()
+        grid.setContentsMargins(0, 0, 0, 0)
+        rows = [
+            ("fps", "Total FPS"),
+            ("mbps", "Disk MB/s"),
+            ("cpu", "CPU"),
+            ("memory", "Memory"),
+            ("jobs", "Queued / Running"),
+            ("results", "Done / Failed"),
+            ("eta", "Batch Remaining"),
+        ]
+        self.sparklines = {"fps": SparklineView(), "mbps": SparklineView(), "cpu": SparklineView(maximum=100)}
+        for row, (key, title) in enumerate(rows):
+            grid.addWidget(QLabel(title + ":"), row, 0)
+            self.values[key] = QLabel("--")
+            self.values[key].setAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            grid.addWidget(self.values[key], row, 1)
+            if key in self.sparklines:
+                grid.addWidget(self.sparklines[key], row, 2)
+        grid.setColumnStretch(2, 1)
+
+        self.jobs_text = QPlainTextEdit()
+        self.jobs_text.setReadOnly(True)
+        self.jobs_text.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.jobs_text.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self.jobs_text.setMaximumBlockCount(1000)
+
+        frame = QFrame()
+        frame.setFrameStyle(QFrame.StyledPanel)
+        frame.setLayout(grid)
+        layout = QVBoxLayout()
+        layout.addWidget(frame)
+        layout.addWidget(self.jobs_text)
+        self.setLayout(layout)
+
+    def set_value(self, key, text, warning=False):
+        """
+        Updates one figure.
+
+        :param key: The figure: fps, mbps, cpu, memory, jobs, results or eta.
+        :param text: The text to show.
+        :param warning: Highlights the figure, e.g. a machine that is not fully used.
+        """
+        self.values[key].setText(text)
+        self.values[key].setStyleSheet("color: #d08000; font-weight: bold;" if warning else "")
+
+    def set_history(self, key, values):
+        """
+        Updates the sparkline of a figure.
+
+        :param key: The figure: fps, mbps or cpu.
+        :param values: Its recent values, oldest first.
+        """
+        self.sparklines[key].set_values(values)
+
+    def set_jobs(self, lines):
+        """
+        Replaces the list of running jobs.
+
+        :param lines: One line per job.
+        """
+        self.jobs_text.setPlainText("\n".join(lines))
@@ -1,159 +1,137 @@
-import os.path
+from PyQt5.QtCore import Qt, QEvent, QPersistentModelIndex, QRect, QSize, QTimer
+from PyQt5.QtWidgets import QTableView, QHeaderView, QStyledItemDelegate, QStyle, QStyleOptionButton, \
+    QStyleOptionViewItem, QApplication, QFileDialog
 
-from PyQt5.QtCore import Qt, pyqtSignal, QEvent
-from PyQt5.QtWidgets import QTableWidget, QHeaderView, QLabel, QCheckBox, QWidget, QHBoxLayout, QSizePolicy, \
-    QPushButton, QFileDialog
-from pathlib import Path
+from GUI.model.folder_table_model import FolderTableModel, CHECK_COLUMNS, POLICY_COLUMNS, DELETE_COLUMN
 
 
-class FolderTableView(QTableWidget):
+def is_click(event):
+    return event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton
+
+
+def draw_button(painter, rect, text, enabled=True):
+    """Paints a push button, so a cell looks like the widget without creating one per row."""
+    button = QStyleOptionButton()
+    button.rect = rect
+    button.text = text
+    button.state = QStyle.State_Enabled | QStyle.State_Raised if enabled else QStyle.State_Raised
+    QApplication.style().drawControl(QStyle.CE_PushButton, button, painter)
+
+
+class CheckBoxDelegate(QStyledItemDelegate):
+    """Paints a centered check box, toggled by a click anywhere in the cell."""
+
+    def paint(self, painter, option, index):
+        QApplication.style().drawPrimitive(QStyle.PE_PanelItemViewItem, option, painter, option.widget)
+        check_box = QStyleOptionButton()
+        size = QApplication.style().subElementRect(QStyle.SE_CheckBoxIndicator, check_box, option.widget).size()
+        check_box.rect = QRect(option.rect.center().x() - size.width() // 2,
+                               option.rect.center().y() - size.height() // 2, size.width(), size.height())
+        checked = index.data(Qt.CheckStateRole) == Qt.Checked
+        check_box.state = QStyle.State_Enabled | (QStyle.State_On if checked else QStyle.State_Off)
+        QApplication.style().drawControl(QStyle.CE_CheckBox, check_box, painter)
+
+    def editorEvent(self, event, model, option, index):
+        if is_click(event):
+            checked = index.data(Qt.CheckStateRole) == Qt.Checked
+            return model.setData(index, Qt.Unchecked if checked else Qt.Checked, Qt.CheckStateRole)
+        return False
+
+
+class PolicyPathDelegate(QStyledItemDelegate):
+    """Paints the policy file name with a "Change" button that opens a file dialog."""
+
+    def button_rect(self, option):
+        width = option.fontMetrics.horizontalAdvance("Change") + 16
+        return QRect(option.rect.right() - width, option.rect.top() + 1, width, option.rect.height() - 2)
+
+    def paint(self, painter, option, index):
+        text_option = QStyleOptionViewItem(option)
+        text_option.rect = option.rect.adjusted(0, 0, -self.button_rect(option).width(), 0)
+        super().paint(painter, text_option, index)
+        draw_button(painter, self.button_rect(option), "Change", bool(index.flags() & Qt.ItemIsEnabled))
+
+    def sizeHint(self, option, index):
+        hint = super().sizeHint(option, index)
+        return QSize(hint.width() + self.button_rect(option).width(), hint.height())
+
+    def editorEvent(self, event, model, option, index):
+        if is_click(event) and self.button_rect(option).contains(event.pos()):
+            new_policy_file_path, _ = QFileDialog.getOpenFileName(option.widget, "Select Policy File")
+            if new_policy_file_path:
+                return model.setData(index, new_policy_file_path)
+            return True
+        return False
+
+
+class DeleteButtonDelegate(QStyledItemDelegate):
+    """Paints an "X" button that removes its row."""
+
+    def paint(self, painter, option, index):
+        size = min(option.rect.height() - 2, 20)
+        draw_button(painter, QRect(option.rect.center().x() - size // 2, option.rect.center().y() - size // 2,
+                                   size, size), "X")
+
+    def sizeHint(self, option, index):
+        return QSize(24, 22)
+
+    def editorEvent(self, event, model, option, index):
+        if is_click(event):
+            # remove once the event is handled, the row may have moved by then
+            row = QPersistentModelIndex(index)
+            QTimer.singleShot(0, lambda: row.isValid() and model.remove_row(row.row()))
+            return True
+        return False
+
+
+class FolderTableView(QTableView):
+    """
+    Table of the sequences to process. The rows are painted by delegates from a FolderTableModel, so adding,
+    removing and exporting thousands of sequences does not create any widgets.
+    """
 
     def __init__(self, parent=None):
         super(FolderTableView, self).__init__(parent)
         self.default_dpx_policy = None
         self.default_mkv_policy = None
 
-        self.setColumnCount(9)
-
-        self.setHorizontalHeaderLabels(
-            ["Folder Path", "Check Gaps", "Check DPX Policy", "DPX Policy Path", "Check MKV Policy", "MKV Policy Path",
-             "Verify MD5 Checksum", "Process In-Place", ""])
+        self.table_model = FolderTableModel(self)
+        self.setModel(self.table_model)
+        self.check_box_delegate = CheckBoxDelegate(self)
+        self.policy_path_delegate = PolicyPathDelegate(self)
+        self.delete_button_delegate = DeleteButtonDelegate(self)
+        for col in CHECK_COLUMNS:
+            self.setItemDelegateForColumn(col, self.check_box_delegate)
+        for col in POLICY_COLUMNS:
+            self.setItemDelegateForColumn(col, self.policy_path_delegate)
+        self.setItemDelegateForColumn(DELETE_COLUMN, self.delete_button_delegate)
 
         self.setShowGrid(True)
+        self.setSelectionMode(QTableView.NoSelection)
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
         self.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
 
         header = self.horizontalHeader()
         header.setSectionResizeMode(QHeaderView.Interactive)
-        for col in range(self.columnCount()):
+        header.setResizeContentsPrecision(100)  # size columns from the first rows, not all of them
+        for col in range(self.table_model.columnCount()):
             header.setSectionResizeMode(col, QHeaderView.ResizeToContents)
+        self.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
 
-    def change_policy_file_path(self, policy_path_label):
-        new_policy_file_path, _ = QFileDialog.getOpenFileName(self, "Select Policy File")
-        if new_policy_file_path:
-            policy_file_name = os.path.basename(new_policy_file_path)
-            policy_path_label.setText(policy_file_name)
-            policy_path_label.setStatusTip(new_policy_file_path)
-
-    def toggle_label(self, state, row_position, col_position):
-        next_widget = self.cellWidget(row_position, col_position + 1)
-        next_label = next_widget.layout().itemAt(0).widget()
-        if state == Qt.Checked:
-            next_label.setEnabled(True)
-        else:
-            next_label.setEnabled(False)
-
-    def eventFilter(self, obj, event):
-        if event.type() == QEvent.MouseButtonPress:
-            if obj.layout() is not None:
-                for i in range(obj.layout().count()):
-                    widget = obj.layout().itemAt(i).widget()
-                    if isinstance(widget, QCheckBox):
-                        widget.toggle()
-                        break
-        return super().eventFilter(obj, event)
-
-    def add_checkbox(self, row_position, col_position, checked=True, next_col_label=False):
-        check_box = QCheckBox()
-        check_box.setChecked(checked)
-        check_box_widget = QWidget()
-        check_box_layout = QHBoxLayout()
-        check_box_layout.addWidget(check_box)
-        check_box_layout.setAlignment(Qt.AlignCenter)
-        check_box_widget.setLayout(check_box_layout)
-
-        self.setCellWidget(row_position, col_position, check_box_widget)
-
-        check_box_widget.installEventFilter(self)
-
-        if next_col_label:
-            check_box.stateChanged.connect(lambda state: self.toggle_label(state, row_position, col_position))
-
-    def add_policy_path_to_table(self, row_position, col_position, policy_path):
-        policy_file_name = os.path.basename(policy_path)
-        if not os.path.isfile(policy_path):
-            policy_file_name = "No policy selected"
-        policy_label = QLabel(policy_file_name)
-        policy_label.setStatusTip(policy_path)
-
-        change_path_button = QPushButton("Change")
-        change_path_button.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Fixed)
-        change_path_button.setFixedSize(change_path_button.sizeHint())
-        change_path_button.clicked.connect(lambda: self.change_policy_file_path(policy_label))
-
-        policy_widget = QWidget()
-        policy_layout = QHBoxLayout()
-        policy_layout.addWidget(policy_label)
-        policy_layout.addWidget(change_path_button)
-        policy_layout.setContentsMargins(1, 1, 1, 1)
-
-        policy_widget.setLayout(policy_layout)
-        self.setCellWidget(row_position, col_position, policy_widget)
-
-    def delete_row(self, button):
-        row_position = self.indexAt(button.parent().pos()).row()
-        self.removeRow(row_position)
+    def add_folder_to_table(self, folder):
+        self.add_folders_to_table([folder])
+
+    def add_folders_to_table(self, folders):
+        """Adds a row per sequence folder with the default settings, in one insertion."""
+        self.table_model.add_jobs(
+            [self.table_model.new_job(folder, self.default_dpx_policy, self.default_mkv_policy) for folder in folders]
+        )
 
     def delete_row_by_name(self, filepath):
-        # Iterate over the rows of the table widget in reverse
-        for row in reversed(range(self.rowCount())):
-            item = self.get_table_data()[row]['sequence_folder_path']
-            if item == filepath:
-                self.removeRow(row)
-
-    def add_delete_button(self, row_position, col_position):
-        delete_widget = QWidget()
-        delete_layout = QHBoxLayout()
-        delete_button = QPushButton("X")
-        delete_button.setFixedSize(delete_button.sizeHint())
-        delete_button.setStyleSheet("padding: 0; margin: 0;")
-        delete_button.setFixedWidth(20)
-        delete_layout.addWidget(delete_button)
-        delete_layout.setContentsMargins(0, 0, 0, 0)
-        delete_widget.setLayout(delete_layout)
-
-        delete_button.clicked.connect(lambda: self.delete_row(delete_button))
-
-        self.setCellWidget(row_position, col_position, delete_widget)
+        self.table_model.remove_folder(filepath)
 
-    def add_folder_to_table(self, folder):
-        row_position = self.rowCount()  # Use self to get the row count
-        self.insertRow(row_position)
-
-        folder_name_label = QLabel()
-        folder_name_label.setText(folder)
-        folder_name_label.setStatusTip(folder)
-        self.setCellWidget(row_position, 0, folder_name_label)
-        self.add_checkbox(row_position, 1)
-        self.add_checkbox(row_position, 2, True, True)
-        self.add_policy_path_to_table(row_position, 3, self.default_dpx_policy)
-        self.add_checkbox(row_position, 4, True, True)
-        self.add_policy_path_to_table(row_position, 5, self.default_mkv_policy)
-        self.add_checkbox(row_position, 6)
-        self.add_checkbox(row_position, 7)
-        self.add_delete_button(row_position, 8)
+    def rowCount(self):
+        return self.table_model.rowCount()
 
     def get_table_data(self):
-        data = []
-        config_keys = ["sequence_folder_path", "gap_check", "dpx_policy_check", "dpx_policy_path", "mkv_policy_check",
-                       "mkv_policy_path", "frame_md5", "in_place"]
-        for row in range(self.rowCount()):
-            row_data = {}
-            for col in range(self.columnCount()-1):  # Ignoring the last column because it is the delete button
-                cell_widget = self.cellWidget(row, col)
-                key = config_keys[col]
-                if cell_widget:
-                    if isinstance(cell_widget, QLabel):
-                        row_data[key] = cell_widget.text()
-                    elif isinstance(cell_widget, QWidget):
-                        for child in cell_widget.children():
-                            if isinstance(child, QLabel):
-                                row_data[key] = child.statusTip()
-                            elif isinstance(child, QCheckBox):
-                                row_data[key] = child.isChecked()
-                    else:
-                        row_data[key] = None
-                else:
-                    row_data[key] = None
-            data.append(row_data)
-        return data
+        return self.table_model.get_jobs()
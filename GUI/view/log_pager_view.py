@@ -0,0 +1,57 @@
+import os.path
+
+from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QPlainTextEdit, QLabel
+
+
+class LogPagerView(QDialog):
+    page_requested = pyqtSignal(int)
+    """
+    :signal page_requested: Emitted with the page number to show, -1 for the last page.
+    """
+
+    def __init__(self, filename, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Full Log: " + os.path.basename(filename))
+        self.resize(900, 600)
+        self.current_page = 0
+
+        self.log_display = QPlainTextEdit(self)
+        self.log_display.setReadOnly(True)
+        self.log_display.setUndoRedoEnabled(False)
+        self.page_label = QLabel()
+        self.page_label.setAlignment(Qt.AlignCenter)
+
+        self.first_button = QPushButton("First")
+        self.previous_button = QPushButton("Previous")
+        self.next_button = QPushButton("Next")
+        self.last_button = QPushButton("Last")
+        self.first_button.clicked.connect(lambda: self.page_requested.emit(0))
+        self.previous_button.clicked.connect(lambda: self.page_requested.emit(max(self.current_page - 1, 0)))
+        self.next_button.clicked.connect(lambda: self.page_requested.emit(self.current_page + 1))
+        self.last_button.clicked.connect(lambda: self.page_requested.emit(-1))
+
+        buttons = QHBoxLayout()
+        buttons.addWidget(self.first_button)
+        buttons.addWidget(self.previous_button)
+        buttons.addWidget(self.page_label)
+        buttons.addWidget(self.next_button)
+        buttons.addWidget(self.last_button)
+        layout = QVBoxLayout()
+        layout.addWidget(self.log_display)
+        layout.addLayout(buttons)
+        self.setLayout(layout)
+
+    def show_page(self, text, number, pages_found, complete):
+        """Replaces the displayed text with a page of the log."""
+        self.current_page = number
+        self.log_display.setPlainText(text)
+        self.page_label.setText(f"Page {number + 1} of {pages_found}" + ("" if complete else "+"))
+        self.next_button.setEnabled(not complete or number < pages_found - 1)
+        self.previous_button.setEnabled(number > 0)
+        self.first_button.setEnabled(number > 0)
+
+    def show_error(self, message):
+        """Shows why the log could not be read."""
+        self.log_display.setPlainText(message)
+        self.page_label.setText("")
@@ -1,29 +1,66 @@
 import os.path
 
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QPushButton, QTextEdit, QFileDialog, QLabel
+from PyQt5.QtCore import QTimer, pyqtSignal
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QPlainTextEdit, QLabel
 from PyQt5.QtGui import QTextCursor
 
+MAX_BLOCKS = 5000  # lines kept in the widget, older lines are dropped; the whole file is in the full log viewer
+
 
 class LogView(QWidget):
+    full_log_requested = pyqtSignal()
+    """
+    :signal full_log_requested: Emitted when the user asks to page through the whole log file.
+    """
+
     def __init__(self, filename, parent=None):
         super().__init__(parent)
-        # Text edit to display log contents
+        # Plain text display, bounded to the last MAX_BLOCKS lines so memory stays constant on long runs
         self.filename = filename
         self.log_label = QLabel("Info Log: " + os.path.basename(self.filename))
         self.log_label.setToolTip(filename)
-        self.log_display = QTextEdit(self)
+        self.log_display = QPlainTextEdit(self)
         self.log_display.setReadOnly(True)
+        self.log_display.setUndoRedoEnabled(False)
+        self.log_display.setMaximumBlockCount(MAX_BLOCKS)
+        self.full_log_button = QPushButton("Open Full Log")
+        self.full_log_button.clicked.connect(self.full_log_requested.emit)
+
+        # Content appended between two repaints is inserted at once
+        self.pending = []
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.timeout.connect(self.flush_log_content)
 
         # Layout
+        header = QHBoxLayout()
+        header.addWidget(self.log_label)
+        header.addStretch()
+        header.addWidget(self.full_log_button)
         layout = QVBoxLayout()
-        layout.addWidget(self.log_label)
+        layout.addLayout(header)
         layout.addWidget(self.log_display)
         self.setLayout(layout)
 
     def append_log_content(self, content):
-        """Appends the log content to the text area."""
-        self.log_display.moveCursor(QTextCursor.End)  # Move to the end before appending
-        self.log_display.insertPlainText(content)
-        self.log_display.ensureCursorVisible()  # Ensure the new content is visible
-
+        """Queues log content to be appended to the text area on the next event loop pass."""
+        self.pending.append(content)
+        if not self.flush_timer.isActive():
+            self.flush_timer.start(0)
 
+    def flush_log_content(self):
+        """Appends the queued content in one insertion, keeping the view at the bottom if it was there."""
+        content = "".join(self.pending)
+        self.pending = []
+        if not content:
+            return
+        lines = content.split("\n")
+        if len(lines) > MAX_BLOCKS:
+            content = "\n".join(lines[-MAX_BLOCKS:])  # lines the widget would drop right away
+        scroll_bar = self.log_display.verticalScrollBar()
+        at_bottom = scroll_bar.value() == scroll_bar.maximum()
+        cursor = self.log_display.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(content)
+        if at_bottom:
+            scroll_bar.setValue(scroll_bar.maximum())
@@ -27,12 +27,21 @@ class ProgressBarView(QWidget):
         self.progress_bar.setFormat("Frame Number: %p%")
 
         layout.addWidget(self.progress_bar)
+
+        # Label for the remaining time estimate
+        self.eta_label = QLabel("Remaining: --")
+        self.eta_label.setAlignment(Qt.AlignRight)
+        layout.addWidget(self.eta_label)
         self.setLayout(layout)
 
     def set_section_text(self, text):
         """Updates the section label text."""
         self.section_label.setText(text)
 
+    def set_eta_text(self, text):
+        """Updates the remaining time label text."""
+        self.eta_label.setText(f"Remaining: {text}")
+
     def update_progress_bar(self, progress_name, value):
         """Updates the progress bar format and value."""
         if "Error" in progress_name or "Cancel" in progress_name:
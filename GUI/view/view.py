@@ -101,6 +101,7 @@ class View(QMainWindow):
         self.init_toolbar()
 
         self.folder_button = QPushButton("Select Folders to Cook")
+        self.scan_button = QPushButton("Scan Root for Sequences")
         self.output_button = QPushButton("Select Output Folder")
         self.output_folder = ""
         self.output_folder_label = QLabel()
@@ -115,12 +116,14 @@ class View(QMainWindow):
 
         self.folder_table = FolderTableView(self)
 
-        self.log_container = QWidget()
-        self.log_layout = QVBoxLayout(self.log_container)
-
-        self.progress_container = QWidget()
-        self.progress_layout = QVBoxLayout(self.progress_container)
+        # The dashboard, log and progress panels are created on the first run, see init_run_panels
+        self.dashboard_view = None
+        self.log_container = None
+        self.log_layout = None
+        self.progress_container = None
+        self.progress_layout = None
 
+        self.left_splitter = None
         self.splitter = None
 
         layout = QVBoxLayout()
@@ -134,8 +137,6 @@ class View(QMainWindow):
         self.setCentralWidget(central_widget)
         self.add_connections()
 
-        self.showMaximized()
-
     def load_styles(self):
         """
         Load the QSS stylesheet for the application.
@@ -188,11 +189,12 @@ class View(QMainWindow):
          Initialize the buttons widget with layout and alignment.
          """
         change_button_size_policy(self.folder_button)
+        change_button_size_policy(self.scan_button)
         change_button_size_policy(self.output_button)
         change_button_size_policy(self.output_folder_label)
         change_button_size_policy(self.run_button)
 
-        left_layout = create_button_layout(self.folder_button, alignment=Qt.AlignLeft)
+        left_layout = create_button_layout(self.folder_button, self.scan_button, alignment=Qt.AlignLeft)
 
         right_layout = create_button_layout(self.output_button, self.output_folder_label, alignment=Qt.AlignRight)
         spacer = QSpacerItem(40, 20, QSizePolicy.Expanding, QSizePolicy.Minimum)
@@ -211,39 +213,51 @@ class View(QMainWindow):
 
     def init_splitter(self):
         """
-        Initialize the main splitter containing folder table, progress, and logs.
+        Initialize the main splitter containing the folder table, the progress and log panels are added on the
+        first run.
         """
-        left_top_frame = self.folder_table
-        left_bottom_frame = self.progress_container
+        self.left_splitter = QSplitter(Qt.Vertical)
+        self.left_splitter.addWidget(self.folder_table)
+
+        self.splitter = QSplitter(Qt.Horizontal)
+        self.splitter.addWidget(self.left_splitter)
+        self.splitter.addWidget(self.buttons_widget)
+
+        self.buttons_widget.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+
+        # Add stretch factors if necessary
+        self.splitter.setStretchFactor(0, 1)  # Allow left splitter to stretch
+
+    def init_run_panels(self):
+        """
+        Create the dashboard, progress and log panels, once.
+        """
+        if self.log_container is not None:
+            return
+        from GUI.view.dashboard_view import DashboardView
+        self.dashboard_view = DashboardView()
+        self.left_splitter.addWidget(self.dashboard_view)
+
+        self.progress_container = QWidget()
+        self.progress_layout = QVBoxLayout(self.progress_container)
 
         # Make left bottom frame scrollable
         left_bottom_scroll_area = QScrollArea()
         left_bottom_scroll_area.setWidgetResizable(True)
-        left_bottom_scroll_area.setWidget(left_bottom_frame)
-
-        left_splitter = QSplitter(Qt.Vertical)
-        left_splitter.addWidget(left_top_frame)
-        left_splitter.addWidget(left_bottom_scroll_area)
-        left_splitter.setSizes([150, 120])
+        left_bottom_scroll_area.setWidget(self.progress_container)
+        self.left_splitter.addWidget(left_bottom_scroll_area)
+        self.left_splitter.setSizes([150, 120, 120])
 
-        # right_frame = self.log_container
+        self.log_container = QWidget()
+        self.log_layout = QVBoxLayout(self.log_container)
         right_frame_scroll_area = QScrollArea()
         right_frame_scroll_area.setWidgetResizable(True)
         self.log_container.setMinimumWidth(150)
         right_frame_scroll_area.setWidget(self.log_container)
 
-        self.splitter = QSplitter(Qt.Horizontal)
-        self.splitter.addWidget(left_splitter)
-        self.splitter.addWidget(right_frame_scroll_area)
-        self.splitter.addWidget(self.buttons_widget)
+        self.splitter.insertWidget(1, right_frame_scroll_area)
         self.splitter.setSizes([350, 150, 20])
-
-        self.buttons_widget.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
-
-        # Add stretch factors if necessary
-        self.splitter.setStretchFactor(0, 1)  # Allow left splitter to stretch
         self.splitter.setStretchFactor(1, 1)  # Allow right frame (logs) to stretch
-        self.splitter.setStretchFactor(2, 0)  # Fix the size of the buttons widget
 
     def select_folders(self):
         """
@@ -254,6 +268,28 @@ class View(QMainWindow):
             self.folder_policy_details.emit()
             self.folder_table.add_folder_to_table(folder)
 
+    def select_scan_root(self):
+        """
+        Open a dialog to select a folder to search for DPX sequences.
+
+        :return: Path to the selected folder, empty if the dialog was cancelled.
+        :rtype: str
+        """
+        folder = QFileDialog.getExistingDirectory(self, "Select Root Folder to Scan for Sequences")
+        if folder:
+            self.folder_policy_details.emit()
+        return folder
+
+    def set_scanning(self, scanning):
+        """
+        Switch the scan button between starting and cancelling a scan.
+
+        :param scanning: Whether a scan is running.
+        :type scanning: bool
+        """
+        self.scan_button.setText("Cancel Scan" if scanning else "Scan Root for Sequences")
+        self.scan_button.adjustSize()
+
     def check_valid_output_folder(self, folder):
         """
         Check if the output folder is valid and handle conflicts.
@@ -330,6 +366,17 @@ class View(QMainWindow):
             return ""
         return self.output_folder
 
+    def show_error(self, title, message):
+        """
+        Show an error dialog.
+
+        :param title: Summary of the error.
+        :type title: str
+        :param message: Details of the error.
+        :type message: str
+        """
+        QMessageBox.critical(self, "Error", f"{title}:\n{message}")
+
     def show_cancel_dialog(self, log_files):
         """
         Show a dialog to confirm cancellation of the current run.
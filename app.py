@@ -1,22 +1,91 @@
+import time
+
+STARTED = time.perf_counter()  # before Qt and the GUI are imported, the baseline of the startup benchmark
+
+import json
 import os
 import sys
 from pathlib import Path
 
+from PyQt5.QtCore import QObject, QEvent, QTimer
 from PyQt5.QtWidgets import QApplication
 from GUI.model.model import Model
-from GUI.view.preferences_view import PreferencesView
 from GUI.view.view import View
 from GUI.presenter.presenter import Presenter
 
+BENCHMARK_OPTION = "--benchmark-startup"
+
+
+def get_benchmark_output(argv):
+    """
+    Reads the startup benchmark option, --benchmark-startup or --benchmark-startup=FILE.
+
+    :param argv: Command line arguments.
+    :return: None if the option is not given, otherwise the file to append the result to, empty to only print it.
+    """
+    for arg in argv[1:]:
+        if arg == BENCHMARK_OPTION:
+            return ""
+        if arg.startswith(BENCHMARK_OPTION + "="):
+            return arg[len(BENCHMARK_OPTION) + 1:]
+    return None
+
+
+class StartupBenchmark(QObject):
+    """
+    Measures the time from process start to the first paint of the main window, then reports it and quits.
+    The result is printed as one JSON line, and appended to a file if one is given, to track it across changes.
+    """
+
+    def __init__(self, output):
+        """
+        Initializes the StartupBenchmark.
+
+        :param output: File to append the result to, empty to only print it.
+        """
+        super().__init__()
+        self.output = output
+        self.marks = {}
+
+    def mark(self, name):
+        """
+        Records the time a startup step ended.
+
+        :param name: Name of the step.
+        """
+        self.marks[name] = round((time.perf_counter() - STARTED) * 1000, 1)
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Paint and "first_paint_ms" not in self.marks:
+            self.mark("first_paint_ms")
+            QTimer.singleShot(0, self.report)  # after the paint completes
+        return False
+
+    def report(self):
+        result = json.dumps({"time": time.strftime("%Y-%m-%dT%H:%M:%S"), **self.marks})
+        print(result, flush=True)
+        if self.output:
+            with open(self.output, "a") as file:
+                file.write(result + "\n")
+        QApplication.instance().quit()
+
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    benchmark = None
+    benchmark_output = get_benchmark_output(sys.argv)
+    if benchmark_output is not None:
+        benchmark = StartupBenchmark(benchmark_output)
+        benchmark.mark("imports_ms")
+        app.installEventFilter(benchmark)
 
     script_dir = Path(__file__).resolve().parent
 
     default_cores = os.cpu_count()
 
     model = Model(script_dir)
-    if not model.config_exists():
+    if not model.config_exists() and benchmark is None:
+        from GUI.view.preferences_view import PreferencesView
         config_dialog = PreferencesView(max_cores = default_cores, selected_cores=default_cores)
         if config_dialog.exec_() == config_dialog.Accepted:
             config_data = config_dialog.get_config_data()
@@ -25,5 +94,7 @@ if __name__ == "__main__":
             sys.exit(0)
     view = View(script_dir)
     presenter = Presenter(model, view)
-    view.show()
+    if benchmark is not None:
+        benchmark.mark("window_ms")
+    view.showMaximized()
     sys.exit(app.exec_())
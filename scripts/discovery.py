@@ -0,0 +1,85 @@
+import os
+import threading
+from pathlib import Path
+from typing import Iterator, List, Optional, Set, Tuple
+
+# standard library only, so the GUI can import this module without the worker dependencies
+
+CANCEL_CHECK: int = 1000  # directory entries between cancellation checks
+
+
+def is_dpx(name: str) -> bool:
+    """
+    :param name: file name
+    :type name: str
+    :returns: whether the file is a dpx frame by its extension
+    :rtype: bool
+    """
+    return name.endswith(".dpx") or name.endswith(".DPX")
+
+
+def is_sequence_leaf(files: List[str], directories: List[str]) -> bool:
+    """
+    Decides whether a directory is a dpx sequence: it holds files but no subdirectories, and its first listed file
+    is a dpx frame.
+
+    :param files: names of the files in the directory, in listing order
+    :type files: List[str]
+    :param directories: names of the subdirectories
+    :type directories: List[str]
+    :rtype: bool
+    """
+    return len(files) > 0 and len(directories) == 0 and is_dpx(files[0])
+
+
+def find_sequences(root: Path, cancel: Optional[threading.Event] = None) -> Iterator[Tuple[Path, int, int]]:
+    """
+    Walks a directory tree with os.scandir and yields every dpx sequence as soon as its directory has been listed,
+    with its frame count and size. Symbolic links to directories are not followed, and unreadable directories are
+    skipped.
+
+    A sequence is yielded as the parent of its dpx folder, e.g. REEL_01 for REEL_01/dpx/*.dpx: the folder a job is
+    given, which rawcooked encodes and whose name the mkv, logs and report are named after (see
+    utils.find_sequence_path). A parent is yielded once, with the frames of its first dpx folder.
+
+    :param root: directory to search
+    :type root: Path
+    :param cancel: stops the walk when set
+    :type cancel: Optional[threading.Event]
+    :returns: (sequence parent directory, number of frames, bytes) per sequence, depth first in name order
+    :rtype: Iterator[Tuple[Path, int, int]]
+    """
+    stack: List[str] = [str(root)]
+    parents: Set[str] = set()
+    while stack:
+        if cancel is not None and cancel.is_set():
+            return
+        path: str = stack.pop()
+        files: List[str] = []
+        directories: List[str] = []
+        frames: int = 0
+        size: int = 0
+        try:
+            with os.scandir(path) as entries:
+                for i, entry in enumerate(entries):
+                    if cancel is not None and i % CANCEL_CHECK == 0 and cancel.is_set():
+                        return
+                    if entry.is_dir(follow_symlinks=False):
+                        directories.append(entry.name)
+                    else:
+                        files.append(entry.name)
+                        if is_dpx(entry.name):
+                            frames += 1
+                            size += entry.stat().st_size
+        except OSError:
+            continue
+        if is_sequence_leaf(files, directories):
+            parent: str = os.path.dirname(path)
+            if parent not in parents:
+                parents.add(parent)
+                yield Path(parent), frames, size
+        stack.extend(os.path.join(path, d) for d in sorted(directories, reverse=True))
+
+
+if __name__ == "__main__":
+    print("discovery module")
@@ -2,6 +2,7 @@ import os
 import subprocess
 from typing import List
 
+import metrics
 import utils
 import logging.config
 from logging import Logger
@@ -122,10 +123,15 @@ def execute(params: dict) -> bool:
         rc_license: str = params["license"]
         gap_check: bool = params["gap_check"]
         policy_check: bool = params["policy_check"]
-        sequence_path: Path = utils.find_sequence_path(parent_path)
-
         # check if sequence exists
-        n: int = utils.sequence_count(sequence_path)
+        with metrics.stage("sequence scan"):
+            sequence_path: Path = utils.find_sequence_path(parent_path)
+            n, size, first_frame = utils.sequence_stats(sequence_path)
+        if n > 0:
+            header: dict = utils.dpx_header(first_frame)
+            metrics.set_job(frames=n, bytes=size, **header)
+            if header:
+                worker.info(f"sequence format: {header['width']}x{header['height']} {header['bit_depth']} bit")
         if n == 0:
             raise RuntimeError(f"sequence folder is empty: {sequence_path}")
         else:
@@ -133,7 +139,8 @@ def execute(params: dict) -> bool:
 
         # check for gaps in the sequence if gap check is true
         if gap_check:
-            result = check_gap(sequence_path)
+            with metrics.stage("gap check"):
+                result = check_gap(sequence_path)
             if not result:
                 raise RuntimeError(
                     f"sequence has gaps, verify logs for {sequence_path=}"
@@ -142,16 +149,19 @@ def execute(params: dict) -> bool:
 
         # check for large reversibility and assign v2_flag
         try:
-            v2_flag = check_v2(parent_path, rc_license)
+            with metrics.stage("check_v2"):
+                v2_flag = check_v2(parent_path, rc_license)
             worker.info(f"version check: {'v2' if v2_flag else 'v1'}")
             worker.debug(f"{v2_flag=}")
+            metrics.set_job(v2=v2_flag)
         except RuntimeError as e:
             raise RuntimeError(f"version check failure, ending execution: {e}")
 
         # check dpx policy
         if policy_check and not v2_flag:
             dpx_path: Path = next(sequence_path.iterdir())
-            result: bool = utils.check_mediaconch_policy(policy_path, dpx_path)
+            with metrics.stage("dpx policy"):
+                result: bool = utils.check_mediaconch_policy(policy_path, dpx_path)
             if not result:
                 raise RuntimeError(f"dpx policy check failed: {policy_path.name}")
             worker.info(f"verified {policy_path.name}")
@@ -1,13 +1,63 @@
 import os
+import threading
+from concurrent.futures import FIRST_EXCEPTION, Future, ThreadPoolExecutor, wait
+from typing import List
+
+import metrics
 import utils
 import logging.config
 from logging import Logger
 from pathlib import Path
 
 
+def check_mkv_policy(policy_path: Path, mkv_path: Path, cancel: threading.Event) -> None:
+    """
+    Verifies the mkv against the mkv policy.
+
+    :param policy_path: path to policy file
+    :type policy_path: Path
+    :param mkv_path: path to mkv file
+    :type mkv_path: Path
+    :param cancel: event that stops the mediaconch subprocess once another check has failed
+    :type cancel: threading.Event
+    :raises RuntimeError: if the policy check fails or cannot be performed
+    :return: None
+    """
+    worker: Logger = logging.getLogger(f"worker_{os.getpid()}")
+    with metrics.stage("mkv policy", parent="dpx post rawcook"):
+        result: bool = utils.check_mediaconch_policy(policy_path, mkv_path, cancel)
+    if cancel.is_set():
+        return
+    if not result:
+        raise RuntimeError(f"mkv policy check failed: {policy_path.name}")
+    worker.info(f"verified {policy_path.name}")
+
+
+def check_mkv_txt(mkv_txt_path: Path) -> None:
+    """
+    Verifies that the mkv txt exists and contains no rawcooked error messages.
+
+    :param mkv_txt_path: path to .mkv.txt file
+    :type mkv_txt_path: Path
+    :raises FileNotFoundError: if the mkv txt is missing
+    :raises RuntimeError: if error messages are found in the mkv txt
+    :return: None
+    """
+    worker: Logger = logging.getLogger(f"worker_{os.getpid()}")
+    if not mkv_txt_path.exists():
+        raise FileNotFoundError(f"MKV txt file does not exist: {mkv_txt_path}")
+
+    with metrics.stage("mkv_txt check", parent="dpx post rawcook"):
+        errors: str = utils.check_general_errors(mkv_txt_path)
+    if errors:
+        raise RuntimeError(f"errors found in mkv_txt: {errors}")
+    worker.info(f"no errors found in {mkv_txt_path.name}")
+
+
 def execute(params: dict) -> None:
     """
-    Performs checks based on user preferences after the rawcook process.
+    Performs checks based on user preferences after the rawcook process. The mkv policy check and the mkv txt checks
+    are independent and run concurrently, the first failure cancels the remaining checks.
 
     :param params: dictionary of params -> (mkv path, policy path, policy check flag)
     :type params: dict
@@ -29,21 +79,17 @@ def execute(params: dict) -> None:
         if not mkv_path.exists():
             raise FileNotFoundError(f"MKV file does not exist: {mkv_path=}")
 
-        # check mkv policy
-        if policy_check:
-            result: bool = utils.check_mediaconch_policy(policy_path, mkv_path)
-            if not result:
-                raise RuntimeError(f"mkv policy check failed: {policy_path.name}")
-            worker.info(f"verified {policy_path.name}")
-
-        # check that mkv_txt exists
-        if not mkv_txt_path.exists():
-            raise FileNotFoundError(f"MKV txt file does not exist: {mkv_txt_path}")
-
-        # check if error messages exist in mkv txt
-        errors: str = utils.check_general_errors(mkv_txt_path)
-        if errors:
-            raise RuntimeError(f"errors found in mkv_txt: {errors}")
+        # check mkv policy and mkv_txt concurrently, stopping at the first failure
+        cancel: threading.Event = threading.Event()
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            futures: List[Future] = [pool.submit(check_mkv_txt, mkv_txt_path)]
+            if policy_check:
+                futures.append(pool.submit(check_mkv_policy, policy_path, mkv_path, cancel))
+            wait(futures, return_when=FIRST_EXCEPTION)
+            failed: List[Future] = [f for f in futures if f.done() and f.exception()]
+            if failed:
+                cancel.set()
+                raise failed[0].exception()
 
     except RuntimeError as e:
         raise RuntimeError(f"halting dpx_post_rawcook: {e}") from e
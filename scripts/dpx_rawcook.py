@@ -5,37 +5,43 @@ from logging import FileHandler
 from logging import Logger
 from typing import List
 
+import fixity
+import log_pipeline
+import metrics
 import utils
 from pathlib import Path
 
 
 def grep_with_redirect(pattern: str, source: Path, destination: Path) -> None:
     """
-    Redirects data from rawcook logs to a destination based on a grep search pattern.
+    Redirects data from rawcook logs to a destination based on a search pattern. The source log may have been rotated,
+    so every segment is searched in order, decompressing rotated segments as they are read.
 
-    :param pattern: grep pattern to search
+    :param pattern: literal text to search for
     :type pattern: str
     :param source: path to source file
     :type source: Path
     :param destination: path to destination file
     :type destination: Path
-    :raises RuntimeError: if the subprocess call to grep fails for any reason
+    :raises RuntimeError: if no line matches or the logs cannot be read
     :return: None
     """
     worker: Logger = logging.getLogger(f"worker_{os.getpid()}")
     worker.info(f"redirecting rawcook log data to {destination.name}")
     worker.debug(f"{source=} {destination=}")
     try:
-        command: str = f'grep "{pattern}" "{str(source)}" > "{str(destination)}"'
-
-        result = subprocess.run(
-            args=command,
-            shell=True,
-            text=True,
-            check=True,
-        )
-        worker.debug(f"transfer complete {result=}")
-    except (subprocess.CalledProcessError, Exception) as e:
+        matches: int = 0
+        with open(destination, "w") as out:
+            for segment in log_pipeline.log_segments(source):
+                with log_pipeline.open_log(segment) as f:
+                    for line in f:
+                        if pattern in line:
+                            out.write(line)
+                            matches += 1
+        if matches == 0:
+            raise RuntimeError(f"no lines matching {pattern} in {source.name}")
+        worker.debug(f"transfer complete {matches=}")
+    except Exception as e:
         raise RuntimeError(f"error occurred during grep and redirect call: {e}") from e
 
 
@@ -45,10 +51,12 @@ def run_rawcooked(
         v2_flag: bool,
         frame_md5: bool,
         rc_license: str,
+        fixity_check: bool = True,
 ) -> Path:
     """
     Runs the rawcooked command for the sequence using the preferences specified by the user. After the rawcooked subprocess,
-    the function also generates a .mkv.txt to assess for errors.
+    the function also generates a .mkv.txt to assess for errors. The closed mkv is hashed in one pass, right after
+    rawcooked wrote it, and the digests are written to .mkv.sha256 and .mkv.md5 sidecars.
 
     :param sequence_path: path to dpx sequence
     :type sequence_path: Path
@@ -60,6 +68,8 @@ def run_rawcooked(
     :type frame_md5: bool
     :param rc_license: license to run rawcooked command
     :type rc_license: str
+    :param fixity_check: flag to indicate if fixity sidecars are generated for the mkv
+    :type fixity_check: bool
     :raises RuntimeError: if the subprocess call to rawcooked fails for any reason
     :return: path to mkv file
     :rtype: Path
@@ -86,11 +96,14 @@ def run_rawcooked(
         # call subprocess using run command
         worker.info("calling rawcook subprocess")
 
-        with subprocess.Popen(
+        with metrics.stage("rawcooked", count_frames=True), subprocess.Popen(
                 command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
         ) as p:
             for line in p.stderr:
                 worker.debug(line)
+                fields: dict = log_pipeline.progress_fields(line)
+                if fields:
+                    metrics.progress(**fields)
             for line in p.stdout:
                 worker.debug(line)
 
@@ -101,6 +114,13 @@ def run_rawcooked(
                 f"rawcooked command failed with error code: {p.returncode}"
             )
         worker.info("rawcook subprocess completed successfully")
+        metrics.set_job(mkv_bytes=mkv_path.stat().st_size)
+
+        # hash the mkv once it is closed, while it is most likely still in the page cache
+        if fixity_check:
+            worker.info("writing fixity sidecars")
+            with metrics.stage("fixity"):
+                fixity.write_sidecars(mkv_path, fixity.hash_file(mkv_path))
 
         # grep run_rawcooked to mkv_txt file
         worker.info("generating mkv_txt")
@@ -109,10 +129,12 @@ def run_rawcooked(
                 ".mkv.txt"
             )
             debug_file = ""
-            for handler in worker.parent.handlers:
-                if isinstance(handler, FileHandler) and handler.name == "debug_file":
-                    debug_file: str = handler.baseFilename
-            grep_with_redirect("run_rawcooked", Path(debug_file), mkv_txt_path)
+            handler = log_pipeline.get_handler("debug_file")
+            if isinstance(handler, FileHandler):
+                debug_file: str = handler.baseFilename
+            log_pipeline.flush_logs()
+            with metrics.stage("mkv_txt"):
+                grep_with_redirect("run_rawcooked", Path(debug_file), mkv_txt_path)
         except Exception as e:
             raise RuntimeError(f"mkv_txt generation failed: {e}") from e
         worker.info(f"mkv_txt generated: {mkv_txt_path.name=}")
@@ -130,7 +152,8 @@ def execute(params: dict) -> Path:
     """
     Parses user preferences and executes the rawcooked command for a dpx sequence.
 
-    :param params: dictionary of parameters -> (sequence path, output path, rawcooked license, v2 flag, frame md5 flag)
+    :param params: dictionary of parameters -> (sequence path, output path, rawcooked license, v2 flag, frame md5 flag,
+        fixity flag)
     :type params: dict
     :raises RuntimeError: if the subprocess call to rawcooked fails for any reason
     :return: path to mkv file
@@ -147,6 +170,7 @@ def execute(params: dict) -> Path:
         rc_license: str = params["license"]
         v2_flag: bool = params["v2_flag"]
         frame_md5: bool = params["frame_md5"]
+        fixity_check: bool = params.get("fixity", True)
         sequence_path: Path = utils.find_sequence_path(parent_path)
 
         # check if sequence exists
@@ -158,7 +182,7 @@ def execute(params: dict) -> Path:
 
         try:
             mkv_path = run_rawcooked(
-                parent_path, output_path, v2_flag, frame_md5, rc_license
+                parent_path, output_path, v2_flag, frame_md5, rc_license, fixity_check
             )
         except Exception as e:
             raise RuntimeError(f"run rawcooked failed: {e}") from e
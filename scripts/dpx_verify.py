@@ -0,0 +1,206 @@
+import os
+import shutil
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+import utils
+import logging.config
+from logging import Logger
+from pathlib import Path
+
+
+def run_check(mkv_path: Path, sequence_path: Path, rc_license: str) -> bool:
+    """
+    Runs rawcooked in check mode, which decodes the mkv in memory and compares it against the source sequence.
+
+    :param mkv_path: path to the mkv file
+    :type mkv_path: Path
+    :param sequence_path: path to the source sequence folder that was encoded
+    :type sequence_path: Path
+    :param rc_license: license to run rawcooked
+    :type rc_license: str
+    :raises RuntimeError: if the rawcooked command fails to run
+    :return: True if rawcooked reports no reversibility issue, False otherwise
+    :rtype: bool
+    """
+    worker: Logger = logging.getLogger(f"worker_{os.getpid()}")
+    command: List[str] = (
+            ["rawcooked"] +
+            [[], ["--license", rc_license]][rc_license is not None] +
+            ["--check", str(mkv_path), "-o", str(sequence_path)])
+    worker.debug(f"running subprocess {command=}")
+
+    passed: bool = False
+    try:
+        with subprocess.Popen(
+                command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+        ) as p:
+            for line in p.stdout:
+                worker.debug(line)
+                if "Reversibility was checked, no issue detected" in line:
+                    passed = True
+                if "issues detected" in line or "Error:" in line:
+                    passed = False
+    except Exception as e:
+        raise RuntimeError(f"error during rawcooked check: {e}") from e
+
+    return passed and p.returncode == 0
+
+
+def decoded_frames(scratch_path: Path, sequence_path: Path) -> List[Tuple[Path, Path]]:
+    """
+    Pairs every file decoded into the scratch folder with its counterpart in the source sequence folder.
+
+    :param scratch_path: folder the mkv was decoded into
+    :type scratch_path: Path
+    :param sequence_path: path to the source sequence folder that was encoded
+    :type sequence_path: Path
+    :return: (decoded file, source file) pairs
+    :rtype: List[Tuple[Path, Path]]
+    """
+    root: Path = scratch_path
+    # rawcooked may restore the sequence folder itself inside the output folder
+    if (scratch_path / sequence_path.name).is_dir() and not (sequence_path / sequence_path.name).exists():
+        root = scratch_path / sequence_path.name
+
+    pairs: List[Tuple[Path, Path]] = []
+    for current, _, files in os.walk(root):
+        for name in files:
+            decoded: Path = Path(current) / name
+            pairs.append((decoded, sequence_path / decoded.relative_to(root)))
+    return pairs
+
+
+def run_decode(
+        mkv_path: Path, sequence_path: Path, scratch_path: Path, rc_license: str, threads: int
+) -> bool:
+    """
+    Decodes the mkv into a scratch folder and compares the md5 of every decoded frame against the source frame.
+    The scratch folder is removed afterwards.
+
+    :param mkv_path: path to the mkv file
+    :type mkv_path: Path
+    :param sequence_path: path to the source sequence folder that was encoded
+    :type sequence_path: Path
+    :param scratch_path: folder the mkv is decoded into
+    :type scratch_path: Path
+    :param rc_license: license to run rawcooked
+    :type rc_license: str
+    :param threads: number of frames hashed concurrently
+    :type threads: int
+    :raises RuntimeError: if the decode fails
+    :return: True if every source frame is restored bit for bit, False otherwise
+    :rtype: bool
+    """
+    worker: Logger = logging.getLogger(f"worker_{os.getpid()}")
+    command: List[str] = (
+            ["rawcooked"] +
+            [[], ["--license", rc_license]][rc_license is not None] +
+            ["-y", str(mkv_path), "-o", str(scratch_path)])
+    worker.debug(f"running subprocess {command=}")
+
+    try:
+        with subprocess.Popen(
+                command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+        ) as p:
+            for line in p.stdout:
+                worker.debug(line)
+        if p.returncode != 0:
+            raise RuntimeError(f"rawcooked decode failed with error code: {p.returncode}")
+
+        pairs: List[Tuple[Path, Path]] = decoded_frames(scratch_path, sequence_path)
+        expected: int = utils.sequence_count(utils.find_sequence_path(sequence_path))
+        decoded: int = len([d for d, _ in pairs if d.suffix.lower() == ".dpx"])
+        if decoded != expected:
+            worker.warning(f"decoded {decoded} frames, source has {expected}")
+            return False
+
+        def compare(pair: Tuple[Path, Path]) -> bool:
+            decoded_file, source_file = pair
+            if not source_file.exists():
+                worker.warning(f"decoded file has no source counterpart: {decoded_file.name}")
+                return False
+            if utils.file_md5(decoded_file) != utils.file_md5(source_file):
+                worker.warning(f"md5 mismatch: {source_file.name}")
+                return False
+            return True
+
+        with ThreadPoolExecutor(max_workers=max(threads, 1)) as pool:
+            results: List[bool] = list(pool.map(compare, pairs))
+        worker.debug(f"compared {len(results)} files")
+        return all(results)
+    except RuntimeError:
+        raise
+    except Exception as e:
+        raise RuntimeError(f"error during decode verification: {e}") from e
+    finally:
+        shutil.rmtree(scratch_path, ignore_errors=True)
+
+
+def execute(params: dict) -> dict:
+    """
+    Verifies that the mkv restores the source sequence, either with rawcooked's check mode or by decoding to a
+    scratch folder and comparing per-frame md5 checksums. Verification waits on the semaphore shared by all workers
+    so that it runs on its own concurrency budget.
+
+    :param params: dictionary of params -> (mkv path, sequence path, scratch path, rawcooked license, verify mode,
+        semaphore, threads)
+    :type params: dict
+    :raises RuntimeError: if the verification cannot run or the mkv does not restore the source
+    :return: verification result -> (mode, passed, seconds)
+    :rtype: dict
+    """
+    worker: Logger = logging.getLogger(f"worker_{os.getpid()}")
+    worker.info("---starting dpx verify---")
+    worker.debug(f"{params = }")
+
+    try:
+        # unpack params
+        mkv_path: Path = params["mkv_path"]
+        sequence_path: Path = params["sequence_path"]
+        scratch_path: Path = params["scratch_path"]
+        rc_license: str = params["license"]
+        mode: str = params["mode"]
+        semaphore = params["semaphore"]
+        threads: int = params["threads"]
+
+        if not mkv_path.exists():
+            raise FileNotFoundError(f"MKV file does not exist: {mkv_path=}")
+
+        worker.info("waiting for verification slot")
+        with semaphore:
+            started: float = time.monotonic()
+            worker.info(f"verifying reversibility: {mode}")
+            if mode == "check":
+                passed: bool = run_check(mkv_path, sequence_path, rc_license)
+            elif mode == "decode":
+                passed = run_decode(mkv_path, sequence_path, scratch_path, rc_license, threads)
+            else:
+                raise RuntimeError(f"unknown verification mode: {mode}")
+            result: dict = {
+                "mode": mode,
+                "passed": passed,
+                "seconds": round(time.monotonic() - started, 3),
+            }
+
+        if not passed:
+            raise RuntimeError(f"mkv does not restore the source sequence: {mode}")
+        worker.info(f"verified reversibility of {mkv_path.name}")
+
+    except RuntimeError as e:
+        raise RuntimeError(f"halting dpx_verify: {e}") from e
+    except FileNotFoundError as e:
+        raise RuntimeError(f"file missing: {e}, halting dpx_verify") from e
+    except Exception as e:
+        worker.error(f"unexpected error occurred: {e}")
+        raise RuntimeError("halting dpx_verify") from e
+
+    # closing logs
+    worker.info("---dpx verify complete---\n")
+    return result
+
+
+if __name__ == "__main__":
+    print("dpx verify")
@@ -1,10 +1,13 @@
 import os
+import sys
+import time
 import argparse
 import json
 import logging.config
 import datetime
+import queue
 from logging import Logger
-from multiprocessing import Process, Queue
+from multiprocessing import BoundedSemaphore, Process, Queue
 from pathlib import Path
 from typing import List, Tuple
 
@@ -13,14 +16,27 @@ import psutil
 import dpx_assessment
 import dpx_rawcook
 import dpx_post_rawcook
+import dpx_verify
+import exporter
+import fixity
+import history
+import log_pipeline
+import manifest
+import metrics
+import profiling
+import sampler
+import staging
 import utils
 import shutil
 
+ETA_INTERVAL: float = 60.0  # seconds between remaining time lines in the driver log and on stderr
+STATUS_INTERVAL: float = 1.0  # seconds between status events for the gui dashboard
+
 
 def get_parser() -> argparse.ArgumentParser:
     """
     arguments: None
-    returns: parser with one argument: config folder path
+    returns: parser with arguments: config folder path, optional profiling mode
     """
     parser = argparse.ArgumentParser(
         prog="driver.py",
@@ -32,14 +48,20 @@ def get_parser() -> argparse.ArgumentParser:
         required=True,
         help="path to config folder",
     )
+    parser.add_argument(
+        "--profile",
+        choices=profiling.MODES,
+        default=None,
+        help=f"profile the driver and workers, same as setting {profiling.ENV_VAR}",
+    )
     return parser
 
 
 def get_run_params(config_folder_path: Path) -> dict:
     """
-    arguments: config folder path that contains driver, sequence configs
+    arguments: config folder path that contains driver config and sequence manifest
     returns: dictionary with driver configuration
-    reads driver configuration, verifies number of sequences, returns driver configuration
+    reads driver configuration, returns driver configuration
 
     """
 
@@ -56,39 +78,58 @@ def get_run_params(config_folder_path: Path) -> dict:
         setup.error(f"unexpected error while reading driver configuration")
         raise RuntimeError(e)
 
-    if driver_config["sequence_count"] != (len(os.listdir(config_folder_path)) - 1):
-        raise RuntimeError(
-            f"sequence count provided to driver does not match with number of files in {config_folder_path}"
-        )
-
     return driver_config
 
 
-def get_worker_params(config_file_path: Path) -> dict:
+def get_worker_params(sequence_config: dict) -> dict:
     """
-    arguments: config folder path that contains driver, sequence configs
-    returns: dictionary with driver configuration
-    reads driver configuration, verifies number of sequences, returns driver configuration
-    returns empty dictionary in case of error
+    arguments: sequence configuration read from the manifest by the driver
+    returns: dictionary with sequence configuration
+    verifies the sequence configuration has every required setting, returns it
     """
 
     current_process: int = os.getpid()
     worker: Logger = logging.getLogger(f"worker_{current_process}")
     worker.info("reading sequence configuration")
 
-    try:
-        with open(config_file_path) as f:
-            worker_config: dict = json.load(f)
-    except FileNotFoundError as e:
-        worker.error(f"sequence configuration not found at {config_file_path}")
-        raise RuntimeError(e)
-    except Exception as e:
-        worker.error(f"unexpected error while reading sequence configuration")
-        raise RuntimeError(e)
+    missing: List[str] = manifest.missing_keys(sequence_config)
+    if missing:
+        worker.error(f"sequence configuration is missing {', '.join(missing)}")
+        raise RuntimeError(f"sequence configuration is missing {', '.join(missing)}")
+
+    return sequence_config
 
-    return worker_config
 
+def write_job_metrics(
+        resource_sampler: sampler.ResourceSampler, params: dict, sequence_name: str, succeeded: bool
+) -> None:
+    """
+    Stops resource sampling, writes the stage metrics and resource samples of the job to its log folder and records
+    the job in the run history. Failures are logged, never raised, so the caller always goes on to move the logs.
 
+    :param resource_sampler: the worker's sampler, stopped here if it is running
+    :type resource_sampler: sampler.ResourceSampler
+    :param params: worker parameters -> (output directory, history flag, history path)
+    :type params: dict
+    :param sequence_name: name of the sequence
+    :type sequence_name: str
+    :param succeeded: whether the job completed
+    :type succeeded: bool
+    :returns: None
+    """
+    worker: Logger = logging.getLogger(f"worker_{os.getpid()}")
+    metrics.write_metrics(params["output_folder_path"], sequence_name)
+    if resource_sampler.is_alive():
+        resource_sampler.stop()
+        resource_sampler.write(params["output_folder_path"], sequence_name)
+    if params.get("history", True):
+        try:
+            history.record_job(metrics.job(), metrics.records(), succeeded, params.get("history_path"))
+        except Exception as e:  # the history is optional, a failure must never keep the job's logs from being moved
+            worker.error(e)
+
+
+@profiling.profiled("worker")
 def worker_process(params: dict, q: Queue) -> Queue:
     """
     This is like "main" for each worker, it will execute the whole workflow
@@ -97,7 +138,7 @@ def worker_process(params: dict, q: Queue) -> Queue:
         - run dpx scripts
         - restore sequence and delete working directory structure
 
-    :param params: a dictionary of parameters with the worker configuration -> (execution directory, config file, output directory)
+    :param params: a dictionary of parameters with the worker configuration -> (execution directory, sequence config, output directory)
     :type params: dict
     :param q: multiprocessing queue to communicate with main
     :type q: multiprocessing.Queue
@@ -120,16 +161,25 @@ def worker_process(params: dict, q: Queue) -> Queue:
     wd: Path = params["execution_folder"] / f"wd_{current_process}"  # execution/wd
 
     # each worker sets up logging to its own directory
-    logging.config.dictConfig(utils.get_log_config(log_directory=wd / "logs"))
+    log_pipeline.configure_logging(
+        utils.get_log_config(
+            log_directory=wd / "logs",
+            buffered=True,
+            rotate_bytes=log_pipeline.ROTATE_BYTES,
+            log_format=params.get("log_format", "text"),
+        )
+    )
     worker: Logger = logging.getLogger(f"worker_{current_process}")
+    metrics.reset()  # discard stages inherited from the driver
+    metrics.set_reporter(lambda event: q.put({"pid": current_process, **event}))
     worker.info("---starting setup---")
     worker.info("created working directory")
     worker.debug(f"{wd=} {sequence_path=}")
 
-    # load sequence config file
+    # check sequence config
     try:
         sequence_config: dict = get_worker_params(
-            config_file_path=params["config_file"]
+            sequence_config=params["sequence_config"]
         )
         worker.debug(sequence_config)
     except RuntimeError as e:
@@ -137,6 +187,13 @@ def worker_process(params: dict, q: Queue) -> Queue:
         q.put((current_process, False, "could not load worker configuration"))
         return q
 
+    # sample the resources used by rawcooked, ffmpeg and mediaconch, 0 disables sampling
+    resource_sampler: sampler.ResourceSampler = sampler.ResourceSampler(
+        interval=sequence_config.get("sample_interval", sampler.SAMPLE_INTERVAL)
+    )
+    if resource_sampler.interval > 0:
+        resource_sampler.start()
+
     # copy sequence, policies to folder
     sequence_parent: Path = Path(
         sequence_config["sequence_folder_path"]
@@ -150,8 +207,25 @@ def worker_process(params: dict, q: Queue) -> Queue:
         worker.warning(f"processing sequence in place")
         sequence_destination = sequence_parent
 
+    metrics.set_job(
+        sequence=sequence_destination.stem,
+        execution=params["output_folder_path"].name,
+        concurrency=params.get("concurrency", 1),
+    )
+    staging_method: str = ""
     try:
-        utils.move(sequence_parent, sequence_destination)
+        with metrics.stage("staging"):
+            staging_method = staging.stage_sequence(
+                sequence_parent,
+                sequence_destination,
+                threads=sequence_config.get("staging_threads", 4),
+                verify=sequence_config.get("verify_staging", False),
+            )
+        staging.write_staging_record(wd, sequence_parent, sequence_destination, staging_method)
+        utils.update_report(
+            params["output_folder_path"], sequence_destination.stem, "staging", {"method": staging_method}
+        )
+        worker.info(f"sequence staged: {staging_method}")
         if sequence_config["dpx_policy_check"]:
             utils.copy(
                 Path(sequence_config["dpx_policy_path"]),
@@ -165,9 +239,11 @@ def worker_process(params: dict, q: Queue) -> Queue:
     except RuntimeError as e:
         worker.error(f"halting process due to move/copy failure: {e}")
         q.put((current_process, False, "failure during move/copy"))
-        utils.move(
-            sequence_destination, sequence_parent
-        )  # restore sequence in event of failure
+        if staging_method:
+            staging.unstage_sequence(
+                sequence_parent, sequence_destination, staging_method
+            )  # restore sequence in event of failure
+        write_job_metrics(resource_sampler, params, sequence_destination.stem, succeeded=False)
         utils.move_logs(wd, params["output_folder_path"], sequence_destination)
         return q
     worker.info("required files present in wd, ready for dpx calls\n")
@@ -183,7 +259,8 @@ def worker_process(params: dict, q: Queue) -> Queue:
             "policy_check": sequence_config["dpx_policy_check"],
             "license": sequence_config["license"],
         }
-        v2_flag: bool = dpx_assessment.execute(params=assessment_params)
+        with metrics.stage("dpx assessment", count_frames=True):
+            v2_flag: bool = dpx_assessment.execute(params=assessment_params)
 
         # call dpx rawcook
         rawcook_params = {
@@ -192,8 +269,13 @@ def worker_process(params: dict, q: Queue) -> Queue:
             "license": sequence_config["license"],
             "frame_md5": sequence_config["frame_md5"],
             "output_path": params["output_folder_path"],
+            "fixity": sequence_config.get("fixity", True),
         }
-        mkv_path: Path = dpx_rawcook.execute(params=rawcook_params)
+        with metrics.stage("dpx rawcook", count_frames=True):
+            mkv_path: Path = dpx_rawcook.execute(params=rawcook_params)
+        utils.update_report(
+            params["output_folder_path"], sequence_destination.stem, "fixity", fixity.read_sidecars(mkv_path)
+        )
 
         # call dpx post rawcook
         post_params = {
@@ -201,30 +283,60 @@ def worker_process(params: dict, q: Queue) -> Queue:
             "policy_path": wd / "policies" / "mkv_policy.xml",
             "policy_check": sequence_config["mkv_policy_check"],
         }
-        dpx_post_rawcook.execute(params=post_params)
+        with metrics.stage("dpx post rawcook"):
+            dpx_post_rawcook.execute(params=post_params)
+
+        # call dpx verify if reversibility verification is requested
+        if sequence_config.get("verify", False):
+            verify_params = {
+                "mkv_path": mkv_path,
+                "sequence_path": sequence_destination,
+                "scratch_path": wd / "verify",
+                "license": sequence_config["license"],
+                "mode": sequence_config.get("verify_mode", "check"),
+                "semaphore": params["verify_semaphore"],
+                "threads": sequence_config.get("verify_threads", 4),
+            }
+            try:
+                with metrics.stage("dpx verify", count_frames=True):
+                    verification: dict = dpx_verify.execute(params=verify_params)
+            except RuntimeError as e:
+                verification = {"mode": verify_params["mode"], "passed": False, "error": str(e)}
+                raise
+            finally:
+                utils.update_report(
+                    params["output_folder_path"], sequence_destination.stem, "verification", verification
+                )
     except RuntimeError as e:
         worker.error(f"failure during dpx calls: {e}")
         q.put((current_process, False, f"failure during dpx calls: {e}"))
-        utils.move(
-            sequence_destination, sequence_parent
+        staging.unstage_sequence(
+            sequence_parent, sequence_destination, staging_method
         )  # restore sequence in event of failure
+        write_job_metrics(resource_sampler, params, sequence_destination.stem, succeeded=False)
         utils.move_logs(wd, params["output_folder_path"], sequence_destination)
         return q
     except Exception as e:
         worker.error(f"unexpected failure during dpx calls: {e}")
         q.put((current_process, False, f"unexpected failure during dpx calls: {e}"))
-        utils.move(
-            sequence_destination, sequence_parent
+        staging.unstage_sequence(
+            sequence_parent, sequence_destination, staging_method
         )  # restore sequence in event of failure
+        write_job_metrics(resource_sampler, params, sequence_destination.stem, succeeded=False)
         utils.move_logs(wd, params["output_folder_path"], sequence_destination)
         return q
 
     # on success move sequence back to source
     worker.info("---starting clean up---")
     worker.info("restoring sequence to source")
-    utils.move(sequence_destination, sequence_parent)
+    try:
+        with metrics.stage("restore"):
+            staging.unstage_sequence(sequence_parent, sequence_destination, staging_method)
+    except RuntimeError as e:
+        worker.error(f"failed to restore sequence to source: {e}")
 
     # on completion move logs
+    write_job_metrics(resource_sampler, params, sequence_destination.stem, succeeded=True)
     utils.move_logs(wd, params["output_folder_path"], sequence_destination)
 
     # move framemd5 from sequence path if it exists
@@ -272,6 +384,7 @@ def worker_process(params: dict, q: Queue) -> Queue:
     return q
 
 
+@profiling.profiled("driver")
 def main() -> None:
 
     # setup logging
@@ -286,6 +399,12 @@ def main() -> None:
     setup: Logger = logging.getLogger("setup")
     setup.info("starting driver")
 
+    # an unknown profiling mode only disables profiling, for the driver and the workers that inherit it
+    try:
+        profiling.check_mode()
+    except RuntimeError as e:
+        setup.warning(f"{e}, profiling disabled")
+
     # parse argument to get driver config
     parser = get_parser()
     args = parser.parse_args()
@@ -299,11 +418,24 @@ def main() -> None:
     except RuntimeError as e:
         setup.error("failure in reading driver parameters...ending execution")
         setup.error(e)
+        utils.publish("failed", error=f"failure in reading driver parameters: {e}")
+        return
+
+    # open the sequence manifest, its jobs are read one at a time as workers start
+    try:
+        header, sequences = manifest.read_manifest(
+            Path(args.config_folder_path) / manifest.MANIFEST_NAME
+        )
+        setup.debug(f"manifest: {header}")
+    except RuntimeError as e:
+        setup.error("failure in reading sequence manifest...ending execution")
+        setup.error(e)
+        utils.publish("failed", error=f"failure in reading sequence manifest: {e}")
         return
 
     # output_folder_path: location specified by user
     output_folder_path: Path = Path(run_params["output_folder_path"])
-    sequence_count: int = run_params["sequence_count"]  # number of sequences (workers)
+    sequence_count: int = run_params["sequence_count"]  # number of sequences (workers) in the manifest
     cpu_affinity: List[int] = [
         _ for _ in range(run_params.get("cpu_affinity", psutil.cpu_count()))
     ]  # available cpus for this execution
@@ -314,11 +446,12 @@ def main() -> None:
     try:
         # outputs: final location of results, each thread moves results here
         outputs: Path = utils.create_execution_dir(output_folder_path)
-        setup.debug(f"print output folder path to stdout: {outputs}")
-        print(str(outputs))
+        setup.debug(f"output folder path: {outputs}")
+        profiling.set_output(outputs / "logs" / "profiles")
     except RuntimeError as e:
         setup.error("failure in creating working directory...ending execution")
         setup.error(e)
+        utils.publish("failed", error=f"failure in creating working directory: {e}")
         return
 
     # initialize workers and start worker process
@@ -326,18 +459,52 @@ def main() -> None:
     setup.info(f"initializing {sequence_count} processes")
     workers: List[Process] = []
     q: Queue = Queue()  # message queue for workers to communicate with driver
-    for i in range(sequence_count):
-        params = {
-            "execution_folder": output_folder_path / "working_directory",
-            "config_file": Path(args.config_folder_path) / f"sequence_{i}.json",
-            "output_folder_path": outputs,
-        }
-        setup.debug(f"params {i}: {params}")
-        wp = Process(target=worker_process, args=(params, q))
-        psutil.Process(wp.pid).cpu_affinity(cpu_affinity)
-        workers.append(wp)
-        wp.start()
-        setup.info(f"init worker: {wp.pid}")
+    verify_semaphore = BoundedSemaphore(
+        run_params.get("verify_concurrency", 1)
+    )  # concurrency budget for reversibility verification, shared by all workers
+    with profiling.paused():  # the driver's stack sampler must not be running while workers are forked
+        try:
+            for i, sequence_config in enumerate(sequences):
+                params = {
+                    "execution_folder": output_folder_path / "working_directory",
+                    "sequence_config": sequence_config,
+                    "output_folder_path": outputs,
+                    "verify_semaphore": verify_semaphore,
+                    "log_format": run_params.get("log_format", "text"),
+                    "concurrency": sequence_count,
+                    "history": run_params.get("history", True),
+                    "history_path": Path(run_params["history_path"]) if run_params.get("history_path") else None,
+                }
+                setup.debug(f"params {i}: {params}")
+                wp = Process(target=worker_process, args=(params, q))
+                psutil.Process(wp.pid).cpu_affinity(cpu_affinity)
+                workers.append(wp)
+                wp.start()
+                setup.info(f"init worker: {wp.pid}")
+        except RuntimeError as e:
+            setup.error(f"stopped reading sequence manifest after {len(workers)} sequences")
+            setup.error(e)
+    if len(workers) != sequence_count:
+        setup.warning(f"started {len(workers)} workers, driver configuration expects {sequence_count}")
+    if not workers:
+        utils.publish("failed", error="no sequences could be read from the sequence manifest")
+        return
+
+    # start live metrics once every worker is forked, no exporter thread may be running during a fork
+    driver_exporter: exporter.DriverExporter = exporter.DriverExporter(
+        interval=run_params.get("metrics_interval", exporter.SAMPLE_INTERVAL),
+        history_path=Path(run_params["history_path"]) if run_params.get("history_path") else None,
+        use_history=run_params.get("history", True),
+    )
+    for wp in workers:
+        driver_exporter.register(wp.pid)
+    try:
+        driver_exporter.start(
+            port=run_params.get("metrics_port", 0),
+            textfile=Path(run_params["metrics_textfile"]) if run_params.get("metrics_textfile") else None,
+        )
+    except RuntimeError as e:
+        setup.error(e)
 
     # write all log locations to config file
     setup.info("writing log config (read by gui)")
@@ -345,27 +512,60 @@ def main() -> None:
         "write_path": Path(args.config_folder_path) / "log_config.json",
         "driver_path": default,
         "final_path": outputs,
-        "count": sequence_count,
+        "count": len(workers),
         "sequence_paths": [
             output_folder_path / "working_directory" / f"wd_{x.pid}" / "logs"
             for x in workers
         ],
     }
-    utils.write_log_config(**params)
+    log_config: dict = utils.write_log_config(**params)
+
+    # tell the gui the workers are running and where their logs are
+    utils.publish("ready", pid=os.getpid(), execution=str(outputs), log_config=log_config)
+
+    # read the message queue until every worker has exited, log results
+    with metrics.stage("workers"):
+        eta_logged: float = time.monotonic()
+        status_published: float = 0.0
+        while any(wp.is_alive() for wp in workers) or not q.empty():
+            if time.monotonic() - status_published >= STATUS_INTERVAL:
+                status_published = time.monotonic()
+                utils.publish("status", **driver_exporter.status())
+            if time.monotonic() - eta_logged >= ETA_INTERVAL:
+                eta_logged = time.monotonic()
+                eta_line: str = driver_exporter.eta_line()
+                setup.info(eta_line)
+                print(eta_line, file=sys.stderr, flush=True)  # stdout is reserved for the gui
+            try:
+                message = q.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            driver_exporter.handle(message)
+            if not isinstance(message, tuple):
+                continue  # live event, see metrics.report
+            result: Tuple[int, bool, str] = message  # (worker id, status , message)
+            if not result[1]:
+                setup.error(f" worker {result[0]} execution halted: {result[2]}")
+                setup.error(f" worker {result[0]} check error logs")
 
-    # wait for processes to end
-    for wp in workers:
-        wp.join()
+            else:
+                setup.info(f" worker {result[0]} completed successfully")
+        for wp in workers:
+            wp.join()
+    driver_exporter.stop()
 
-    # check message queue and log errors
-    while not q.empty():
-        result: Tuple[int, bool, str] = q.get()  # (worker id, status , message)
-        if not result[1]:
-            setup.error(f" worker {result[0]} execution halted: {result[2]}")
-            setup.error(f" worker {result[0]} check error logs")
+    # pack the logs of every sequence into one indexed archive
+    try:
+        with metrics.stage("archive logs"):
+            utils.archive_logs(outputs)
+    except RuntimeError as e:
+        setup.error(e)
 
-        else:
-            setup.info(f" worker {result[0]} completed successfully")
+    # summarize the metrics of every sequence
+    try:
+        metrics.summarize(outputs, metrics.records())
+    except RuntimeError as e:
+        setup.error(e)
 
     # delete working directory
     setup.info("deleting working directory")
@@ -385,8 +585,11 @@ def main() -> None:
         for f in default.iterdir():
             utils.copy(f, outputs / f.name)
     except Exception as e:
-        print(f"unexpected failure during driver log copy: {e}")
+        print(f"unexpected failure during driver log copy: {e}", file=sys.stderr)
 
 
 if __name__ == "__main__":
+    profile: str = get_parser().parse_args().profile
+    if profile:
+        os.environ[profiling.ENV_VAR] = profile  # read by the profiled driver and inherited by the workers
     main()
@@ -0,0 +1,176 @@
+import time
+from typing import Dict, List, Optional
+
+# standard library only, so the GUI can import this module without the worker dependencies
+
+STAGES: List[str] = ["staging", "dpx assessment", "dpx rawcook", "dpx post rawcook", "dpx verify", "restore"]
+ENCODE_STAGE: str = "dpx rawcook"  # the only stage that reports live frame progress
+FPS_ALPHA: float = 0.2  # weight of the newest fps sample in the moving average
+PRIOR_WEIGHT: int = 10  # live fps samples needed before they outweigh the historical prior
+SMOOTHING: float = 0.2  # fraction of the gap to a new estimate closed per second, the estimate otherwise counts down
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    """
+    Formats a remaining time for display, e.g. 1h 05m, 4m 10s or 35s.
+
+    :param seconds: remaining seconds, None if unknown
+    :type seconds: Optional[float]
+    :rtype: str
+    """
+    if seconds is None:
+        return "--"
+    seconds = int(max(seconds, 0))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m"
+    if minutes:
+        return f"{minutes}m {seconds:02d}s"
+    return f"{seconds}s"
+
+
+class JobEstimator:
+    """
+    Estimates the remaining time of one job. The encode uses a moving average of rawcooked's live fps, blended with
+    the historical fps for similar sequences until enough live samples arrive. The other stages use their historical
+    throughput. Estimates are smoothed over time: the previous estimate keeps counting down and moves towards each
+    new one by a fraction per second, so the display does not jump and repeated reads do not change it.
+
+    :param frames: sequence length, 0 if not known yet
+    :type frames: int
+    :param priors: historical frames per second by stage, see history.stage_priors
+    :type priors: Dict[str, float]
+    """
+
+    def __init__(self, frames: int = 0, priors: Optional[Dict[str, float]] = None):
+        self.frames: int = frames
+        self.priors: Dict[str, float] = priors or {}
+        self.stage: Optional[str] = None
+        self.stage_started: float = time.monotonic()
+        self.frame: int = 0
+        self.fps: Optional[float] = None  # moving average of live samples
+        self.samples: int = 0
+        self.smoothed: Optional[float] = None
+        self.smoothed_at: float = 0.0
+        self.done: bool = False
+
+    def set_frames(self, frames: int) -> None:
+        self.frames = frames
+
+    def set_priors(self, priors: Dict[str, float]) -> None:
+        self.priors = priors
+
+    def start_stage(self, stage: str, now: Optional[float] = None) -> None:
+        """
+        Marks the start of a top level stage.
+        """
+        self.stage = stage
+        self.stage_started = time.monotonic() if now is None else now
+
+    def update_progress(self, frame: int, fps: Optional[float] = None) -> None:
+        """
+        Adds a live progress sample of the encode.
+
+        :param frame: frames encoded so far
+        :type frame: int
+        :param fps: speed reported by the encoder, if any
+        :type fps: Optional[float]
+        """
+        self.frame = frame
+        if fps is not None and fps > 0:
+            self.fps = fps if self.fps is None else FPS_ALPHA * fps + (1 - FPS_ALPHA) * self.fps
+            self.samples += 1
+
+    def finish(self) -> None:
+        self.done = True
+
+    def encode_fps(self) -> Optional[float]:
+        """
+        Blends the live fps average with the historical encode fps, trusting live samples more as they accumulate.
+
+        :rtype: Optional[float]
+        """
+        prior: Optional[float] = self.priors.get(ENCODE_STAGE)
+        if self.fps is None:
+            return prior
+        if prior is None:
+            return self.fps
+        return (prior * PRIOR_WEIGHT + self.fps * self.samples) / (PRIOR_WEIGHT + self.samples)
+
+    def stage_seconds(self, stage: str) -> Optional[float]:
+        """
+        Expected duration of a whole stage, None if there is no history for it or the length is unknown.
+        """
+        fps: Optional[float] = self.encode_fps() if stage == ENCODE_STAGE else self.priors.get(stage)
+        if not fps or not self.frames:
+            return None
+        return self.frames / fps
+
+    def raw_remaining(self, now: float) -> Optional[float]:
+        """
+        Unsmoothed remaining seconds: rest of the current stage plus the expected duration of the stages after it.
+        Stages without history are left out, except the encode, without which there is no estimate.
+        """
+        if self.done:
+            return 0.0
+        if not self.frames:
+            return None
+        current: int = STAGES.index(self.stage) if self.stage in STAGES else -1
+        remaining: float = 0.0
+        for index, stage in enumerate(STAGES):
+            if index < current:
+                continue
+            if stage == ENCODE_STAGE:
+                fps: Optional[float] = self.encode_fps()
+                if not fps:
+                    return None
+                frames_left: int = self.frames - (self.frame if index == current else 0)
+                remaining += max(frames_left, 0) / fps
+                continue
+            expected: Optional[float] = self.stage_seconds(stage)
+            if expected is None:
+                continue
+            if index == current:
+                expected = max(expected - (now - self.stage_started), 0.0)
+            remaining += expected
+        return remaining
+
+    def remaining(self, now: Optional[float] = None) -> Optional[float]:
+        """
+        Smoothed remaining seconds of the job, None while there is not enough information.
+
+        :param now: monotonic time, time.monotonic() by default
+        :type now: Optional[float]
+        :rtype: Optional[float]
+        """
+        now = time.monotonic() if now is None else now
+        target: Optional[float] = self.raw_remaining(now)
+        if target is None or self.done:
+            self.smoothed = target
+        elif self.smoothed is None:
+            self.smoothed = target
+        else:
+            elapsed: float = max(now - self.smoothed_at, 0.0)
+            counted_down: float = max(self.smoothed - elapsed, 0.0)
+            self.smoothed = counted_down + (1 - (1 - SMOOTHING) ** elapsed) * (target - counted_down)
+        self.smoothed_at = now
+        return self.smoothed
+
+
+def batch_remaining(estimators: List[JobEstimator], now: Optional[float] = None) -> Optional[float]:
+    """
+    Remaining seconds of a batch whose jobs all run at the same time, the longest job's estimate.
+
+    :param estimators: one estimator per job
+    :type estimators: List[JobEstimator]
+    :param now: monotonic time, time.monotonic() by default
+    :type now: Optional[float]
+    :returns: remaining seconds, None if any unfinished job has no estimate yet
+    :rtype: Optional[float]
+    """
+    now = time.monotonic() if now is None else now
+    remaining: List[Optional[float]] = [e.remaining(now) for e in estimators]
+    if not remaining or any(r is None for r in remaining):
+        return None
+    return max(remaining)
@@ -0,0 +1,364 @@
+import os
+import time
+import threading
+import logging.config
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging import Logger
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import psutil
+
+import eta
+import history
+
+SAMPLE_INTERVAL: float = 5.0  # seconds between resource samples and textfile writes
+PREFIX: str = "souschef"
+
+
+def escape(value) -> str:
+    """
+    Escapes a label value for the Prometheus text format.
+
+    :rtype: str
+    """
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class DriverExporter:
+    """
+    Live state of a driver execution in the Prometheus text format: jobs by state, per-job stage, frame, fps and
+    progress, worker RSS and CPU (including child processes such as rawcooked), bytes per second read and written
+    per device, and failures by stage. Job state is fed from the worker result queue; resources are sampled with
+    psutil. Metrics are served over HTTP, written as a node_exporter textfile, or both.
+
+    Each job also has a remaining time estimate, see eta.JobEstimator, seeded with the run history of similar
+    sequences.
+
+    :param interval: seconds between resource samples
+    :type interval: float
+    :param history_path: run history database used for estimates, None for the default, see history.history_path
+    :type history_path: Optional[Path]
+    :param use_history: seed estimates from the run history
+    :type use_history: bool
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL, history_path: Optional[Path] = None, use_history: bool = True):
+        self.interval: float = interval
+        self.history_path: Optional[Path] = history_path
+        self.use_history: bool = use_history
+        self.lock: threading.Lock = threading.Lock()
+        self.jobs: Dict[int, dict] = {}
+        self.failures: Dict[str, int] = {}
+        self.processes: Dict[int, psutil.Process] = {}
+        self.children: Dict[int, psutil.Process] = {}
+        self.resources: Dict[int, Tuple[int, float]] = {}  # pid -> (rss bytes, cpu percent)
+        self.disks: Dict[str, Tuple[int, int]] = {}  # device -> (read bytes, written bytes)
+        self.disk_rates: Dict[str, Tuple[float, float]] = {}  # device -> (read bytes/s, written bytes/s)
+        self.disk_total: Optional[Tuple[int, int]] = None  # (read bytes, written bytes) of all disks, no partitions
+        self.io_rate: Tuple[float, float] = (0.0, 0.0)  # (read bytes/s, written bytes/s) of all disks
+        self.system: Tuple[float, float] = (0.0, 0.0)  # (cpu percent, memory percent) of the machine
+        self.sampled: float = 0.0
+        self.textfile: Optional[Path] = None
+        self.server: Optional[ThreadingHTTPServer] = None
+        self.stopped: threading.Event = threading.Event()
+        self.thread: threading.Thread = threading.Thread(target=self.monitor, name="exporter", daemon=True)
+
+    def register(self, pid: int) -> None:
+        """
+        Adds a worker, counted as queued until it reports its first stage.
+
+        :param pid: worker process id
+        :type pid: int
+        """
+        with self.lock:
+            self.jobs[pid] = {
+                "state": "queued", "sequence": "", "stage": "", "frames": 0, "frame": 0, "fps": 0.0,
+                "estimator": eta.JobEstimator(),
+            }
+        try:
+            self.processes[pid] = psutil.Process(pid)
+            self.processes[pid].cpu_percent()  # first call only sets the reference point
+        except psutil.Error:
+            pass
+
+    def handle(self, message) -> None:
+        """
+        Updates job state from a worker queue message: a (pid, status, message) result tuple or an event dictionary
+        forwarded by metrics.report.
+        """
+        priors: Optional[Dict[str, float]] = None
+        if isinstance(message, dict) and message.get("event") == "job" and "frames" in message and self.use_history:
+            priors = history.stage_priors(
+                eta.STAGES, message.get("width"), message.get("height"), message.get("bit_depth"), self.history_path
+            )
+        with self.lock:
+            if isinstance(message, tuple):
+                job: dict = self.jobs.setdefault(message[0], {"stage": "", "estimator": eta.JobEstimator()})
+                job["state"] = "done" if message[1] else "failed"
+                job["estimator"].finish()
+                if not message[1]:
+                    stage: str = job.get("stage") or "setup"
+                    self.failures[stage] = self.failures.get(stage, 0) + 1
+                return
+            job = self.jobs.setdefault(message.get("pid"), {"state": "queued", "estimator": eta.JobEstimator()})
+            event: str = message.get("event")
+            if event == "job":
+                job.update({k: v for k, v in message.items() if k in ("sequence", "frames")})
+                if "frames" in message:
+                    job["estimator"].set_frames(message["frames"])
+                if priors is not None:
+                    job["estimator"].set_priors(priors)
+            elif event == "stage":
+                job["state"] = "running"
+                job["stage"] = message["stage"]
+                job["estimator"].start_stage(message["stage"])
+            elif event == "progress":
+                job.update({k: v for k, v in message.items() if k in ("frame", "fps", "percent")})
+                if "frame" in message:
+                    job["estimator"].update_progress(message["frame"], message.get("fps"))
+
+    def eta_line(self) -> str:
+        """
+        Summarizes the remaining time of the batch and of every unfinished job on one line, for the console.
+
+        :rtype: str
+        """
+        with self.lock:
+            now: float = time.monotonic()
+            batch: Optional[float] = eta.batch_remaining([j["estimator"] for j in self.jobs.values()], now)
+            jobs: List[str] = [
+                f"{j.get('sequence') or pid} {eta.format_duration(j['estimator'].remaining(now))} ({j.get('stage')})"
+                for pid, j in self.jobs.items() if j["state"] in ("queued", "running")
+            ]
+        return f"eta: batch {eta.format_duration(batch)}" + "".join(f" | {j}" for j in jobs)
+
+    def status(self) -> dict:
+        """
+        Summarizes the execution for the GUI dashboard, published by the driver as its status event: jobs by state,
+        the stage, encoding fps and progress of every running job, total fps, disk throughput of the machine, CPU and memory
+        utilisation of the machine and of the workers, and the remaining time of the batch.
+
+        :rtype: dict
+        """
+        with self.lock:
+            states: Dict[str, int] = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+            for job in self.jobs.values():
+                states[job["state"]] = states.get(job["state"], 0) + 1
+            running: List[dict] = [
+                {
+                    "pid": pid,
+                    "sequence": j.get("sequence", ""),
+                    "stage": j.get("stage", ""),
+                    "fps": j.get("fps", 0.0) if j.get("stage") == eta.ENCODE_STAGE else 0.0,
+                    "percent": round(100 * j.get("frame", 0) / j["frames"], 1) if j.get("frames") else None,
+                }
+                for pid, j in self.jobs.items() if j["state"] == "running"
+            ]
+            batch: Optional[float] = eta.batch_remaining(
+                [j["estimator"] for j in self.jobs.values()], time.monotonic()
+            )
+            return {
+                "jobs": states,
+                "running": running,
+                "fps": round(sum(j["fps"] for j in running), 1),
+                "read_bytes_per_second": round(self.io_rate[0], 1),
+                "write_bytes_per_second": round(self.io_rate[1], 1),
+                "cpu_percent": self.system[0],
+                "memory_percent": self.system[1],
+                "worker_cpu_percent": round(sum(r[1] for r in self.resources.values()), 1),
+                "worker_rss_bytes": sum(r[0] for r in self.resources.values()),
+                "batch_eta": None if batch is None else round(batch, 1),
+            }
+
+    def sample(self) -> None:
+        """
+        Samples worker RSS and CPU, summed over each worker's process tree, and per-device disk throughput.
+        """
+        resources: Dict[int, Tuple[int, float]] = {}
+        for pid, process in list(self.processes.items()):
+            try:
+                tree: List[psutil.Process] = [process]
+                for child in process.children(recursive=True):
+                    # keep child objects so cpu_percent measures from the previous sample
+                    tree.append(self.children.setdefault(child.pid, child))
+                rss: int = 0
+                cpu: float = 0.0
+                for p in tree:
+                    try:
+                        rss += p.memory_info().rss
+                        cpu += p.cpu_percent()
+                    except psutil.Error:
+                        continue
+                resources[pid] = (rss, cpu)
+            except psutil.Error:
+                continue  # worker exited
+
+        now: float = time.monotonic()
+        try:
+            counters = psutil.disk_io_counters(perdisk=True) or {}
+            total = psutil.disk_io_counters()
+        except (RuntimeError, OSError):
+            counters = {}
+            total = None
+        rates: Dict[str, Tuple[float, float]] = {}
+        elapsed: float = now - self.sampled
+        for device, c in counters.items():
+            previous: Optional[Tuple[int, int]] = self.disks.get(device)
+            if previous is not None and elapsed > 0:
+                rates[device] = ((c.read_bytes - previous[0]) / elapsed, (c.write_bytes - previous[1]) / elapsed)
+        io_rate: Tuple[float, float] = (0.0, 0.0)
+        if total is not None and self.disk_total is not None and elapsed > 0:
+            io_rate = ((total.read_bytes - self.disk_total[0]) / elapsed,
+                       (total.write_bytes - self.disk_total[1]) / elapsed)
+        system: Tuple[float, float] = (psutil.cpu_percent(), psutil.virtual_memory().percent)
+
+        with self.lock:
+            self.resources = resources
+            self.disks = {device: (c.read_bytes, c.write_bytes) for device, c in counters.items()}
+            self.disk_rates = rates
+            self.disk_total = (total.read_bytes, total.write_bytes) if total is not None else None
+            self.io_rate = io_rate
+            self.system = system
+            self.sampled = now
+            self.children = {pid: p for pid, p in self.children.items() if p.is_running()}
+
+    def render(self) -> str:
+        """
+        Renders the current state in the Prometheus text exposition format.
+
+        :rtype: str
+        """
+        lines: List[str] = []
+
+        def metric(name: str, kind: str, description: str, samples: List[Tuple[dict, float]]) -> None:
+            lines.append(f"# HELP {PREFIX}_{name} {description}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+            for labels, value in samples:
+                label_text: str = ",".join(f'{k}="{escape(v)}"' for k, v in labels.items())
+                lines.append(f"{PREFIX}_{name}{{{label_text}}} {value}" if label_text else f"{PREFIX}_{name} {value}")
+
+        with self.lock:
+            states: Dict[str, int] = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+            for job in self.jobs.values():
+                states[job["state"]] = states.get(job["state"], 0) + 1
+            active: List[Tuple[int, dict]] = [(pid, j) for pid, j in self.jobs.items() if j["state"] == "running"]
+
+            def labels(pid: int, job: dict) -> dict:
+                return {"pid": pid, "sequence": job.get("sequence", "")}
+
+            metric("jobs", "gauge", "Jobs by state.", [({"state": s}, n) for s, n in states.items()])
+            metric("job_stage", "gauge", "Stage a running job is in.",
+                   [({**labels(pid, j), "stage": j["stage"]}, 1) for pid, j in active])
+            metric("job_frame", "gauge", "Last frame reported by the encoder.",
+                   [(labels(pid, j), j.get("frame", 0)) for pid, j in active])
+            metric("job_fps", "gauge", "Encoding speed in frames per second.",
+                   [(labels(pid, j), j.get("fps", 0.0)) for pid, j in active])
+            metric("job_progress_ratio", "gauge", "Frames encoded over sequence length.",
+                   [(labels(pid, j), round(j.get("frame", 0) / j["frames"], 4))
+                    for pid, j in active if j.get("frames")])
+            metric("worker_rss_bytes", "gauge", "Resident memory of a worker and its child processes.",
+                   [(labels(pid, self.jobs.get(pid, {})), r[0]) for pid, r in self.resources.items()])
+            metric("worker_cpu_percent", "gauge", "CPU usage of a worker and its child processes.",
+                   [(labels(pid, self.jobs.get(pid, {})), round(r[1], 1)) for pid, r in self.resources.items()])
+            metric("device_read_bytes_per_second", "gauge", "Bytes read per second by device.",
+                   [({"device": d}, round(r[0], 1)) for d, r in self.disk_rates.items()])
+            metric("device_write_bytes_per_second", "gauge", "Bytes written per second by device.",
+                   [({"device": d}, round(r[1], 1)) for d, r in self.disk_rates.items()])
+            metric("failures_total", "counter", "Failed jobs by the stage they failed in.",
+                   [({"stage": s}, n) for s, n in self.failures.items()])
+            now: float = time.monotonic()
+            estimates: List[Tuple[dict, Optional[float]]] = [
+                (labels(pid, j), j["estimator"].remaining(now)) for pid, j in active
+            ]
+            metric("job_eta_seconds", "gauge", "Estimated seconds until a running job completes.",
+                   [(l, round(r, 1)) for l, r in estimates if r is not None])
+            batch: Optional[float] = eta.batch_remaining([j["estimator"] for j in self.jobs.values()], now)
+            metric("batch_eta_seconds", "gauge", "Estimated seconds until every job completes.",
+                   [] if batch is None else [({}, round(batch, 1))])
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self) -> None:
+        """
+        Writes the metrics to the textfile, replacing it atomically so node_exporter never reads a partial file.
+        """
+        partial: Path = self.textfile.with_name(self.textfile.name + f".{os.getpid()}.tmp")
+        with open(partial, "w") as f:
+            f.write(self.render())
+        os.replace(partial, self.textfile)
+
+    def monitor(self) -> None:
+        """
+        Sampler thread loop, samples resources and rewrites the textfile every interval until stopped.
+        """
+        setup: Logger = logging.getLogger("setup")
+        while True:
+            try:
+                self.sample()
+                if self.textfile is not None:
+                    self.write_textfile()
+            except Exception as e:
+                setup.warning(f"metrics exporter failed to sample: {e}")
+            if self.stopped.wait(self.interval):
+                return
+
+    def start(self, port: int = 0, textfile: Optional[Path] = None, host: str = "127.0.0.1") -> None:
+        """
+        Starts sampling, serving metrics on http://host:port/metrics if a port is given, and writing them to a
+        node_exporter textfile (a .prom file in the collector's directory) if a path is given. Start it after the
+        workers are forked, its threads hold the lock and psutil state and would not survive a fork.
+
+        :param port: HTTP port, 0 to not serve
+        :type port: int
+        :param textfile: path of the textfile, None to not write one
+        :type textfile: Optional[Path]
+        :param host: address to bind, local only by default
+        :type host: str
+        :raises RuntimeError: if the HTTP server cannot be started
+        """
+        setup: Logger = logging.getLogger("setup")
+        self.textfile = textfile
+        if port:
+            exporter: DriverExporter = self
+
+            class MetricsHandler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split("?")[0] not in ("/", "/metrics"):
+                        self.send_error(404)
+                        return
+                    body: bytes = exporter.render().encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            try:
+                self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+            except OSError as e:
+                raise RuntimeError(f"failed to serve metrics on {host}:{port}: {e}") from e
+            self.server.daemon_threads = True
+            threading.Thread(target=self.server.serve_forever, name="exporter_http", daemon=True).start()
+            setup.info(f"serving metrics on http://{host}:{self.server.server_port}/metrics")
+        if textfile is not None:
+            setup.info(f"writing metrics to {textfile}")
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops sampling, writes the textfile one last time and stops serving.
+        """
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.thread.join()
+        if self.textfile is not None:
+            try:
+                self.write_textfile()
+            except OSError:
+                pass
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
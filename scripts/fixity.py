@@ -0,0 +1,78 @@
+import os
+import hashlib
+import logging.config
+from logging import Logger
+from pathlib import Path
+from typing import Dict, Tuple
+
+READ_CHUNK: int = 8 * 1024 * 1024  # bytes read per iteration
+ALGORITHMS: Tuple[str, ...] = ("sha256", "md5")
+
+
+def hash_file(file_path: Path, algorithms: Tuple[str, ...] = ALGORITHMS) -> Dict[str, str]:
+    """
+    Hashes a closed file with every algorithm in a single read. The matroska muxer rewrites the header when it
+    closes the file, and the digests chain over every byte, so the file can only be hashed once it is complete.
+
+    :param file_path: path of the file to hash
+    :type file_path: Path
+    :param algorithms: hashlib algorithm names to compute
+    :type algorithms: Tuple[str, ...]
+    :raises RuntimeError: if the file cannot be read
+    :returns: hexadecimal digests keyed by algorithm
+    :rtype: Dict[str, str]
+    """
+    worker: Logger = logging.getLogger(f"worker_{os.getpid()}")
+    hashes: Dict[str, "hashlib._Hash"] = {a: hashlib.new(a) for a in algorithms}
+    size: int = 0
+    try:
+        with open(file_path, "rb") as f:
+            for data in iter(lambda: f.read(READ_CHUNK), b""):
+                for h in hashes.values():
+                    h.update(data)
+                size += len(data)
+    except OSError as e:
+        raise RuntimeError(f"failed to hash {file_path.name}: {e}") from e
+    worker.debug(f"hashed {size} bytes of {file_path.name}")
+    return {a: h.hexdigest() for a, h in hashes.items()}
+
+
+def write_sidecars(file_path: Path, digests: Dict[str, str]) -> None:
+    """
+    Writes one checksum sidecar per algorithm next to the file, in the format read by sha256sum/md5sum -c.
+
+    :param file_path: path to the hashed file
+    :type file_path: Path
+    :param digests: hexadecimal digests keyed by algorithm
+    :type digests: Dict[str, str]
+    :raises RuntimeError: if a sidecar cannot be written
+    :returns: None
+    """
+    worker: Logger = logging.getLogger(f"worker_{os.getpid()}")
+    try:
+        for algorithm, digest in digests.items():
+            sidecar: Path = file_path.with_suffix(file_path.suffix + f".{algorithm}")
+            with open(sidecar, "w") as f:
+                f.write(f"{digest}  {file_path.name}\n")
+            worker.debug(f"wrote {sidecar.name}")
+    except Exception as e:
+        raise RuntimeError(f"failed to write fixity sidecars: {e}") from e
+
+
+def read_sidecars(file_path: Path, algorithms: Tuple[str, ...] = ALGORITHMS) -> Dict[str, str]:
+    """
+    Reads the checksum sidecars of a file.
+
+    :param file_path: path to the hashed file
+    :type file_path: Path
+    :param algorithms: algorithms of the sidecars to read
+    :type algorithms: Tuple[str, ...]
+    :returns: hexadecimal digests keyed by algorithm, for every sidecar that exists
+    :rtype: Dict[str, str]
+    """
+    digests: Dict[str, str] = {}
+    for algorithm in algorithms:
+        sidecar: Path = file_path.with_suffix(file_path.suffix + f".{algorithm}")
+        if sidecar.exists():
+            digests[algorithm] = sidecar.read_text().split()[0]
+    return digests
@@ -0,0 +1,335 @@
+import os
+import json
+import socket
+import sqlite3
+import argparse
+import datetime
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# standard library only, so the GUI can import this module without the worker dependencies
+
+ENV_VAR: str = "SOUSCHEF_HISTORY"  # overrides the default database location
+DEFAULT_PATH: Path = Path.home() / ".souschef" / "history.db"
+TIMEOUT: float = 30.0  # seconds to wait for another worker's write to finish
+
+SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    execution TEXT,
+    sequence TEXT,
+    host TEXT,
+    concurrency INTEGER,
+    finished TEXT,
+    status TEXT,
+    failed_stage TEXT,
+    frames INTEGER,
+    width INTEGER,
+    height INTEGER,
+    bit_depth INTEGER,
+    descriptor INTEGER,
+    bytes INTEGER,
+    v2 INTEGER,
+    mkv_bytes INTEGER,
+    compression_ratio REAL,
+    wall_seconds REAL
+);
+CREATE TABLE IF NOT EXISTS stages (
+    job_id INTEGER REFERENCES jobs(id),
+    stage TEXT,
+    parent TEXT,
+    status TEXT,
+    wall_seconds REAL,
+    cpu_seconds REAL,
+    bytes_read INTEGER,
+    bytes_written INTEGER,
+    frames INTEGER,
+    fps REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_format ON jobs(width, height, bit_depth);
+CREATE INDEX IF NOT EXISTS stages_job ON stages(job_id, stage);
+"""
+
+
+def history_path() -> Path:
+    """
+    Returns the location of the history database, SOUSCHEF_HISTORY if set.
+
+    :rtype: Path
+    """
+    return Path(os.environ.get(ENV_VAR, str(DEFAULT_PATH)))
+
+
+def connect(path: Optional[Path] = None) -> sqlite3.Connection:
+    """
+    Opens the history database, creating it if needed. Write-ahead logging lets the GUI read while workers write.
+    The caller closes the connection, e.g. with contextlib.closing.
+
+    :param path: database location, history_path() by default
+    :type path: Optional[Path]
+    :rtype: sqlite3.Connection
+    """
+    path = path if path is not None else history_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    connection: sqlite3.Connection = sqlite3.connect(str(path), timeout=TIMEOUT)
+    try:
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(SCHEMA)
+    except sqlite3.Error:
+        connection.close()
+        raise
+    return connection
+
+
+def record_job(job: dict, stages: List[dict], succeeded: bool, path: Optional[Path] = None) -> int:
+    """
+    Stores one finished job and its stage metrics.
+
+    :param job: job facts collected with metrics.set_job -> (execution, sequence, concurrency, frames, width, height,
+        bit_depth, descriptor, bytes, v2, mkv_bytes)
+    :type job: dict
+    :param stages: stage records, see metrics.records
+    :type stages: List[dict]
+    :param succeeded: whether the job completed
+    :type succeeded: bool
+    :param path: database location, history_path() by default
+    :type path: Optional[Path]
+    :raises RuntimeError: if the job cannot be stored
+    :returns: id of the stored job
+    :rtype: int
+    """
+    top: List[dict] = [s for s in stages if s["parent"] is None]
+    ratio: Optional[float] = (
+        round(job["bytes"] / job["mkv_bytes"], 3) if job.get("bytes") and job.get("mkv_bytes") else None
+    )
+    try:
+        with closing(connect(path)) as connection, connection:  # closed even if the transaction fails
+            cursor: sqlite3.Cursor = connection.execute(
+                "INSERT INTO jobs (execution, sequence, host, concurrency, finished, status, failed_stage, frames,"
+                " width, height, bit_depth, descriptor, bytes, v2, mkv_bytes, compression_ratio, wall_seconds)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job.get("execution"), job.get("sequence"), socket.gethostname(), job.get("concurrency"),
+                    datetime.datetime.now().isoformat(timespec="seconds"),
+                    "succeeded" if succeeded else "failed",
+                    next((s["stage"] for s in top if s["status"] != "ok"), None),
+                    job.get("frames"), job.get("width"), job.get("height"), job.get("bit_depth"),
+                    job.get("descriptor"), job.get("bytes"),
+                    None if job.get("v2") is None else int(job["v2"]),
+                    job.get("mkv_bytes"), ratio,
+                    round(sum(s["wall_seconds"] for s in top), 3),
+                ),
+            )
+            job_id: int = cursor.lastrowid
+            connection.executemany(
+                "INSERT INTO stages (job_id, stage, parent, status, wall_seconds, cpu_seconds, bytes_read,"
+                " bytes_written, frames, fps) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        job_id, s["stage"], s["parent"], s["status"], s["wall_seconds"], s["cpu_seconds"],
+                        s["bytes_read"], s["bytes_written"], s.get("frames"), s.get("fps"),
+                    )
+                    for s in stages
+                ],
+            )
+    except (sqlite3.Error, OSError) as e:
+        raise RuntimeError(f"failed to record job history: {e}") from e
+    return job_id
+
+
+def recent_jobs(limit: int = 20, sequence: Optional[str] = None, path: Optional[Path] = None) -> List[dict]:
+    """
+    Lists the most recent jobs, newest first.
+
+    :param limit: maximum number of jobs
+    :type limit: int
+    :param sequence: only jobs of this sequence
+    :type sequence: Optional[str]
+    :param path: database location, history_path() by default
+    :type path: Optional[Path]
+    :rtype: List[dict]
+    """
+    query: str = "SELECT * FROM jobs" + (" WHERE sequence = ?" if sequence else "") + " ORDER BY id DESC LIMIT ?"
+    with closing(connect(path)) as connection:
+        rows = connection.execute(query, ((sequence,) if sequence else ()) + (limit,)).fetchall()
+    return [dict(r) for r in rows]
+
+
+def job_stages(job_id: int, path: Optional[Path] = None) -> List[dict]:
+    """
+    Lists the stage metrics of one job in the order they ran.
+
+    :param job_id: id of the job
+    :type job_id: int
+    :param path: database location, history_path() by default
+    :type path: Optional[Path]
+    :rtype: List[dict]
+    """
+    with closing(connect(path)) as connection:
+        rows = connection.execute("SELECT * FROM stages WHERE job_id = ? ORDER BY rowid", (job_id,)).fetchall()
+    return [dict(r) for r in rows]
+
+
+def stage_throughput(
+        stage: str,
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+        bit_depth: Optional[int] = None,
+        host: Optional[str] = None,
+        limit: int = 50,
+        path: Optional[Path] = None,
+) -> Optional[float]:
+    """
+    Frames per second of a stage over the most recent successful jobs with the same format, used as a prior for
+    estimates before a job reports its own speed.
+
+    :param stage: stage name, e.g. dpx rawcook
+    :type stage: str
+    :param width: frame width, any if None
+    :type width: Optional[int]
+    :param height: frame height, any if None
+    :type height: Optional[int]
+    :param bit_depth: bit depth, any if None
+    :type bit_depth: Optional[int]
+    :param host: host name, any if None
+    :type host: Optional[str]
+    :param limit: number of recent jobs considered
+    :type limit: int
+    :param path: database location, history_path() by default
+    :type path: Optional[Path]
+    :returns: total frames over total seconds, None if there is no matching history
+    :rtype: Optional[float]
+    """
+    conditions: List[str] = ["s.stage = ?", "j.status = 'succeeded'", "j.frames > 0", "s.wall_seconds > 0"]
+    values: list = [stage]
+    for column, value in (("width", width), ("height", height), ("bit_depth", bit_depth), ("host", host)):
+        if value is not None:
+            conditions.append(f"j.{column} = ?")
+            values.append(value)
+    query: str = (
+        "SELECT SUM(frames), SUM(seconds) FROM ("
+        " SELECT j.frames AS frames, s.wall_seconds AS seconds FROM stages s JOIN jobs j ON s.job_id = j.id"
+        f" WHERE {' AND '.join(conditions)} ORDER BY j.id DESC LIMIT ?)"
+    )
+    with closing(connect(path)) as connection:
+        frames, seconds = connection.execute(query, values + [limit]).fetchone()
+    return round(frames / seconds, 3) if frames and seconds else None
+
+
+def stage_priors(
+        stages: List[str],
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+        bit_depth: Optional[int] = None,
+        path: Optional[Path] = None,
+) -> Dict[str, float]:
+    """
+    Historical frames per second of each stage on this host for sequences of the same format, falling back to all
+    formats when this one has no history.
+
+    :param stages: stage names
+    :type stages: List[str]
+    :param width: frame width
+    :type width: Optional[int]
+    :param height: frame height
+    :type height: Optional[int]
+    :param bit_depth: bit depth
+    :type bit_depth: Optional[int]
+    :param path: database location, history_path() by default
+    :type path: Optional[Path]
+    :returns: frames per second by stage, stages without history are left out
+    :rtype: Dict[str, float]
+    """
+    host: str = socket.gethostname()
+    priors: Dict[str, float] = {}
+    try:
+        for stage in stages:
+            fps: Optional[float] = stage_throughput(stage, width, height, bit_depth, host, path=path)
+            if fps is None and width is not None:
+                fps = stage_throughput(stage, host=host, path=path)
+            if fps is not None:
+                priors[stage] = fps
+    except (sqlite3.Error, OSError):
+        return {}
+    return priors
+
+
+def concurrency_report(host: Optional[str] = None, stage: str = "dpx rawcook", path: Optional[Path] = None) -> List[dict]:
+    """
+    Compares throughput at each concurrency level this host has run, to decide how many jobs to run in parallel.
+
+    :param host: host name, this host by default
+    :type host: Optional[str]
+    :param stage: stage whose speed is compared
+    :type stage: str
+    :param path: database location, history_path() by default
+    :type path: Optional[Path]
+    :returns: per concurrency level: jobs, mean fps per job and estimated fps across all jobs
+    :rtype: List[dict]
+    """
+    query: str = (
+        "SELECT j.concurrency AS concurrency, COUNT(*) AS jobs, AVG(s.fps) AS fps_per_job"
+        " FROM stages s JOIN jobs j ON s.job_id = j.id"
+        " WHERE s.stage = ? AND j.host = ? AND j.status = 'succeeded' AND s.fps IS NOT NULL"
+        " GROUP BY j.concurrency ORDER BY j.concurrency"
+    )
+    with closing(connect(path)) as connection:
+        rows = connection.execute(query, (stage, host or socket.gethostname())).fetchall()
+    return [
+        {
+            "concurrency": r["concurrency"],
+            "jobs": r["jobs"],
+            "fps_per_job": round(r["fps_per_job"], 2),
+            "fps_total": round(r["fps_per_job"] * (r["concurrency"] or 1), 2),
+        }
+        for r in rows
+    ]
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """
+    arguments: None
+    returns: parser with subcommands jobs, stages, throughput and concurrency
+    """
+    parser = argparse.ArgumentParser(prog="history.py", description="Query the run history of this host")
+    parser.add_argument("--db", dest="path", type=Path, default=None, help="path to the history database")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    jobs = commands.add_parser("jobs", help="list recent jobs")
+    jobs.add_argument("--limit", type=int, default=20)
+    jobs.add_argument("--sequence", default=None)
+
+    stages = commands.add_parser("stages", help="list the stages of a job")
+    stages.add_argument("job_id", type=int)
+
+    throughput = commands.add_parser("throughput", help="frames per second of a stage for a format")
+    throughput.add_argument("--stage", default="dpx rawcook")
+    throughput.add_argument("--width", type=int, default=None)
+    throughput.add_argument("--height", type=int, default=None)
+    throughput.add_argument("--bit-depth", dest="bit_depth", type=int, default=None)
+
+    concurrency = commands.add_parser("concurrency", help="throughput by number of parallel jobs")
+    concurrency.add_argument("--stage", default="dpx rawcook")
+    concurrency.add_argument("--host", default=None)
+    return parser
+
+
+def main() -> None:
+    args = get_parser().parse_args()
+    if args.command == "jobs":
+        result = recent_jobs(args.limit, args.sequence, args.path)
+    elif args.command == "stages":
+        result = job_stages(args.job_id, args.path)
+    elif args.command == "throughput":
+        result = {"stage": args.stage, "fps": stage_throughput(
+            args.stage, args.width, args.height, args.bit_depth, path=args.path
+        )}
+    else:
+        result = concurrency_report(args.host, args.stage, args.path)
+    print(json.dumps(result, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,653 @@
+import io
+import os
+import re
+import sys
+import gzip
+import json
+import time
+import queue
+import shutil
+import threading
+import traceback
+import logging.config
+from logging import FileHandler, Handler, LogRecord
+from logging.handlers import QueueHandler
+from multiprocessing.util import Finalize
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# rawcooked/ffmpeg status lines that are rewritten many times per second
+PROGRESS_PATTERN: re.Pattern = re.compile(
+    r"frame=\s*\d+|Analyzing files \(\d+(?:\.\d+)?%\)|\bTime=\d{2}:\d{2}:\d{2} \(\d+(?:\.\d+)?%\)"
+)
+PROGRESS_INTERVAL: float = 1.0  # seconds, at most one status line per logger is written per interval
+FLUSH_INTERVAL: float = 0.5  # seconds between flushes of the buffered file handlers
+FILE_BUFFER: int = 1024 * 1024  # bytes buffered by each file handler between flushes
+ROTATE_BYTES: int = 64 * 1024 * 1024  # size at which the worker debug log is rotated
+SEGMENT_PATTERN: re.Pattern = re.compile(r"\.(\d{4})(\.gz|\.zst)?$")  # suffix of a rotated segment
+STAGE_PATTERN: re.Pattern = re.compile(r"^---starting (.+?)---\s*$")  # marker logged when a stage begins
+PROGRESS_FIELDS: Tuple[Tuple[str, re.Pattern, type], ...] = (
+    ("frame", re.compile(r"frame=\s*(\d+)"), int),
+    ("fps", re.compile(r"fps=\s*(\d+(?:\.\d+)?)"), float),
+    ("bitrate_kbps", re.compile(r"bitrate=\s*(\d+(?:\.\d+)?)kbits/s"), float),
+    ("speed", re.compile(r"speed=\s*(\d+(?:\.\d+)?)x"), float),
+    ("percent", re.compile(r"(?:Analyzing files|Time=\d{2}:\d{2}:\d{2}) \((\d+(?:\.\d+)?)%\)"), float),
+)  # structured fields extracted from progress lines
+INDEX_SUFFIX: str = ".idx"  # suffix of the byte offset index written next to an indexed log
+
+_listener: Optional["AsyncLogListener"] = None
+
+
+def progress_fields(message: str) -> dict:
+    """
+    Extracts frame, fps, bitrate, speed and percent complete from a rawcooked/ffmpeg progress line.
+
+    :param message: log message
+    :type message: str
+    :returns: the fields present in the message, empty if it is not a progress line
+    :rtype: dict
+    """
+    if not PROGRESS_PATTERN.search(message):
+        return {}
+    fields: dict = {}
+    for name, pattern, cast in PROGRESS_FIELDS:
+        match = pattern.search(message)
+        if match:
+            fields[name] = cast(match.group(1))
+    return fields
+
+
+class StageFilter(logging.Filter):
+    """
+    Tags every record with the pipeline stage it was logged in, taken from the most recent ---starting ...--- marker.
+    One instance is shared by the handlers of a process so they agree on the current stage.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.stage: Optional[str] = None
+
+    def filter(self, record: LogRecord) -> bool:
+        if not hasattr(record, "stage"):
+            match = STAGE_PATTERN.match(record.getMessage())
+            if match:
+                self.stage = match.group(1)
+            record.stage = self.stage
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats a record as one JSON object per line: timestamp, pid, function, stage, level and message, followed by
+    structured fields passed with extra={"fields": {...}} and those parsed from progress lines.
+    """
+
+    def format(self, record: LogRecord) -> str:
+        message: str = record.getMessage()
+        entry: dict = {
+            "timestamp": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "pid": record.process,
+            "function": record.funcName,
+            "stage": getattr(record, "stage", None),
+            "level": record.levelname,
+            "message": message,
+        }
+        entry.update(progress_fields(message))
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class BufferedFileHandler(FileHandler):
+    """
+    File handler that writes through a large buffer and flushes at a fixed interval instead of after every record.
+    Warnings and errors are flushed immediately.
+
+    With index set, the byte offset of the first record of every stage and level, and of every warning and error, is
+    appended to a sidecar (debug.log.idx) as JSON lines, see read_index.
+
+    :param index: write a byte offset index next to the file
+    :type index: bool
+    """
+
+    def __init__(self, filename, mode="a", encoding=None, delay=False, index=False):
+        self.last_flush: float = time.monotonic()
+        self.index: bool = index
+        self.index_stream = None
+        self.offset: int = 0  # bytes written to the current file
+        self.indexed: Tuple[Optional[str], int] = (None, -1)  # (stage, level) of the last indexed record
+        super().__init__(filename, mode, encoding, delay)
+        if self.index:
+            self.index_stream = open(self.baseFilename + INDEX_SUFFIX, self.mode, buffering=FILE_BUFFER)
+            if "a" in self.mode and os.path.exists(self.baseFilename):
+                self.offset = os.path.getsize(self.baseFilename)
+
+    def _open(self):
+        return open(self.baseFilename, self.mode, buffering=FILE_BUFFER, encoding=self.encoding)
+
+    def segment_number(self) -> int:
+        """
+        Position of the current file in log_segments, 0 unless the handler rotates.
+
+        :rtype: int
+        """
+        return 0
+
+    def index_record(self, record: LogRecord) -> None:
+        """
+        Appends the offset of the record about to be written to the index if it starts a new stage or level, or is a
+        warning or error.
+        """
+        key: Tuple[Optional[str], int] = (getattr(record, "stage", None), record.levelno)
+        if key == self.indexed and record.levelno < logging.WARNING:
+            return
+        self.indexed = key
+        self.index_stream.write(json.dumps({
+            "segment": self.segment_number(),
+            "offset": self.offset,
+            "stage": key[0],
+            "level": record.levelname,
+        }) + "\n")
+
+    def emit(self, record: LogRecord) -> None:
+        if self.stream is None:
+            self.stream = self._open()
+        try:
+            line: str = self.format(record) + self.terminator
+            if self.index_stream is not None:
+                self.index_record(record)
+                self.offset += len(line.encode(self.encoding or "utf-8"))
+            self.stream.write(line)
+            now: float = time.monotonic()
+            if record.levelno >= logging.WARNING or now - self.last_flush >= FLUSH_INTERVAL:
+                self.flush()
+                self.last_flush = now
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        super().flush()
+        if self.index_stream is not None:
+            self.index_stream.flush()
+
+    def close(self) -> None:
+        super().close()
+        if self.index_stream is not None:
+            self.index_stream.close()
+            self.index_stream = None
+
+
+def compressed_suffix() -> str:
+    """
+    Returns the suffix of compressed log segments, zstd if the zstandard package is installed and gzip otherwise.
+
+    :rtype: str
+    """
+    return ".zst" if zstandard is not None else ".gz"
+
+
+def compress_file(source: Path) -> Path:
+    """
+    Compresses a log file next to itself and removes the original. The compressed file only appears once complete.
+
+    :param source: path to the log file
+    :type source: Path
+    :returns: path to the compressed file
+    :rtype: Path
+    """
+    destination: Path = source.with_name(source.name + compressed_suffix())
+    partial: Path = destination.with_name(destination.name + ".tmp")
+    with open(source, "rb") as src:
+        if zstandard is not None:
+            with open(partial, "wb") as raw, zstandard.ZstdCompressor(level=9).stream_writer(raw) as dst:
+                shutil.copyfileobj(src, dst, FILE_BUFFER)
+        else:
+            with gzip.open(partial, "wb", compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst, FILE_BUFFER)
+    os.replace(partial, destination)
+    source.unlink()
+    return destination
+
+
+def open_log_binary(log_path: Path) -> io.BufferedIOBase:
+    """
+    Opens a plain, gzip or zstd compressed log file for reading as bytes. Offsets refer to the uncompressed content.
+
+    :param log_path: path to the log file
+    :type log_path: Path
+    :rtype: io.BufferedIOBase
+    """
+    if log_path.suffix == ".gz":
+        return gzip.open(log_path, "rb")
+    if log_path.suffix == ".zst":
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is required to read {log_path.name}")
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(log_path, "rb"), closefd=True))
+    return open(log_path, "rb")
+
+
+def open_log(log_path: Path) -> io.TextIOBase:
+    """
+    Opens a plain, gzip or zstd compressed log file for reading as text.
+
+    :param log_path: path to the log file
+    :type log_path: Path
+    :rtype: io.TextIOBase
+    """
+    return io.TextIOWrapper(open_log_binary(log_path), errors="replace")
+
+
+def decompress_data(data: bytes, name: str) -> bytes:
+    """
+    Decompresses the contents of a log file read as bytes according to the file name, plain files are returned as is.
+
+    :param data: contents of the log file
+    :type data: bytes
+    :param name: name of the log file
+    :type name: str
+    :rtype: bytes
+    """
+    if name.endswith(".gz"):
+        return gzip.decompress(data)
+    if name.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is required to read {name}")
+        return zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data)).read()
+    return data
+
+
+def decompress_log(data: bytes, name: str) -> str:
+    """
+    Decodes the contents of a log file read as bytes, decompressing them according to the file name.
+
+    :param data: contents of the log file
+    :type data: bytes
+    :param name: name of the log file
+    :type name: str
+    :rtype: str
+    """
+    return decompress_data(data, name).decode(errors="replace")
+
+
+def log_segments(log_file: Path) -> List[Path]:
+    """
+    Lists the rotated segments of a log followed by the log itself, oldest first. A segment that is being compressed
+    is returned uncompressed.
+
+    :param log_file: path to the active log file
+    :type log_file: Path
+    :rtype: List[Path]
+    """
+    segments: Dict[int, Path] = {}
+    for path in log_file.parent.glob(f"{log_file.name}.*"):
+        match = SEGMENT_PATTERN.search(path.name)
+        if match is None or path.name[:match.start()] != log_file.name:
+            continue
+        number: int = int(match.group(1))
+        if match.group(2) or number not in segments:
+            segments[number] = path
+    result: List[Path] = [segments[n] for n in sorted(segments)]
+    if log_file.exists():
+        result.append(log_file)
+    return result
+
+
+def read_index(log_file: Path, stage: str = None, level: str = None) -> List[dict]:
+    """
+    Reads the byte offset index of a log, optionally keeping only the entries of one stage and/or level. Each entry
+    holds the segment (position in log_segments), the offset of the record within it, its stage and level.
+
+    :param log_file: path to the active log file, e.g. logs/debug.log
+    :type log_file: Path
+    :param stage: stage name as logged in its ---starting ...--- marker, e.g. dpx rawcook
+    :type stage: str
+    :param level: level name, e.g. ERROR
+    :type level: str
+    :returns: matching entries in the order they were written, empty if the log is not indexed
+    :rtype: List[dict]
+    """
+    index_file: Path = log_file.with_name(log_file.name + INDEX_SUFFIX)
+    if not index_file.exists():
+        return []
+    with open(index_file) as f:
+        return parse_index(f, stage, level)
+
+
+def parse_index(lines: Iterable[str], stage: str = None, level: str = None) -> List[dict]:
+    """
+    Parses the lines of a byte offset index, keeping only the entries of one stage and/or level, see read_index.
+
+    :param lines: lines of the index
+    :type lines: Iterable[str]
+    :param stage: stage name as logged in its ---starting ...--- marker, e.g. dpx rawcook
+    :type stage: str
+    :param level: level name, e.g. ERROR
+    :type level: str
+    :returns: matching entries in the order they were written
+    :rtype: List[dict]
+    """
+    entries: List[dict] = []
+    for line in lines:
+        try:
+            entry: dict = json.loads(line)
+        except ValueError:
+            continue  # last line may be partially written
+        if (stage is None or entry["stage"] == stage) and (level is None or entry["level"] == level):
+            entries.append(entry)
+    return entries
+
+
+def read_lines(f: io.BufferedIOBase, offset: int, max_lines: int = 100) -> List[str]:
+    """
+    Reads lines of an open log from a byte offset. A stream that cannot seek, such as a zstd segment, is read up to
+    the offset instead.
+
+    :param f: log opened as bytes, e.g. by open_log_binary
+    :type f: io.BufferedIOBase
+    :param offset: offset of the first line in the uncompressed content
+    :type offset: int
+    :param max_lines: maximum number of lines returned
+    :type max_lines: int
+    :rtype: List[str]
+    """
+    lines: List[str] = []
+    if f.seekable():
+        f.seek(offset)
+    else:
+        while offset > 0:
+            skipped: bytes = f.read(min(offset, FILE_BUFFER))
+            if not skipped:
+                return lines
+            offset -= len(skipped)
+    for line in f:
+        lines.append(line.decode(errors="replace"))
+        if len(lines) >= max_lines:
+            break
+    return lines
+
+
+def read_at(log_file: Path, entry: dict, max_lines: int = 100) -> List[str]:
+    """
+    Reads lines of a log starting at an index entry, without reading the part of the log before it.
+
+    :param log_file: path to the active log file, e.g. logs/debug.log
+    :type log_file: Path
+    :param entry: entry returned by read_index
+    :type entry: dict
+    :param max_lines: maximum number of lines returned
+    :type max_lines: int
+    :rtype: List[str]
+    """
+    segments: List[Path] = log_segments(log_file)
+    if entry["segment"] >= len(segments):
+        return []
+    with open_log_binary(segments[entry["segment"]]) as f:
+        return read_lines(f, entry["offset"], max_lines)
+
+
+class LocalQueueHandler(QueueHandler):
+    """
+    Queue handler for a listener in the same process. Records are not copied or pre-formatted, only their message
+    is resolved, which keeps the cost to the logging caller minimal.
+    """
+
+    def prepare(self, record: LogRecord) -> LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class RotatingBufferedFileHandler(BufferedFileHandler):
+    """
+    Buffered file handler that rotates its file once it exceeds max_bytes. Segments are numbered in order
+    (debug.log.0001, debug.log.0002, ...) and compressed on a background thread.
+
+    :param max_bytes: size at which the file is rotated, 0 disables rotation
+    :type max_bytes: int
+    """
+
+    def __init__(self, filename, mode="a", encoding=None, delay=False, index=False, max_bytes=ROTATE_BYTES):
+        self.max_bytes: int = max_bytes
+        self.size: int = 0
+        self.segment: int = 0
+        self.compressors: List[threading.Thread] = []
+        super().__init__(filename, mode, encoding, delay, index)
+
+    def segment_number(self) -> int:
+        return self.segment
+
+    def emit(self, record: LogRecord) -> None:
+        if self.max_bytes and self.size >= self.max_bytes:
+            self.rollover()
+        super().emit(record)
+        self.size += len(str(record.msg)) + 64  # approximate, avoids tell() on a text stream
+
+    def rollover(self) -> None:
+        """
+        Closes the current file, renames it to the next segment and starts compressing it.
+        """
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+        self.size = 0
+        self.offset = 0
+        self.indexed = (None, -1)
+        try:
+            self.segment += 1
+            segment: Path = Path(f"{self.baseFilename}.{self.segment:04d}")
+            os.rename(self.baseFilename, segment)
+        except FileNotFoundError:
+            return
+        compressor: threading.Thread = threading.Thread(target=compress_file, args=(segment,), daemon=True)
+        compressor.start()
+        self.compressors.append(compressor)
+
+    def join_compression(self) -> None:
+        """
+        Waits until every rotated segment is compressed.
+        """
+        for compressor in self.compressors:
+            compressor.join()
+        self.compressors.clear()
+
+    def close(self) -> None:
+        self.join_compression()
+        super().close()
+
+
+class FlushRequest:
+    """
+    Marker placed on the log queue, set once every record queued before it has been written to disk.
+    """
+
+    def __init__(self, stop_rotation: bool = False):
+        self.done: threading.Event = threading.Event()
+        self.stop_rotation: bool = stop_rotation
+
+
+class AsyncLogListener:
+    """
+    Writes log records from a queue to the handlers on a background thread, so logging never blocks the caller on
+    disk writes. Progress lines are coalesced: per logger, at most one status line is written per PROGRESS_INTERVAL,
+    the latest one is kept, and it is always written before the next non-progress line.
+
+    :param handlers: handlers the records are dispatched to
+    :type handlers: List[Handler]
+    """
+
+    def __init__(self, handlers: List[Handler]):
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.handlers: List[Handler] = handlers
+        self.pending: Dict[str, LogRecord] = {}  # latest unwritten progress line per logger
+        self.written: Dict[str, float] = {}  # time the last progress line was written per logger
+        self.coalesced: int = 0
+        self.thread: threading.Thread = threading.Thread(target=self.monitor, name="log_listener", daemon=True)
+
+    def start(self) -> None:
+        """
+        Starts the listener thread.
+        """
+        self.thread.start()
+
+    def dispatch(self, record: LogRecord) -> None:
+        """
+        Passes a record to every handler whose level it meets. A handler that fails reports it through its
+        handleError, and the record still reaches the other handlers.
+        """
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                try:
+                    handler.handle(record)
+                except Exception:
+                    handler.handleError(record)
+
+    def write_pending(self, name: str = None) -> None:
+        """
+        Writes the coalesced progress line of a logger, or of every logger if no name is given.
+        """
+        names: List[str] = list(self.pending) if name is None else [name]
+        for n in names:
+            record: LogRecord = self.pending.pop(n, None)
+            if record is not None:
+                self.dispatch(record)
+                self.written[n] = time.monotonic()
+
+    def handle(self, record: LogRecord) -> None:
+        """
+        Writes a record, holding back progress lines that arrive within PROGRESS_INTERVAL of the previous one.
+        """
+        if record.levelno == logging.DEBUG and PROGRESS_PATTERN.search(record.getMessage()):
+            if time.monotonic() - self.written.get(record.name, 0.0) >= PROGRESS_INTERVAL:
+                self.pending.pop(record.name, None)
+                self.dispatch(record)
+                self.written[record.name] = time.monotonic()
+            else:
+                if record.name in self.pending:
+                    self.coalesced += 1
+                self.pending[record.name] = record
+            return
+        self.write_pending(record.name)
+        self.dispatch(record)
+
+    def flush_handlers(self) -> None:
+        """
+        Writes all coalesced progress lines and flushes the handlers.
+        """
+        self.write_pending()
+        for handler in self.handlers:
+            handler.flush()
+
+    def monitor(self) -> None:
+        """
+        Listener thread loop, exits when None is read from the queue.
+        """
+        while True:
+            try:
+                item = self.queue.get(timeout=PROGRESS_INTERVAL)
+            except queue.Empty:
+                now: float = time.monotonic()
+                for name in [n for n in self.pending if now - self.written.get(n, 0.0) >= PROGRESS_INTERVAL]:
+                    self.write_pending(name)
+                for handler in self.handlers:
+                    handler.flush()
+                continue
+            if item is None:
+                self.flush_handlers()
+                return
+            if isinstance(item, FlushRequest):
+                self.flush_handlers()
+                for handler in self.handlers:
+                    if isinstance(handler, RotatingBufferedFileHandler):
+                        handler.max_bytes = 0 if item.stop_rotation else handler.max_bytes
+                        handler.join_compression()
+                item.done.set()
+                continue
+            try:
+                self.handle(item)
+            except Exception:
+                # e.g. a message that cannot be formatted with its arguments, reported like logging does
+                sys.stderr.write(f"--- Logging error in {self.thread.name} ---\n")
+                traceback.print_exc(file=sys.stderr)
+
+    def flush(self, timeout: float = 60.0, stop_rotation: bool = False) -> None:
+        """
+        Blocks until every record logged so far has been written to disk and rotated segments are compressed.
+
+        :param timeout: maximum number of seconds to wait
+        :type timeout: float
+        :param stop_rotation: stop rotating files from now on, used before logs are moved
+        :type stop_rotation: bool
+        """
+        if not self.thread.is_alive():
+            return
+        request: FlushRequest = FlushRequest(stop_rotation)
+        self.queue.put(request)
+        request.done.wait(timeout)
+
+    def stop(self) -> None:
+        """
+        Writes all queued records, stops the thread and closes the handlers.
+        """
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        for handler in self.handlers:
+            handler.close()
+
+
+def configure_logging(log_config: dict) -> AsyncLogListener:
+    """
+    Applies a logging configuration with the root handlers moved behind a queue. The calling process only enqueues
+    records; a listener thread formats and writes them. The listener is stopped when the process exits, including
+    multiprocessing workers, which do not run atexit handlers.
+
+    :param log_config: logging configuration, see utils.get_log_config
+    :type log_config: dict
+    :returns: the running listener
+    :rtype: AsyncLogListener
+    """
+    global _listener
+    logging.config.dictConfig(log_config)
+    root: logging.Logger = logging.getLogger()
+    handlers: List[Handler] = root.handlers[:]
+    for handler in handlers:
+        root.removeHandler(handler)
+
+    _listener = AsyncLogListener(handlers)
+    root.addHandler(LocalQueueHandler(_listener.queue))
+    _listener.start()
+    Finalize(_listener, _listener.stop, exitpriority=10)
+    return _listener
+
+
+def flush_logs(stop_rotation: bool = False) -> None:
+    """
+    Blocks until the records logged so far by this process are on disk, a no-op if logging is synchronous.
+
+    :param stop_rotation: stop rotating files from now on, used before logs are moved
+    :type stop_rotation: bool
+    """
+    if _listener is not None:
+        _listener.flush(stop_rotation=stop_rotation)
+
+
+def get_handler(name: str) -> Optional[Handler]:
+    """
+    Finds a configured handler by name, whether it is attached to the root logger or to the listener.
+
+    :param name: handler name from the logging configuration, e.g. debug_file
+    :type name: str
+    :returns: the handler, or None if it does not exist
+    :rtype: Optional[Handler]
+    """
+    handlers: List[Handler] = logging.getLogger().handlers + (_listener.handlers if _listener else [])
+    for handler in handlers:
+        if handler.name == name:
+            return handler
+    return None
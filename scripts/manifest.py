@@ -0,0 +1,126 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+# standard library only, so the GUI can import this module without the worker dependencies
+
+MANIFEST_NAME: str = "sequences.jsonl"
+MANIFEST_VERSION: int = 1
+REQUIRED_KEYS: Tuple[str, ...] = (
+    "sequence_folder_path",
+    "gap_check",
+    "dpx_policy_check",
+    "mkv_policy_check",
+    "frame_md5",
+    "in_place",
+    "license",
+)
+
+
+def split_defaults(jobs: List[dict]) -> Tuple[dict, List[dict]]:
+    """
+    Separates the settings every job shares from the ones that differ.
+
+    :param jobs: sequence configurations, in run order
+    :type jobs: List[dict]
+    :returns: (settings with the same value in every job, per job overrides of those defaults)
+    :rtype: Tuple[dict, List[dict]]
+    """
+    if not jobs:
+        return {}, []
+    defaults: dict = {
+        key: value for key, value in jobs[0].items()
+        if all(key in job and job[key] == value for job in jobs)
+    }
+    overrides: List[dict] = [
+        {key: value for key, value in job.items() if key not in defaults} for job in jobs
+    ]
+    return defaults, overrides
+
+
+def write_manifest(path: Path, jobs: List[dict]) -> None:
+    """
+    Writes the jobs of a run as JSON lines: a header with the format version and the shared defaults, then one
+    record of overrides per job. The file is written next to its destination and renamed over it, so the driver
+    never reads a partial manifest.
+
+    :param path: manifest file to write
+    :type path: Path
+    :param jobs: sequence configurations, in run order
+    :type jobs: List[dict]
+    :raises RuntimeError: if the manifest cannot be written
+    :returns: None
+    """
+    defaults, overrides = split_defaults(jobs)
+    directory: str = os.path.dirname(os.path.abspath(path))
+    try:
+        handle, partial = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    except OSError as e:
+        raise RuntimeError(f"could not write manifest {path}: {e}")
+    try:
+        with os.fdopen(handle, "w") as f:
+            f.write(json.dumps({"version": MANIFEST_VERSION, "defaults": defaults}) + "\n")
+            f.writelines(json.dumps(record) + "\n" for record in overrides)
+        os.replace(partial, path)
+    except (OSError, TypeError, ValueError) as e:
+        os.unlink(partial)
+        raise RuntimeError(f"could not write manifest {path}: {e}")
+
+
+def read_manifest(path: Path) -> Tuple[dict, Iterator[dict]]:
+    """
+    Opens a manifest and reads its header. The jobs are parsed one line at a time as the returned iterator is
+    consumed, each one its overrides applied to the defaults.
+
+    :param path: manifest file to read
+    :type path: Path
+    :raises RuntimeError: if the file cannot be read, the header is invalid or the version is not supported; the
+        iterator raises it for a line that is not a JSON object
+    :returns: (header, iterator over the jobs in run order)
+    :rtype: Tuple[dict, Iterator[dict]]
+    """
+    try:
+        f = open(path, "r")
+    except OSError as e:
+        raise RuntimeError(f"could not open manifest {path}: {e}")
+    try:
+        header: dict = json.loads(f.readline())
+        version = header["version"]
+        defaults: dict = header.get("defaults", {})
+    except (json.JSONDecodeError, KeyError, TypeError, AttributeError) as e:
+        f.close()
+        raise RuntimeError(f"invalid manifest header in {path}: {e}")
+    if version != MANIFEST_VERSION:
+        f.close()
+        raise RuntimeError(f"unsupported manifest version {version} in {path}, expected {MANIFEST_VERSION}")
+
+    def records() -> Iterator[dict]:
+        with f:
+            for number, line in enumerate(f, start=2):
+                if not line.strip():
+                    continue
+                try:
+                    overrides = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise RuntimeError(f"invalid record on line {number} of {path}: {e}")
+                if not isinstance(overrides, dict):
+                    raise RuntimeError(f"invalid record on line {number} of {path}: not an object")
+                yield {**defaults, **overrides}
+
+    return header, records()
+
+
+def missing_keys(record: dict) -> List[str]:
+    """
+    :param record: job read from a manifest
+    :type record: dict
+    :returns: the required settings the job does not have
+    :rtype: List[str]
+    """
+    return [key for key in REQUIRED_KEYS if key not in record]
+
+
+if __name__ == "__main__":
+    print("manifest module")
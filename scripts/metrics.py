@@ -0,0 +1,295 @@
+import os
+import json
+import time
+import datetime
+import threading
+import logging.config
+from contextlib import contextmanager
+from logging import Logger
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import psutil
+
+METRICS_FILE: str = "metrics.json"  # per sequence, stored with its logs
+SUMMARY_FILE: str = "metrics_summary.json"  # per execution, stored in the output folder
+PROGRESS_INTERVAL: float = 1.0  # seconds, at most one progress event is reported per interval
+
+_records: List[dict] = []
+_job: dict = {}
+_lock: threading.Lock = threading.Lock()
+_local: threading.local = threading.local()
+_active: List[str] = []  # stages in progress on any thread, innermost last
+_reporter: Optional[Callable[[dict], None]] = None
+_last_progress: float = 0.0
+
+
+def reset() -> None:
+    """
+    Discards the recorded stages, called by a worker after it is forked from the driver.
+    """
+    global _reporter
+    with _lock:
+        _records.clear()
+        _job.clear()
+        _active.clear()
+    _local.stack = []
+    _reporter = None
+
+
+def set_reporter(reporter: Optional[Callable[[dict], None]]) -> None:
+    """
+    Sets the function live events are passed to: job facts, the start of every top level stage and throttled
+    progress. Workers use it to forward events to the driver.
+
+    :param reporter: called with one event dictionary, None to stop reporting
+    :type reporter: Optional[Callable[[dict], None]]
+    """
+    global _reporter
+    _reporter = reporter
+
+
+def report(event: dict) -> None:
+    """
+    Passes an event to the reporter, if one is set. Reporting never raises.
+
+    :param event: event dictionary with an "event" key
+    :type event: dict
+    """
+    if _reporter is None:
+        return
+    try:
+        _reporter(event)
+    except Exception:
+        pass
+
+
+def current_stage() -> Optional[str]:
+    """
+    Returns the most recently started stage that is still in progress on any thread, used by samplers running
+    alongside the stages.
+
+    :rtype: Optional[str]
+    """
+    with _lock:
+        return _active[-1] if _active else None
+
+
+def set_job(**fields) -> None:
+    """
+    Records facts about the current job that stages may use, e.g. frames=sequence length.
+    """
+    with _lock:
+        _job.update(fields)
+    report({"event": "job", **fields})
+
+
+def progress(**fields) -> None:
+    """
+    Reports progress of the current stage, e.g. frame and fps, at most once per PROGRESS_INTERVAL.
+    """
+    global _last_progress
+    now: float = time.monotonic()
+    if now - _last_progress < PROGRESS_INTERVAL:
+        return
+    _last_progress = now
+    report({"event": "progress", **fields})
+
+
+def job() -> dict:
+    """
+    Returns a copy of the job facts recorded with set_job.
+
+    :rtype: dict
+    """
+    with _lock:
+        return dict(_job)
+
+
+def records() -> List[dict]:
+    """
+    Returns a copy of the stages recorded by this process so far.
+
+    :rtype: List[dict]
+    """
+    with _lock:
+        return [dict(r) for r in _records]
+
+
+def snapshot() -> Tuple[float, float, int, int]:
+    """
+    Samples the process wide counters used to measure a stage: wall clock, CPU time of the process and its
+    terminated children, and bytes read and written. Reaped children's I/O is included in the process counters on
+    Linux; on platforms without I/O counters the byte counts are 0.
+
+    :returns: (monotonic time, cpu seconds, bytes read, bytes written)
+    :rtype: Tuple[float, float, int, int]
+    """
+    times = os.times()
+    cpu: float = times.user + times.system + times.children_user + times.children_system
+    read: int = 0
+    written: int = 0
+    try:
+        counters = psutil.Process().io_counters()
+        read, written = counters.read_bytes, counters.write_bytes
+    except (AttributeError, psutil.Error):
+        pass
+    return time.monotonic(), cpu, read, written
+
+
+@contextmanager
+def stage(name: str, count_frames: bool = False, parent: Optional[str] = None) -> Iterator[dict]:
+    """
+    Measures a pipeline stage: wall time, CPU time, bytes read and written, and for stages that process the whole
+    sequence, frames and fps. Stages nest; the enclosing stage on the same thread is recorded as the parent unless
+    one is given. Counters are process wide, so stages that overlap on different threads share them.
+
+    :param name: stage name, e.g. check_v2
+    :type name: str
+    :param count_frames: record the sequence length set with set_job(frames=...) and the resulting fps
+    :type count_frames: bool
+    :param parent: parent stage for stages run on another thread
+    :type parent: str
+    :returns: the record, callers may add fields to it
+    :rtype: Iterator[dict]
+    """
+    stack: List[str] = getattr(_local, "stack", [])
+    _local.stack = stack
+    record: dict = {
+        "stage": name,
+        "parent": parent if parent is not None else (stack[-1] if stack else None),
+        "started": datetime.datetime.now().isoformat(timespec="seconds"),
+        "status": "ok",
+    }
+    start: Tuple[float, float, int, int] = snapshot()
+    if record["parent"] is None:
+        report({"event": "stage", "stage": name})
+    stack.append(name)
+    with _lock:
+        _active.append(name)
+    try:
+        yield record
+    except BaseException:
+        record["status"] = "failed"
+        raise
+    finally:
+        stack.pop()
+        with _lock:
+            _active.remove(name)
+        end: Tuple[float, float, int, int] = snapshot()
+        record["wall_seconds"] = round(end[0] - start[0], 3)
+        record["cpu_seconds"] = round(end[1] - start[1], 3)
+        record["bytes_read"] = end[2] - start[2]
+        record["bytes_written"] = end[3] - start[3]
+        if count_frames and _job.get("frames"):
+            record["frames"] = _job["frames"]
+            record["fps"] = round(_job["frames"] / record["wall_seconds"], 2) if record["wall_seconds"] else 0.0
+        with _lock:
+            _records.append(record)
+
+
+def totals(stages: List[dict]) -> Dict[str, dict]:
+    """
+    Aggregates stage records by stage name.
+
+    :param stages: stage records
+    :type stages: List[dict]
+    :returns: count, failures, wall and CPU seconds (total, mean, max), bytes and fps per stage name
+    :rtype: Dict[str, dict]
+    """
+    result: Dict[str, dict] = {}
+    for record in stages:
+        entry: dict = result.setdefault(record["stage"], {
+            "count": 0,
+            "failed": 0,
+            "wall_seconds": 0.0,
+            "wall_seconds_max": 0.0,
+            "cpu_seconds": 0.0,
+            "bytes_read": 0,
+            "bytes_written": 0,
+            "frames": 0,
+        })
+        entry["count"] += 1
+        entry["failed"] += record["status"] != "ok"
+        entry["wall_seconds"] = round(entry["wall_seconds"] + record["wall_seconds"], 3)
+        entry["wall_seconds_max"] = max(entry["wall_seconds_max"], record["wall_seconds"])
+        entry["cpu_seconds"] = round(entry["cpu_seconds"] + record["cpu_seconds"], 3)
+        entry["bytes_read"] += record["bytes_read"]
+        entry["bytes_written"] += record["bytes_written"]
+        entry["frames"] += record.get("frames", 0)
+    for entry in result.values():
+        entry["wall_seconds_mean"] = round(entry["wall_seconds"] / entry["count"], 3)
+        if entry["frames"] and entry["wall_seconds"]:
+            entry["fps"] = round(entry["frames"] / entry["wall_seconds"], 2)
+    return result
+
+
+def write_metrics(output_path: Path, sequence_name: str) -> Path:
+    """
+    Writes the stages recorded by this worker to metrics.json in the sequence's log folder.
+
+    :param output_path: output directory path where results are stored
+    :type output_path: Path
+    :param sequence_name: name of the sequence
+    :type sequence_name: str
+    :returns: path to the metrics file, an empty path if it could not be written
+    :rtype: Path
+    """
+    worker: Logger = logging.getLogger(f"worker_{os.getpid()}")
+    metrics_path: Path = output_path / "logs" / sequence_name / METRICS_FILE
+    stages: List[dict] = records()
+    try:
+        metrics_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(metrics_path, "w") as f:
+            json.dump({"pid": os.getpid(), **_job, "stages": stages, "totals": totals(stages)}, f, indent=4)
+    except Exception as e:
+        worker.error(f"failed to write metrics: {e}")
+        return Path()
+    worker.debug(f"wrote {metrics_path}")
+    return metrics_path
+
+
+def summarize(output_path: Path, driver_stages: List[dict]) -> Path:
+    """
+    Collects the metrics.json of every sequence in an execution into one summary in the output folder: totals per
+    stage across all sequences, one line per sequence and the driver's own stages.
+
+    :param output_path: output directory path where results are stored
+    :type output_path: Path
+    :param driver_stages: stages recorded by the driver
+    :type driver_stages: List[dict]
+    :raises RuntimeError: if the summary cannot be written
+    :returns: path to the summary
+    :rtype: Path
+    """
+    setup: Logger = logging.getLogger("setup")
+    sequences: Dict[str, dict] = {}
+    stages: List[dict] = []
+    for metrics_path in sorted((output_path / "logs").glob(f"*/{METRICS_FILE}")):
+        try:
+            with open(metrics_path) as f:
+                metrics: dict = json.load(f)
+        except (OSError, ValueError) as e:
+            setup.warning(f"skipping unreadable metrics {metrics_path}: {e}")
+            continue
+        top: List[dict] = [s for s in metrics["stages"] if s["parent"] is None]
+        sequences[metrics_path.parent.name] = {
+            "frames": metrics.get("frames", 0),
+            "wall_seconds": round(sum(s["wall_seconds"] for s in top), 3),
+            "cpu_seconds": round(sum(s["cpu_seconds"] for s in top), 3),
+            "failed_stage": next((s["stage"] for s in metrics["stages"] if s["status"] != "ok"), None),
+        }
+        stages.extend(metrics["stages"])
+
+    summary_path: Path = output_path / SUMMARY_FILE
+    try:
+        with open(summary_path, "w") as f:
+            json.dump({
+                "sequences": sequences,
+                "stages": totals(stages),
+                "driver": driver_stages,
+            }, f, indent=4)
+    except Exception as e:
+        raise RuntimeError(f"failed to write metrics summary: {e}") from e
+    setup.info(f"wrote metrics summary for {len(sequences)} sequences: {summary_path}")
+    return summary_path
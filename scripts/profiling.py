@@ -0,0 +1,243 @@
+import os
+import sys
+import time
+import cProfile
+import tempfile
+import contextlib
+import functools
+import threading
+import logging.config
+from collections import Counter
+from logging import Logger
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional
+
+ENV_VAR: str = "SOUSCHEF_PROFILE"  # cprofile, sample or both; unset or empty disables profiling
+INTERVAL_VAR: str = "SOUSCHEF_PROFILE_INTERVAL"  # seconds between stack samples
+SAMPLE_INTERVAL: float = 0.01
+MODES: List[str] = ["cprofile", "sample", "both"]
+
+_output: Optional[Path] = None
+_active: Optional["Profiler"] = None
+
+
+def requested_mode() -> str:
+    """
+    Returns the profiling mode requested through the environment as given, normalized, empty if profiling is off.
+
+    :rtype: str
+    """
+    requested: str = os.environ.get(ENV_VAR, "").strip().lower()
+    if requested in ("", "0", "false", "off"):
+        return ""
+    if requested in ("1", "true", "on"):
+        return "cprofile"
+    return requested
+
+
+def check_mode() -> None:
+    """
+    Validates the profiling mode requested through the environment, called once by the driver at startup.
+
+    :raises RuntimeError: if the mode is not one of MODES
+    """
+    requested: str = requested_mode()
+    if requested and requested not in MODES:
+        raise RuntimeError(f"unknown profiling mode {requested} in {ENV_VAR}, expected one of {MODES}")
+
+
+def mode() -> str:
+    """
+    Returns the profiling mode requested through the environment, empty if profiling is off or the mode is not one
+    of MODES, see check_mode.
+
+    :rtype: str
+    """
+    requested: str = requested_mode()
+    return requested if requested in MODES else ""
+
+
+def set_output(directory: Path) -> None:
+    """
+    Sets the folder profiles are written to. Set by the driver before it starts workers, which inherit it.
+
+    :param directory: folder for .prof and collapsed stack files
+    :type directory: Path
+    """
+    global _output
+    _output = directory
+
+
+class StackSampler(threading.Thread):
+    """
+    Lightweight sampling profiler: records the Python stack of every other thread of the process at a fixed
+    interval and counts identical stacks. Its overhead does not grow with the number of function calls, so it
+    suits long runs where cProfile would distort the timings.
+
+    :param interval: seconds between samples
+    :type interval: float
+    :param stacks: counts to add the samples to, e.g. those of a sampler that was stopped
+    :type stacks: Optional[Counter]
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL, stacks: Optional[Counter] = None):
+        super().__init__(name="stack_sampler", daemon=True)
+        self.interval: float = interval
+        self.stacks: Counter = stacks if stacks is not None else Counter()
+        self.stopped: threading.Event = threading.Event()
+
+    def run(self) -> None:
+        own: int = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            names: dict = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack: List[str] = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        self.stopped.set()
+        if self.is_alive():
+            self.join()
+
+    def write(self, path: Path) -> None:
+        """
+        Writes the samples in the collapsed stack format read by flamegraph.pl and speedscope, one
+        "frame;frame;frame count" line per distinct stack.
+        """
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Profiler:
+    """
+    Profiles one process with cProfile, the stack sampler, or both, and writes the results named after the process.
+
+    :param name: process role, e.g. driver or worker
+    :type name: str
+    :param profile_mode: one of MODES
+    :type profile_mode: str
+    """
+
+    def __init__(self, name: str, profile_mode: str):
+        self.name: str = name
+        self.mode: str = profile_mode
+        self.pid: int = os.getpid()
+        self.profile: Optional[cProfile.Profile] = None
+        self.sampler: Optional[StackSampler] = None
+        self.started: float = 0.0
+
+    def start(self) -> None:
+        self.started = time.monotonic()
+        if self.mode in ("sample", "both"):
+            self.sampler = StackSampler(float(os.environ.get(INTERVAL_VAR, SAMPLE_INTERVAL)))
+            self.sampler.start()
+        if self.mode in ("cprofile", "both"):
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    def pause(self) -> None:
+        """
+        Stops the stack sampler thread, its samples are kept, see resume.
+        """
+        if self.sampler is not None:
+            self.sampler.stop()
+
+    def resume(self) -> None:
+        """
+        Restarts stack sampling after pause, adding to the samples taken so far.
+        """
+        if self.sampler is not None and not self.sampler.is_alive():
+            self.sampler = StackSampler(self.sampler.interval, self.sampler.stacks)
+            self.sampler.start()
+
+    def discard(self) -> None:
+        """
+        Stops profiling without writing anything, used by a forked child for the profiler it inherited.
+        """
+        if self.profile is not None:
+            self.profile.disable()
+        self.sampler = None  # threads do not survive a fork
+
+    def stop(self) -> List[Path]:
+        """
+        Stops profiling and writes <name>_<pid>.prof and/or <name>_<pid>.collapsed.txt.
+
+        :returns: paths of the files written
+        :rtype: List[Path]
+        """
+        if self.profile is not None:
+            self.profile.disable()
+        if self.sampler is not None:
+            self.sampler.stop()
+
+        directory: Path = _output if _output is not None else Path(tempfile.gettempdir()) / "souschef_profiles"
+        directory.mkdir(parents=True, exist_ok=True)
+        written: List[Path] = []
+        if self.profile is not None:
+            written.append(directory / f"{self.name}_{self.pid}.prof")
+            self.profile.dump_stats(str(written[-1]))
+        if self.sampler is not None:
+            written.append(directory / f"{self.name}_{self.pid}.collapsed.txt")
+            self.sampler.write(written[-1])
+        return written
+
+
+@contextlib.contextmanager
+def paused() -> Iterator[None]:
+    """
+    Pauses the stack sampler of this process's profiler for the duration of the block. Used by the driver around
+    forking workers, so no sampler thread is running during a fork.
+    """
+    profiler: Optional[Profiler] = _active if _active is not None and _active.pid == os.getpid() else None
+    if profiler is not None:
+        profiler.pause()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.resume()
+
+
+def profiled(name: str) -> Callable:
+    """
+    Decorator that profiles every call of the function when profiling is requested through ENV_VAR, and calls it
+    unchanged otherwise. A profiler inherited from a forked parent is discarded so each process reports only itself.
+
+    :param name: process role used to name the output files
+    :type name: str
+    :rtype: Callable
+    """
+    def decorator(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            global _active
+            if _active is not None and _active.pid != os.getpid():
+                _active.discard()
+                _active = None
+            profile_mode: str = mode()
+            if not profile_mode or _active is not None:
+                return function(*args, **kwargs)
+
+            _active = Profiler(name, profile_mode)
+            _active.start()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                profiler: Profiler = _active
+                _active = None
+                logger: Logger = logging.getLogger(f"worker_{os.getpid()}" if name == "worker" else "setup")
+                try:
+                    for path in profiler.stop():
+                        logger.info(f"wrote profile {path}")
+                except Exception as e:
+                    logger.error(f"failed to write profile: {e}")
+        return wrapper
+    return decorator
@@ -0,0 +1,128 @@
+import sys
+import json
+import shutil
+import argparse
+from pathlib import Path
+from typing import List
+
+import utils
+from log_pipeline import open_log, log_segments, read_at, read_index
+
+LOG_NAMES: List[str] = ["debug", "error", "info"]
+
+
+def sequence_log(output_path: Path, sequence_name: str, log_name: str = "debug") -> Path:
+    """
+    :param output_path: output directory path where results are stored
+    :type output_path: Path
+    :param sequence_name: name of the sequence folder
+    :type sequence_name: str
+    :param log_name: debug, error or info
+    :type log_name: str
+    :returns: path the log of the sequence has while it is not archived
+    :rtype: Path
+    """
+    return output_path / "logs" / sequence_name / f"{log_name}.log"
+
+
+def is_archived(output_path: Path) -> bool:
+    """
+    :param output_path: output directory path where results are stored
+    :type output_path: Path
+    :returns: whether the logs of the execution were packed into logs/logs.tar, see utils.archive_logs
+    :rtype: bool
+    """
+    return (output_path / "logs" / "logs.index.json").exists()
+
+
+def print_log(output_path: Path, sequence_name: str, log_name: str = "debug") -> None:
+    """
+    Prints one log of a sequence, including all of its rotated segments in order. The loose log files are read
+    while they exist, once the execution is finished the log is read from its archive.
+
+    :param output_path: output directory path where results are stored
+    :type output_path: Path
+    :param sequence_name: name of the sequence folder
+    :type sequence_name: str
+    :param log_name: debug, error or info
+    :type log_name: str
+    :raises RuntimeError: if the sequence has no such log
+    :returns: None
+    """
+    segments: List[Path] = log_segments(sequence_log(output_path, sequence_name, log_name))
+    if segments:
+        for segment in segments:
+            with open_log(segment) as f:
+                shutil.copyfileobj(f, sys.stdout)
+    elif is_archived(output_path):
+        sys.stdout.write(utils.read_archived_log(output_path, sequence_name, log_name))
+    else:
+        raise RuntimeError(f"no {log_name} log for {sequence_name} in {output_path}")
+
+
+def find_records(
+        output_path: Path, sequence_name: str, stage: str = None, level: str = None, max_lines: int = 100
+) -> List[dict]:
+    """
+    Looks up records of a sequence's debug log by stage and/or level through its byte offset index, debug.log.idx,
+    without reading the rest of the log. The loose log files are read while they exist, then the archive.
+
+    :param output_path: output directory path where results are stored
+    :type output_path: Path
+    :param sequence_name: name of the sequence folder
+    :type sequence_name: str
+    :param stage: stage name as logged in its ---starting ...--- marker, e.g. dpx rawcook
+    :type stage: str
+    :param level: level name, e.g. ERROR
+    :type level: str
+    :param max_lines: maximum number of lines returned per entry
+    :type max_lines: int
+    :raises RuntimeError: if the archive cannot be read
+    :returns: matching index entries in the order they were written, each with the lines read from its offset; empty
+        if the log is not indexed (log_format is not json)
+    :rtype: List[dict]
+    """
+    log_file: Path = sequence_log(output_path, sequence_name)
+    if log_segments(log_file) or not is_archived(output_path):
+        entries: List[dict] = read_index(log_file, stage, level)
+        for entry in entries:
+            entry["lines"] = read_at(log_file, entry, max_lines)
+        return entries
+    return utils.find_archived_records(output_path, sequence_name, stage, level, max_lines)
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """
+    arguments: None
+    returns: parser with subcommands show and find
+    """
+    parser = argparse.ArgumentParser(prog="read_logs.py", description="Read the logs of a sequence in an execution")
+    parser.add_argument("output_path", type=Path, help="execution folder, e.g. <output>/2024-01-01_12-00-00")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    show = commands.add_parser("show", help="print a log of a sequence, archived or not")
+    show.add_argument("sequence")
+    show.add_argument("--log", dest="log_name", choices=LOG_NAMES, default="debug")
+
+    find = commands.add_parser("find", help="records of a stage and/or level, from the debug log index")
+    find.add_argument("sequence")
+    find.add_argument("--stage", default=None, help="e.g. dpx rawcook")
+    find.add_argument("--level", default=None, type=str.upper, help="e.g. ERROR")
+    find.add_argument("--lines", dest="max_lines", type=int, default=100, help="lines printed per record")
+    return parser
+
+
+def main() -> None:
+    args = get_parser().parse_args()
+    try:
+        if args.command == "show":
+            print_log(args.output_path, args.sequence, args.log_name)
+        else:
+            result = find_records(args.output_path, args.sequence, args.stage, args.level, args.max_lines)
+            print(json.dumps(result, indent=4))
+    except RuntimeError as e:
+        sys.exit(str(e))
+
+
+if __name__ == "__main__":
+    main()
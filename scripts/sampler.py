@@ -0,0 +1,184 @@
+import os
+import json
+import time
+import threading
+import logging.config
+from logging import Logger
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import psutil
+
+import metrics
+
+SAMPLE_INTERVAL: float = 1.0  # default seconds between samples
+MAX_SAMPLES: int = 3600  # samples kept per stage, longer series are thinned to every other sample
+RESOURCES_FILE: str = "resources.json"  # per sequence, stored with its logs
+COLUMNS: Tuple[str, ...] = (
+    "t",  # seconds since the sampler started
+    "cpu_percent",  # summed over the child processes, 100 per busy core
+    "rss_bytes",
+    "read_bytes",  # cumulative since the sampler started
+    "write_bytes",  # cumulative
+    "ctx_voluntary",  # cumulative, mostly waits on I/O
+    "ctx_involuntary",  # cumulative, preemptions under CPU contention
+    "processes",
+)
+
+
+class ResourceSampler(threading.Thread):
+    """
+    Samples the child process tree of a worker (rawcooked, ffmpeg, mediaconch) at a fixed interval: CPU, resident
+    memory, bytes read and written, and context switches. Samples are grouped by the stage in progress, see
+    metrics.current_stage, and kept as one column per measure to stay compact. I/O and context switches of a child
+    that exits between two samples are counted up to the previous sample.
+
+    :param interval: seconds between samples
+    :type interval: float
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        super().__init__(name="resource_sampler", daemon=True)
+        self.interval: float = interval
+        self.process: psutil.Process = psutil.Process()
+        self.children: Dict[int, psutil.Process] = {}
+        self.last: Dict[int, Tuple[int, int, int, int]] = {}  # pid -> (read, write, voluntary, involuntary)
+        self.totals: List[int] = [0, 0, 0, 0]
+        self.series: Dict[str, Dict[str, list]] = {}
+        self.strides: Dict[str, int] = {}
+        self.ticks: Dict[str, int] = {}
+        self.started: float = time.monotonic()
+        self.stopped: threading.Event = threading.Event()
+        self.lock: threading.Lock = threading.Lock()
+
+    def sample(self) -> Optional[list]:
+        """
+        Takes one sample of the child process tree.
+
+        :returns: values in COLUMNS order, None if there are no child processes
+        :rtype: Optional[list]
+        """
+        try:
+            current: List[psutil.Process] = self.process.children(recursive=True)
+        except psutil.Error:
+            return None
+        cpu: float = 0.0
+        rss: int = 0
+        alive: Dict[int, psutil.Process] = {}
+        for child in current:
+            # reuse process objects so cpu_percent measures from the previous sample
+            p: psutil.Process = self.children.get(child.pid, child)
+            try:
+                with p.oneshot():
+                    cpu += p.cpu_percent()
+                    rss += p.memory_info().rss
+                    ctx = p.num_ctx_switches()
+                    try:
+                        io = p.io_counters()
+                        read, write = io.read_bytes, io.write_bytes
+                    except (AttributeError, psutil.AccessDenied):
+                        read, write = 0, 0
+            except psutil.Error:
+                continue
+            counters: Tuple[int, int, int, int] = (read, write, ctx.voluntary, ctx.involuntary)
+            previous: Tuple[int, int, int, int] = self.last.get(p.pid, (0, 0, 0, 0))
+            for i in range(4):
+                self.totals[i] += max(counters[i] - previous[i], 0)
+            self.last[p.pid] = counters
+            alive[p.pid] = p
+        self.children = alive
+        self.last = {pid: c for pid, c in self.last.items() if pid in alive}
+        if not alive:
+            return None
+        return [round(time.monotonic() - self.started, 2), round(cpu, 1), rss, *self.totals, len(alive)]
+
+    def record(self, stage: str, values: list) -> None:
+        """
+        Appends a sample to the series of a stage, thinning the series once it exceeds MAX_SAMPLES.
+        """
+        with self.lock:
+            series: Dict[str, list] = self.series.setdefault(stage, {c: [] for c in COLUMNS})
+            self.ticks[stage] = self.ticks.get(stage, 0) + 1
+            stride: int = self.strides.setdefault(stage, 1)
+            if (self.ticks[stage] - 1) % stride:
+                return
+            for column, value in zip(COLUMNS, values):
+                series[column].append(value)
+            if len(series["t"]) > MAX_SAMPLES:
+                for column in COLUMNS:
+                    series[column] = series[column][::2]
+                self.strides[stage] = stride * 2
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            try:
+                values: Optional[list] = self.sample()
+                if values is not None:
+                    self.record(metrics.current_stage() or "other", values)
+            except Exception:
+                continue
+
+    def summary(self) -> Dict[str, dict]:
+        """
+        Summarizes each stage's series: mean and peak CPU, peak memory, bytes read and written and context switches.
+
+        :rtype: Dict[str, dict]
+        """
+        result: Dict[str, dict] = {}
+        with self.lock:
+            for stage, series in self.series.items():
+                if not series["t"]:
+                    continue
+                elapsed: float = max(series["t"][-1] - series["t"][0], self.interval)
+                read: int = series["read_bytes"][-1] - series["read_bytes"][0]
+                write: int = series["write_bytes"][-1] - series["write_bytes"][0]
+                result[stage] = {
+                    "samples": len(series["t"]),
+                    "cpu_percent_mean": round(sum(series["cpu_percent"]) / len(series["t"]), 1),
+                    "cpu_percent_max": max(series["cpu_percent"]),
+                    "rss_bytes_max": max(series["rss_bytes"]),
+                    "read_bytes": read,
+                    "write_bytes": write,
+                    "io_bytes_per_second": round((read + write) / elapsed, 1),
+                    "ctx_voluntary": series["ctx_voluntary"][-1] - series["ctx_voluntary"][0],
+                    "ctx_involuntary": series["ctx_involuntary"][-1] - series["ctx_involuntary"][0],
+                }
+        return result
+
+    def stop(self) -> None:
+        """
+        Stops sampling.
+        """
+        self.stopped.set()
+        if self.is_alive():
+            self.join()
+
+    def write(self, output_path: Path, sequence_name: str) -> Path:
+        """
+        Writes the series and their summary to resources.json in the sequence's log folder.
+
+        :param output_path: output directory path where results are stored
+        :type output_path: Path
+        :param sequence_name: name of the sequence
+        :type sequence_name: str
+        :returns: path to the resources file, an empty path if it could not be written
+        :rtype: Path
+        """
+        worker: Logger = logging.getLogger(f"worker_{os.getpid()}")
+        resources_path: Path = output_path / "logs" / sequence_name / RESOURCES_FILE
+        try:
+            resources_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.lock:
+                series: Dict[str, Dict[str, list]] = {s: dict(c) for s, c in self.series.items()}
+            with open(resources_path, "w") as f:
+                json.dump({
+                    "interval": self.interval,
+                    "cpu_count": psutil.cpu_count(),
+                    "summary": self.summary(),
+                    "series": series,
+                }, f)
+        except Exception as e:
+            worker.error(f"failed to write resource samples: {e}")
+            return Path()
+        worker.debug(f"wrote {resources_path}")
+        return resources_path
@@ -0,0 +1,278 @@
+import os
+import errno
+import json
+import shutil
+import threading
+import time
+import logging.config
+from concurrent.futures import ThreadPoolExecutor
+from fcntl import ioctl
+from logging import Logger
+from pathlib import Path
+from typing import List, Tuple
+
+import utils
+
+# linux ioctl request number to clone a file's extents (reflink)
+FICLONE: int = 0x40049409
+
+# errors that mean a method is not supported between source and destination, so the next method is tried
+UNSUPPORTED: Tuple[int, ...] = (
+    errno.EXDEV,
+    errno.EOPNOTSUPP,
+    errno.ENOTSUP,
+    errno.EINVAL,
+    errno.ENOTTY,
+    errno.ENOSYS,
+    errno.EPERM,
+)
+
+COPY_CHUNK: int = 64 * 1024 * 1024  # bytes per copy_file_range/sendfile call
+PROGRESS_INTERVAL: float = 10.0  # seconds between copy progress messages
+
+
+def list_tree(source_path: Path) -> Tuple[List[Path], List[Path]]:
+    """
+    Lists the directories and files within a sequence folder, relative to the folder.
+
+    :param source_path: sequence folder path
+    :type source_path: Path
+    :returns: relative directory paths and relative file paths
+    :rtype: Tuple[List[Path], List[Path]]
+    """
+    directories: List[Path] = []
+    files: List[Path] = []
+    for root, dirs, names in os.walk(source_path):
+        relative: Path = Path(root).relative_to(source_path)
+        directories.extend(relative / d for d in dirs)
+        files.extend(relative / n for n in names)
+    return directories, files
+
+
+def reflink_file(source: Path, destination: Path) -> None:
+    """
+    Clones a file into destination by sharing its extents (FICLONE), no data is copied.
+
+    :param source: file to clone
+    :type source: Path
+    :param destination: path of the clone
+    :type destination: Path
+    :raises OSError: if the filesystem cannot clone between source and destination
+    :returns: None
+    """
+    with open(source, "rb") as src, open(destination, "wb") as dst:
+        try:
+            ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            destination.unlink()
+            raise
+    shutil.copystat(source, destination)
+
+
+def stream_file(source: Path, destination: Path, progress=None) -> int:
+    """
+    Copies a file in kernel space with os.copy_file_range, falling back to os.sendfile when the kernel cannot
+    copy between the two filesystems.
+
+    :param source: file to copy
+    :type source: Path
+    :param destination: path of the copy
+    :type destination: Path
+    :param progress: optional callable receiving the number of bytes copied after each chunk
+    :type progress: Callable[[int], None]
+    :raises OSError: if the copy fails
+    :returns: number of bytes copied
+    :rtype: int
+    """
+    copied: int = 0
+    use_range: bool = hasattr(os, "copy_file_range")
+    with open(source, "rb") as src, open(destination, "wb") as dst:
+        size: int = os.fstat(src.fileno()).st_size
+        while copied < size:
+            count: int = min(COPY_CHUNK, size - copied)
+            if use_range:
+                try:
+                    n: int = os.copy_file_range(src.fileno(), dst.fileno(), count)
+                except OSError as e:
+                    if e.errno not in UNSUPPORTED:
+                        raise
+                    use_range = False
+                    continue
+            else:
+                n = os.sendfile(dst.fileno(), src.fileno(), copied, count)
+            if n == 0:
+                break
+            copied += n
+            if progress:
+                progress(n)
+    shutil.copystat(source, destination)
+    return copied
+
+
+def copy_tree(
+        source_path: Path, destination_path: Path, files: List[Path], threads: int, verify: bool
+) -> None:
+    """
+    Copies files of a sequence with a pool of threads, logging progress at a fixed interval and verifying
+    every copy once it is complete.
+
+    :param source_path: sequence folder path
+    :type source_path: Path
+    :param destination_path: staged sequence folder path
+    :type destination_path: Path
+    :param files: relative file paths to copy
+    :type files: List[Path]
+    :param threads: number of files copied concurrently
+    :type threads: int
+    :param verify: compare the md5 of source and copy in addition to the size
+    :type verify: bool
+    :raises RuntimeError: if a copy fails or does not match its source
+    :returns: None
+    """
+    worker: Logger = logging.getLogger(f"worker_{os.getpid()}")
+    total: int = sum((source_path / f).stat().st_size for f in files)
+    state: dict = {"done": 0, "reported": time.monotonic()}
+    lock: threading.Lock = threading.Lock()
+    worker.info(f"copying {len(files)} files ({total} bytes) with {threads} threads")
+
+    def progress(n: int) -> None:
+        with lock:
+            state["done"] += n
+            now: float = time.monotonic()
+            if now - state["reported"] >= PROGRESS_INTERVAL:
+                state["reported"] = now
+                worker.info(f"staging copy: {state['done'] / max(total, 1) * 100:.1f}% ({state['done']}/{total} bytes)")
+
+    def copy_one(relative: Path) -> None:
+        source: Path = source_path / relative
+        destination: Path = destination_path / relative
+        copied: int = stream_file(source, destination, progress)
+        if copied != source.stat().st_size or destination.stat().st_size != copied:
+            raise RuntimeError(f"size mismatch after copy: {relative}")
+        if verify and utils.file_md5(source) != utils.file_md5(destination):
+            raise RuntimeError(f"checksum mismatch after copy: {relative}")
+
+    with ThreadPoolExecutor(max_workers=max(threads, 1)) as pool:
+        for _ in pool.map(copy_one, files):
+            pass
+    worker.info(f"staging copy: 100.0% ({total}/{total} bytes), verified {'md5' if verify else 'size'}")
+
+
+def stage_sequence(
+        source_path: Path, destination_path: Path, threads: int = 4, verify: bool = False
+) -> str:
+    """
+    Stages a sequence folder at destination_path using the cheapest method the filesystems allow, in order:
+    rename, reflink (FICLONE) of every file, and finally a parallel streaming copy. Every method except rename
+    leaves the source untouched.
+
+    :param source_path: sequence folder specified by the user
+    :type source_path: Path
+    :param destination_path: staged location of the sequence folder
+    :type destination_path: Path
+    :param threads: number of files copied concurrently by the copy fallback
+    :type threads: int
+    :param verify: compare the md5 of every copied file against its source
+    :type verify: bool
+    :raises RuntimeError: if the sequence cannot be staged by any method
+    :returns: staging method used -> (in_place, rename, reflink, copy)
+    :rtype: str
+    """
+    worker: Logger = logging.getLogger(f"worker_{os.getpid()}")
+    if source_path.resolve() == destination_path.resolve():
+        worker.debug(f"working in place: {source_path.resolve()}")
+        return "in_place"
+    if not source_path.is_dir():
+        raise RuntimeError(f"failed during staging, could not locate sequence folder: {source_path}")
+
+    try:
+        if destination_path.exists():
+            destination_path.rmdir()
+        destination_path.parent.mkdir(parents=True, exist_ok=True)
+        source_path.rename(destination_path)
+        worker.info(f"staged by rename: {source_path} to {destination_path}")
+        return "rename"
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise RuntimeError(f"unexpected failure during staging: {e}") from e
+        worker.debug(f"rename not possible across devices: {e}")
+
+    # a hardlink is never possible here: rename only fails with EXDEV across filesystems, where link does too
+    directories, files = list_tree(source_path)
+    try:
+        destination_path.mkdir(exist_ok=True)
+        for d in directories:
+            (destination_path / d).mkdir(parents=True, exist_ok=True)
+        for f in files:
+            reflink_file(source_path / f, destination_path / f)
+        worker.info(f"staged by reflink: {len(files)} files from {source_path} to {destination_path}")
+        return "reflink"
+    except OSError as e:
+        shutil.rmtree(destination_path, ignore_errors=True)
+        if e.errno not in UNSUPPORTED:
+            raise RuntimeError(f"unexpected failure during staging by reflink: {e}") from e
+        worker.debug(f"staging by reflink not supported: {e}")
+
+    try:
+        destination_path.mkdir()
+        for d in directories:
+            (destination_path / d).mkdir(parents=True, exist_ok=True)
+        copy_tree(source_path, destination_path, files, threads, verify)
+    except Exception as e:
+        shutil.rmtree(destination_path, ignore_errors=True)
+        raise RuntimeError(f"failed during staging copy: {e}") from e
+    worker.info(f"staged by copy: {source_path} to {destination_path}")
+    return "copy"
+
+
+def unstage_sequence(source_path: Path, destination_path: Path, method: str) -> None:
+    """
+    Reverses stage_sequence: a renamed sequence is moved back to its source, any other staged tree is deleted
+    since the source was never modified.
+
+    :param source_path: sequence folder specified by the user
+    :type source_path: Path
+    :param destination_path: staged location of the sequence folder
+    :type destination_path: Path
+    :param method: staging method returned by stage_sequence
+    :type method: str
+    :raises RuntimeError: if the staged sequence cannot be restored or removed
+    :returns: None
+    """
+    worker: Logger = logging.getLogger(f"worker_{os.getpid()}")
+    if method == "in_place":
+        return
+    if method == "rename":
+        utils.move(destination_path, source_path)
+        return
+    try:
+        shutil.rmtree(destination_path)
+        worker.debug(f"removed staged {method} of {source_path}: {destination_path}")
+    except FileNotFoundError:
+        worker.debug(f"staged sequence already removed: {destination_path}")
+    except Exception as e:
+        raise RuntimeError(f"unexpected failure while removing staged sequence: {e}") from e
+
+
+def write_staging_record(wd: Path, source_path: Path, destination_path: Path, method: str) -> None:
+    """
+    Writes the staging method of a worker to its working directory, so an interrupted run can be restored.
+
+    :param wd: worker working directory
+    :type wd: Path
+    :param source_path: sequence folder specified by the user
+    :type source_path: Path
+    :param destination_path: staged location of the sequence folder
+    :type destination_path: Path
+    :param method: staging method returned by stage_sequence
+    :type method: str
+    :returns: None
+    """
+    record: dict = {
+        "source": str(source_path),
+        "destination": str(destination_path),
+        "method": method,
+    }
+    with open(wd / "staging.json", "w") as f:
+        json.dump(record, f, indent=4)
@@ -1,12 +1,33 @@
 import subprocess
 import os
 import datetime
+import hashlib
+import io
 import json
+import mmap
+import re
+import tarfile
+import threading
 from logging import Logger
 from shutil import copy as shutil_copy
 import logging.config
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional, Set, Tuple
+
+import discovery
+from log_pipeline import (
+    INDEX_SUFFIX,
+    BufferedFileHandler,
+    JsonFormatter,
+    RotatingBufferedFileHandler,
+    StageFilter,
+    compress_file,
+    decompress_data,
+    flush_logs,
+    log_segments,
+    parse_index,
+    read_lines,
+)
 
 
 def create_execution_dir(output_dir: Path) -> Path:
@@ -87,12 +108,21 @@ def create_working_dir(execution_dir: Path) -> Path:
     return sequence
 
 
-def get_log_config(log_directory: Path) -> dict:
+def get_log_config(
+        log_directory: Path, buffered: bool = False, rotate_bytes: int = 0, log_format: str = "text"
+) -> dict:
     """
     Generates a logging configuration file based on the specified log directory. The console handler is turned off by default.
 
     :param log_directory: logging directory path specified by user, where the logs will be created
     :type log_directory: Path
+    :param buffered: use file handlers that flush at an interval instead of after every record
+    :type buffered: bool
+    :param rotate_bytes: size at which the buffered debug log is rotated into compressed segments, 0 disables rotation
+    :type rotate_bytes: int
+    :param log_format: "text", or "json" to write the debug and error logs as JSON lines; buffered json debug logs
+        also get a byte offset index per stage and level
+    :type log_format: str
     :returns: dictionary containing the logging configuration
     :rtype: dict
     """
@@ -102,6 +132,16 @@ def get_log_config(log_directory: Path) -> dict:
     debug_file: Path = log_directory / "debug.log"
     error_file: Path = log_directory / "error.log"
     info_file: Path = log_directory / f"info.log"
+    file_handler: dict = (
+        {"()": BufferedFileHandler} if buffered else {"class": "logging.FileHandler"}
+    )
+    debug_handler: dict = (
+        {"()": RotatingBufferedFileHandler, "max_bytes": rotate_bytes}
+        if buffered and rotate_bytes else file_handler
+    )
+    if buffered and log_format == "json":
+        debug_handler = {**debug_handler, "index": True}
+    record_format: str = "json" if log_format == "json" else "detailed"
 
     log_config: dict = {
         "version": 1,
@@ -118,6 +158,14 @@ def get_log_config(log_directory: Path) -> dict:
                 "format": "%(funcName)s | %(levelname)s: %(message)s",
                 "datefmt": "%Y-%m-%dT%H:%M:%S%z",
             },
+            "json": {
+                "()": JsonFormatter,
+            },
+        },
+        "filters": {
+            "stage": {
+                "()": StageFilter,
+            },
         },
         "handlers": {
             "console": {
@@ -126,25 +174,28 @@ def get_log_config(log_directory: Path) -> dict:
                 "formatter": "short",
             },
             "debug_file": {
-                "class": "logging.FileHandler",
+                **debug_handler,
                 "level": logging.DEBUG,
                 "filename": str(debug_file),
                 "mode": "w",
-                "formatter": "detailed",
+                "formatter": record_format,
+                "filters": ["stage"],
             },
             "error_file": {
-                "class": "logging.FileHandler",
+                **file_handler,
                 "level": logging.WARNING,
                 "filename": str(error_file),
                 "mode": "w",
-                "formatter": "detailed",
+                "formatter": record_format,
+                "filters": ["stage"],
             },
             "info_file": {
-                "class": "logging.FileHandler",
+                **file_handler,
                 "level": logging.INFO,
                 "filename": str(info_file),
                 "mode": "w",
                 "formatter": "simple",
+                "filters": ["stage"],
             },
         },
         "loggers": {
@@ -172,12 +223,15 @@ def move_logs(wd: Path, output_path: Path, sequence_destination: Path) -> None:
     """
     worker: Logger = logging.getLogger(f"worker_{os.getpid()}")
     worker.info("aggregating logs to output folder")
+    flush_logs(stop_rotation=True)
     log_names: List[str] = ["debug", "error", "info"]
     log_source: List[Path] = [wd / "logs" / f"{name}.log" for name in log_names]
     log_destination: List[Path] = [
         output_path / "logs" / sequence_destination.stem / f"{name}.log"
         for name in log_names
     ]
+    segments: List[Path] = log_segments(log_source[0])[:-1]  # rotated debug segments
+    index: Path = log_source[0].with_name(log_source[0].name + INDEX_SUFFIX)
 
     worker.debug(f"{log_source=}")
     worker.debug(f"{log_destination=}")
@@ -192,19 +246,203 @@ def move_logs(wd: Path, output_path: Path, sequence_destination: Path) -> None:
         worker.info("moving error and debug logs")
         move(log_source[0], log_destination[0])
         move(log_source[1], log_destination[1])
+        for segment in segments:
+            move(segment, log_destination[0].parent / segment.name)
+        if index.exists():
+            move(index, log_destination[0].parent / index.name)
     except RuntimeError as e:
         worker.error(f"failure during move operation: {e}")
     except Exception as e:
         worker.error(f"unexpected error occurred while moving logs: {e}")
 
 
+def archive_logs(output_path: Path) -> Path:
+    """
+    Packs the logs of every sequence in an execution into one archive, logs/logs.tar, with every log compressed
+    individually. An index, logs/logs.index.json, records the byte offset and size of each member so a single
+    sequence's log can be read without scanning the archive, see read_archived_log.
+
+    :param output_path: output directory path where results are stored
+    :type output_path: Path
+    :raises RuntimeError: if the archive cannot be written
+    :returns: path to the archive
+    :rtype: Path
+    """
+    setup: Logger = logging.getLogger("setup")
+    logs: Path = output_path / "logs"
+    archive: Path = logs / "logs.tar"
+    index: Dict[str, dict] = {}
+    log_pattern: re.Pattern = re.compile(r"^(debug|error|info)\.log(\.\d{4}|\.idx)?(\.gz|\.zst)?$")
+
+    try:
+        with tarfile.open(archive, "w") as tar:
+            for sequence in sorted(p for p in logs.iterdir() if p.is_dir()):
+                # sorted by name, rotated segments (debug.log.0001) precede the final segment (debug.log)
+                for log in sorted(sequence.iterdir()):
+                    if not log_pattern.match(log.name):
+                        continue
+                    compressed: Path = log if log.suffix in (".gz", ".zst") else compress_file(log)
+                    member: tarfile.TarInfo = tar.gettarinfo(str(compressed), arcname=f"{sequence.name}/{compressed.name}")
+                    with open(compressed, "rb") as f:
+                        tar.addfile(member, f)
+                    compressed.unlink()
+        # offsets are only known once the headers are written
+        with tarfile.open(archive, "r") as tar:
+            for member in tar.getmembers():
+                index[member.name] = {
+                    "sequence": member.name.split("/")[0],
+                    "offset": member.offset_data,
+                    "size": member.size,
+                }
+        with open(logs / "logs.index.json", "w") as f:
+            json.dump(index, f, indent=4)
+    except Exception as e:
+        setup.error(f"unexpected error occurred while archiving logs: {e}")
+        raise RuntimeError(f"failed to archive logs: {e}") from e
+
+    setup.info(f"archived {len(index)} logs to {archive}")
+    return archive
+
+
+def read_archived_members(
+        output_path: Path, member_pattern: re.Pattern, positions: Optional[Set[int]] = None
+) -> List[Tuple[str, bytes]]:
+    """
+    Reads members of the execution's log archive by seeking to their offsets in the index, decompressed.
+
+    :param output_path: output directory path where results are stored
+    :type output_path: Path
+    :param member_pattern: pattern the member names, e.g. <sequence>/debug.log.gz, must match
+    :type member_pattern: re.Pattern
+    :param positions: positions, in name order, of the matching members to read, None for all; the others are
+        returned without contents
+    :type positions: Optional[Set[int]]
+    :raises OSError: if the archive cannot be read
+    :raises ValueError: if the index is not valid JSON
+    :returns: (name, contents) of the matching members, sorted by name
+    :rtype: List[Tuple[str, bytes]]
+    """
+    logs: Path = output_path / "logs"
+    with open(logs / "logs.index.json") as f:
+        index: Dict[str, dict] = json.load(f)
+    members: List[Tuple[str, bytes]] = []
+    with open(logs / "logs.tar", "rb") as tar:
+        for position, member in enumerate(sorted(m for m in index if member_pattern.match(m))):
+            if positions is not None and position not in positions:
+                members.append((member, b""))
+                continue
+            tar.seek(index[member]["offset"])
+            members.append((member, decompress_data(tar.read(index[member]["size"]), member)))
+    return members
+
+
+def read_archived_log(output_path: Path, sequence_name: str, log_name: str = "debug") -> str:
+    """
+    Reads one log of a sequence from the execution's log archive, including all of its rotated segments in order.
+
+    :param output_path: output directory path where results are stored
+    :type output_path: Path
+    :param sequence_name: name of the sequence folder
+    :type sequence_name: str
+    :param log_name: debug, error or info
+    :type log_name: str
+    :raises RuntimeError: if the archive or index cannot be read
+    :returns: contents of the log
+    :rtype: str
+    """
+    try:
+        # sorted by name, rotated segments (debug.log.0001.gz) precede the final segment (debug.log.gz)
+        segments: List[Tuple[str, bytes]] = read_archived_members(output_path, re.compile(
+            rf"^{re.escape(sequence_name)}/{log_name}\.log(\.\d{{4}})?(\.gz|\.zst)$"
+        ))
+        return "".join(data.decode(errors="replace") for _, data in segments)
+    except Exception as e:
+        raise RuntimeError(f"failed to read archived log: {e}") from e
+
+
+def find_archived_records(
+        output_path: Path, sequence_name: str, stage: str = None, level: str = None, max_lines: int = 100
+) -> List[dict]:
+    """
+    Looks up records of a sequence's debug log in the execution's log archive by its byte offset index, the archived
+    counterpart of log_pipeline.read_index and read_at. Only the segments holding a match are decompressed.
+
+    :param output_path: output directory path where results are stored
+    :type output_path: Path
+    :param sequence_name: name of the sequence folder
+    :type sequence_name: str
+    :param stage: stage name as logged in its ---starting ...--- marker, e.g. dpx rawcook
+    :type stage: str
+    :param level: level name, e.g. ERROR
+    :type level: str
+    :param max_lines: maximum number of lines returned per entry
+    :type max_lines: int
+    :raises RuntimeError: if the archive or index cannot be read
+    :returns: matching index entries in the order they were written, each with the lines read from its offset
+    :rtype: List[dict]
+    """
+    prefix: str = re.escape(sequence_name)
+    try:
+        index: List[Tuple[str, bytes]] = read_archived_members(
+            output_path, re.compile(rf"^{prefix}/debug\.log{re.escape(INDEX_SUFFIX)}(\.gz|\.zst)?$")
+        )
+        if not index:
+            return []
+        entries: List[dict] = parse_index(index[0][1].decode(errors="replace").splitlines(), stage, level)
+        if not entries:
+            return []
+        segments: List[Tuple[str, bytes]] = read_archived_members(
+            output_path,
+            re.compile(rf"^{prefix}/debug\.log(\.\d{{4}})?(\.gz|\.zst)$"),
+            {entry["segment"] for entry in entries},
+        )
+    except Exception as e:
+        raise RuntimeError(f"failed to read archived log index: {e}") from e
+    for entry in entries:
+        entry["lines"] = [] if entry["segment"] >= len(segments) else read_lines(
+            io.BytesIO(segments[entry["segment"]][1]), entry["offset"], max_lines
+        )
+    return entries
+
+
+def update_report(output_path: Path, sequence_name: str, section: str, data: dict) -> None:
+    """
+    Merges a section into the job report of a sequence, stored with its logs in the output directory.
+
+    :param output_path: output directory path where results are stored
+    :type output_path: Path
+    :param sequence_name: name of the sequence folder
+    :type sequence_name: str
+    :param section: name of the report section, replaced if it already exists
+    :type section: str
+    :param data: contents of the section
+    :type data: dict
+    :raises: None
+    :returns: None
+    """
+    worker: Logger = logging.getLogger(f"worker_{os.getpid()}")
+    report_path: Path = output_path / "logs" / sequence_name / "report.json"
+    try:
+        report: dict = {}
+        if report_path.exists():
+            with open(report_path) as f:
+                report = json.load(f)
+        report[section] = data
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(report_path, "w") as f:
+            json.dump(report, f, indent=4)
+        worker.debug(f"updated {section} in {report_path}")
+    except Exception as e:
+        worker.error(f"unexpected error occurred while updating job report: {e}")
+
+
 def write_log_config(
         write_path: Path,
         driver_path: Path,
         final_path: Path,
         count: int,
         sequence_paths: List[Path],
-) -> None:
+) -> dict:
     """
     Creates a JSON file containing log paths to be read by the GUI.
 
@@ -219,7 +457,8 @@ def write_log_config(
     :param sequence_paths: list of sequence paths containing worker logs
     :type sequence_paths: List[Path]
     :raises: None
-    :returns: None
+    :returns: the log config written
+    :rtype: dict
     """
     log_config: dict = {
         "sequences": {"count": count},
@@ -247,6 +486,20 @@ def write_log_config(
     }
     with open(write_path, "w") as f:
         json.dump(log_config, f, indent=4)
+    return log_config
+
+
+def publish(event: str, **fields) -> None:
+    """
+    Writes an event for the GUI to the driver's stdout, one JSON object per line, flushed so it is read at once.
+    Lines that are not JSON objects are ignored by the reader.
+
+    :param event: event name, e.g. ready or failed
+    :type event: str
+    :param fields: event data, must be JSON serializable
+    :returns: None
+    """
+    print(json.dumps({"event": event, **fields}), flush=True)
 
 
 def find_sequence_path(parent_path: Path) -> Path:
@@ -265,8 +518,7 @@ def find_sequence_path(parent_path: Path) -> Path:
 
     for root, directory, file in os.walk(parent_path):
         if len(file) > 0 and len(directory) == 0:
-            dpx_check: bool = file[0].endswith(".dpx") or file[0].endswith(".DPX")
-            if not dpx_check:
+            if not discovery.is_sequence_leaf(file, directory):
                 worker.warning(f"{root} contains files that are not .dpx")
             else:
                 result = Path(root)
@@ -280,7 +532,9 @@ def find_sequence_path(parent_path: Path) -> Path:
     return result
 
 
-def check_mediaconch_policy(policy_path: Path, filename: Path) -> bool:
+def check_mediaconch_policy(
+        policy_path: Path, filename: Path, cancel: threading.Event = None
+) -> bool:
     """
     Verifies a policy for a sequence by validating a single frame of the sequence against the policy via
     the mediaconch command
@@ -289,6 +543,8 @@ def check_mediaconch_policy(policy_path: Path, filename: Path) -> bool:
     :type policy_path: Path
     :param filename: path to a dpx frame
     :type filename: Path
+    :param cancel: optional event that terminates the mediaconch subprocess when set
+    :type cancel: threading.Event
     :raises RuntimeError: if policy check cannot be performed for any reason
     :returns: True if frame is verified, False otherwise
     :rtype: bool
@@ -304,10 +560,20 @@ def check_mediaconch_policy(policy_path: Path, filename: Path) -> bool:
             str(filename),
         ]
         worker.debug(f"{command=}")
-        check: subprocess.CompletedProcess = subprocess.run(
-            command, capture_output=True
-        )
-        check_str: str = check.stdout.decode()
+        with subprocess.Popen(
+                command, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        ) as p:
+            while True:
+                try:
+                    stdout, _ = p.communicate(timeout=0.5)
+                    break
+                except subprocess.TimeoutExpired:
+                    if cancel is not None and cancel.is_set():
+                        p.kill()
+                        p.communicate()
+                        worker.debug(f"policy check cancelled: {filename.name}")
+                        return False
+        check_str: str = stdout.decode()
         worker.debug(f"{check_str=}")
         if check_str.startswith("pass!"):
             return True
@@ -317,41 +583,83 @@ def check_mediaconch_policy(policy_path: Path, filename: Path) -> bool:
     return False
 
 
-def check_general_errors(mkv_txt_path: Path) -> str:
+# error signatures searched in the .mkv.txt file, keyed by category
+ERROR_PATTERNS: Dict[str, str] = {
+    "reversibility": "Reversibility was checked, issues detected, see below.",
+    "error": "Error:",
+    "conversion": "Conversion failed!",
+    "unsupported": "Please contact info@mediaarea.net if you want support of such content.",
+}
+
+
+def scan_errors(
+        file_path: Path, patterns: Dict[str, str] = None
+) -> List[Tuple[int, str, str]]:
+    """
+    Scans a file for a set of error signatures in a single pass. The signatures are compiled into one alternation
+    and matched over a memory map of the file, so the file is read once regardless of the number of patterns.
+
+    :param file_path: path to the file to scan
+    :type file_path: Path
+    :param patterns: literal signatures keyed by category, defaults to ERROR_PATTERNS
+    :type patterns: Dict[str, str]
+    :raises RuntimeError: if the file cannot be scanned
+    :returns: (line number, category, line) for every line containing a signature, in file order
+    :rtype: List[Tuple[int, str, str]]
+    """
+    patterns = ERROR_PATTERNS if patterns is None else patterns
+    categories: List[str] = list(patterns)
+    regex: re.Pattern = re.compile(
+        b"|".join(b"(" + re.escape(patterns[c].encode()) + b")" for c in categories)
+    )
+    matches: List[Tuple[int, str, str]] = []
+
+    try:
+        with open(file_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return matches
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                line_number: int = 1
+                counted: int = 0  # position up to which newlines have been counted
+                position: int = 0
+                while True:
+                    match = regex.search(mm, position)
+                    if match is None:
+                        break
+                    line_start: int = mm.rfind(b"\n", 0, match.start()) + 1
+                    line_end: int = mm.find(b"\n", match.end())
+                    line_end = len(mm) if line_end == -1 else line_end
+                    line_number += mm[counted:line_start].count(b"\n")
+                    counted = line_start
+                    line: str = mm[line_start:line_end].decode(errors="replace").rstrip("\r")
+                    matches.append((line_number, categories[match.lastindex - 1], line))
+                    position = line_end + 1
+    except Exception as e:
+        raise RuntimeError(f"an error occurred while scanning {file_path.name}: {e}") from e
+
+    return matches
+
+
+def check_general_errors(mkv_txt_path: Path, patterns: Dict[str, str] = None) -> str:
     """
     Checks for error messages in the .mkv.txt file and returns them if they exist
 
     :param mkv_txt_path: path to .mkv.txt file
     :type mkv_txt_path: Path
+    :param patterns: literal error signatures keyed by category, defaults to ERROR_PATTERNS
+    :type patterns: Dict[str, str]
     :raises RuntimeError: if an error occurs for any reason
-    :returns: error message if it exists, an empty string otherwise
+    :returns: every line containing an error message, an empty string otherwise
     :rtype: str
     """
     worker: Logger = logging.getLogger(f"worker_{os.getpid()}")
     worker.debug(f"checking {mkv_txt_path.name} for errors")
-    result: str = ""
-    error_messages: List[str] = [
-        "Reversibility was checked, issues detected, see below.",
-        "Error:",
-        "Conversion failed!",
-        "Please contact info@mediaarea.net if you want support of such content.",
-    ]
 
-    for error in error_messages:
-        try:
-            match = subprocess.run(
-                ["grep", error, str(mkv_txt_path)],
-                stdout=subprocess.PIPE,
-                text=True,
-                check=False,
-            )
-            if match.stdout:
-                worker.debug(f"found error: {match.stdout}")
-                result = match.stdout
-        except Exception as e:
-            raise RuntimeError(f"an error occurred during general error grep") from e
+    matches: List[Tuple[int, str, str]] = scan_errors(mkv_txt_path, patterns)
+    for line_number, category, line in matches:
+        worker.debug(f"found error ({category}) at line {line_number}: {line}")
 
-    return result
+    return "\n".join(f"{line_number}: {line}" for line_number, _, line in matches)
 
 
 def move(source_path: Path, destination_path: Path) -> None:
@@ -419,6 +727,22 @@ def copy(source_path: Path, destination_path: Path) -> None:
         raise RuntimeError(f"unexpected failure during copy: {e}") from e
 
 
+def file_md5(file_path: Path) -> str:
+    """
+    Computes the md5 checksum of a file.
+
+    :param file_path: path to file
+    :type file_path: Path
+    :returns: hexadecimal md5 digest
+    :rtype: str
+    """
+    md5 = hashlib.md5()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
 def sequence_count(sequence_path: Path) -> int:
     """
     Counts the number of dpx frames in a sequence.
@@ -438,6 +762,53 @@ def sequence_count(sequence_path: Path) -> int:
     return n
 
 
+def sequence_stats(sequence_path: Path) -> Tuple[int, int, Path]:
+    """
+    Counts the dpx frames in a sequence, their total size and finds the first frame, in one directory scan.
+
+    :param sequence_path: path to sequence
+    :type sequence_path: Path
+    :returns: (number of frames, bytes, path of the first frame by name or an empty path)
+    :rtype: Tuple[int, int, Path]
+    """
+    n: int = 0
+    size: int = 0
+    first: str = ""
+    with os.scandir(sequence_path) as entries:
+        for entry in entries:
+            if entry.name.endswith(".dpx") or entry.name.endswith(".DPX"):
+                n += 1
+                size += entry.stat().st_size
+                if not first or entry.name < first:
+                    first = entry.name
+    return n, size, (sequence_path / first) if first else Path()
+
+
+def dpx_header(dpx_path: Path) -> dict:
+    """
+    Reads the image size and bit depth of a dpx frame from its header, in either byte order.
+
+    :param dpx_path: path to a dpx file
+    :type dpx_path: Path
+    :returns: width, height, bit_depth and descriptor, empty if the file is not a dpx
+    :rtype: dict
+    """
+    try:
+        with open(dpx_path, "rb") as f:
+            header: bytes = f.read(804)
+    except OSError:
+        return {}
+    if len(header) < 804 or header[:4] not in (b"SDPX", b"XPDS"):
+        return {}
+    order: str = "big" if header[:4] == b"SDPX" else "little"
+    return {
+        "width": int.from_bytes(header[772:776], order),  # pixels per line
+        "height": int.from_bytes(header[776:780], order),  # lines per image element
+        "descriptor": header[800],  # components of the first image element, e.g. 50 for RGB
+        "bit_depth": header[803],  # bit size of the first image element
+    }
+
+
 if __name__ == "__main__":
     log_location = os.path.join(os.path.dirname(os.path.dirname(__file__)), "logs")
     print(log_location)